@@ -0,0 +1,212 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from master.serializers import MasterDetailField
+
+
+# ----------------------------
+# Sparse fieldsets
+# ----------------------------
+# GET ?fields=id,invoice_no,products.part_no  -> only these fields; a dotted
+#     path picks fields of a nested object or list
+# GET ?expand=products.product.category_detail -> nested objects to embed
+#
+# Without either parameter responses are unchanged. Once one is given,
+# nested objects behind a foreign key (product, customer, supplier,
+# category_detail, ...) are only embedded when named in ?expand= (or when
+# ?fields= picks fields inside them); otherwise a field named after the
+# relation shows its id and a *_detail field is left out. Lists of rows
+# (a sale's products and payments) are kept unless ?fields= leaves them out.
+#
+# Views with SparseFieldsViewMixin also narrow their queryset to match:
+# joins and prefetches for objects that aren't shipped are dropped, and
+# only() loads the selected columns.
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_paths(value):
+    """'id,products.part_no' -> {'id': {}, 'products': {'part_no': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for part in filter(None, (p.strip() for p in path.split('.'))):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def merge_trees(a, b):
+    merged = {key: dict(value) for key, value in a.items()}
+    for key, value in b.items():
+        merged[key] = merge_trees(merged.get(key, {}), value)
+    return merged
+
+
+def sparse_spec(request):
+    """(fields tree or None, expand tree) from the query string, or None when neither is given."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = request.query_params
+    if FIELDS_PARAM not in params and EXPAND_PARAM not in params:
+        return None
+    fields = parse_paths(params.get(FIELDS_PARAM, '')) or None
+    expand = parse_paths(params.get(EXPAND_PARAM, ''))
+    if fields:
+        # picking fields inside a nested object asks for that object
+        expand = merge_trees(expand, {name: sub for name, sub in fields.items() if sub})
+    return fields, expand
+
+
+def sub_fields(wanted, name):
+    # fields picked inside `name`; None is all of them
+    if wanted is None:
+        return None
+    return wanted.get(name) or None
+
+
+def is_expandable(field):
+    """A read-only nested object behind a foreign key."""
+    if isinstance(field, MasterDetailField):
+        return True
+    return isinstance(field, serializers.BaseSerializer) and not isinstance(field, serializers.ListSerializer) and field.read_only
+
+
+def nested_serializer(field):
+    child = field.child if isinstance(field, serializers.ListSerializer) else field
+    return child if isinstance(child, serializers.BaseSerializer) else None
+
+
+class SparseFieldsMixin:
+    """Serializer side of ?fields= / ?expand=; see the module comment."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        spec = self._sparse_spec()
+        if spec is None:
+            return fields
+        wanted, expand = spec
+
+        for name in list(fields):
+            field = fields[name]
+            if wanted is not None and name not in wanted and not field.write_only:
+                del fields[name]
+            elif is_expandable(field) and name not in expand:
+                # fields aren't bound yet, so a field without source= has none
+                if (field.source or name) == name:
+                    fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+                else:
+                    del fields[name]
+            elif isinstance(nested_serializer(field), SparseFieldsMixin):
+                nested_serializer(field)._sparse = (sub_fields(wanted, name), expand.get(name, {}))
+        return fields
+
+    def _sparse_spec(self):
+        if hasattr(self, '_sparse'):
+            return self._sparse
+        parent = self.parent
+        if parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None):
+            return sparse_spec(self.context.get('request'))
+        # nested, and the parent had no spec
+        return None
+
+
+def related_paths(serializer, expand, prefix=''):
+    """select_related paths for the nested objects `expand` embeds (master rows come from master.cache)."""
+    paths = []
+    for name, field in serializer.fields.items():
+        if name in expand and is_expandable(field) and not isinstance(field, MasterDetailField):
+            path = prefix + field.source.replace('.', '__')
+            paths.append(path)
+            paths.extend(related_paths(field, expand[name], path + '__'))
+    return paths
+
+
+def narrow_queryset(queryset, serializer, wanted, expand, keep=()):
+    """
+    Trim `queryset` to what `serializer` ships for this (fields, expand)
+    spec. `keep` names columns to load whatever is shipped.
+    """
+    model = queryset.model
+    fields = serializer.fields
+    shipped = {name: field for name, field in fields.items()
+               if not field.write_only and (wanted is None or name in wanted)}
+
+    # joins: only for embedded objects
+    if queryset.query.select_related is not False:
+        queryset = queryset.select_related(None)
+    expanded = {name: sub for name, sub in expand.items() if name in shipped}
+    paths = related_paths(serializer, expanded)
+    if paths:
+        queryset = queryset.select_related(*paths)
+
+    # prefetches: only for shipped lists, narrowed to their own spec
+    lookups = []
+    for lookup in queryset._prefetch_related_lookups:
+        through = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+        name = through.split('__')[0]
+        field = shipped.get(name)
+        if field is None:
+            continue
+        child = nested_serializer(field)
+        if isinstance(lookup, Prefetch) and lookup.queryset is not None and child is not None:
+            relation = model._meta.get_field(name)
+            # rows are matched back to their parent on the foreign key
+            keep_fk = [relation.field.name] if relation.one_to_many else []
+            lookup = Prefetch(
+                lookup.prefetch_through,
+                queryset=narrow_queryset(
+                    lookup.queryset, child, sub_fields(wanted, name), expand.get(name, {}), keep_fk,
+                ),
+                to_attr=lookup.to_attr,
+            )
+        lookups.append(lookup)
+    queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+
+    # columns: only() when every shipped field maps onto the query
+    if wanted is not None:
+        columns = {model._meta.pk.name}
+        for name in keep:
+            try:
+                columns.add(model._meta.get_field(name).name)
+            except FieldDoesNotExist:
+                pass  # an annotation
+        for name, field in shipped.items():
+            source = field.source.split('.')[0]
+            if source in queryset.query.annotations:
+                continue
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                # a property or method may read any column
+                return queryset
+            if model_field.concrete:
+                columns.add(model_field.name)
+        # the foreign keys prefetched lists are matched on
+        for lookup in lookups:
+            through = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+            model_field = model._meta.get_field(through.split('__')[0])
+            if model_field.concrete:
+                columns.add(model_field.name)
+        columns.update(path.split('__')[0] for path in paths)
+        queryset = queryset.only(*columns)
+    return queryset
+
+
+class SparseFieldsViewMixin:
+    """View side: narrows get_queryset() to the requested ?fields= / ?expand=."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        spec = sparse_spec(self.request)
+        if spec is None or self.action not in ('list', 'retrieve'):
+            return queryset
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        # the full field set; the spec only applies when serializing
+        serializer._sparse = None
+        # cursor pagination reads the ordering columns of the page's rows
+        ordering = getattr(self, 'cursor_ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        return narrow_queryset(queryset, serializer, *spec, keep=[o.lstrip('-') for o in ordering])
@@ -0,0 +1,208 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db.models import Sum, Q, F, Value, Subquery, OuterRef, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce, TruncDate
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .pagination import ReportPagination
+
+
+# Shared pieces of the customer and supplier balance ledgers.
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+ZERO = Value(Decimal("0"), output_field=MONEY)
+
+# (name, newest age in days, oldest age in days)
+AGING_BUCKETS = [
+    ("current", None, 30),
+    ("days_31_60", 31, 60),
+    ("days_61_90", 61, 90),
+    ("over_90", 91, None),
+]
+
+
+def sum_per_row(queryset, field, amount):
+    """Correlated subquery: sum of `amount` over rows of `queryset` whose `field` is the outer pk."""
+    return Coalesce(
+        Subquery(
+            queryset
+            .filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Sum(amount, output_field=MONEY))
+            .values("total")
+        ),
+        ZERO,
+        output_field=MONEY,
+    )
+
+
+def aging_sums(amount, date_field, today):
+    """{bucket: Sum(amount) over rows whose `date_field` falls in the bucket}"""
+    buckets = {}
+    for name, newest, oldest in AGING_BUCKETS:
+        age = Q()
+        if newest is not None:
+            age &= Q(**{f"{date_field}__lte": today - timedelta(days=newest)})
+        if oldest is not None:
+            age &= Q(**{f"{date_field}__gte": today - timedelta(days=oldest)})
+        buckets[name] = Coalesce(Sum(amount, filter=age), ZERO, output_field=MONEY)
+    return buckets
+
+
+# ----------------------------
+# Balance upkeep
+# ----------------------------
+# A balance row (CustomerBalance, SupplierBalance) moves by deltas in the
+# same transaction as the document, payment or return that changes it: the
+# share a row contributes is read before the write and again after it, and
+# the difference is applied. `shares` maps each model to
+# (party lookup, balance counter, amount).
+
+def balance_share(shares, model, pk):
+    """(party_id, {counter: amount}) that the stored row contributes, or None."""
+    party_path, counter, amount = shares[model]
+    row = model.objects.filter(pk=pk).values(
+        share_party=F(party_path),
+        share_amount=ExpressionWrapper(amount, output_field=MONEY),
+    ).first()
+    if row is None:
+        return None
+    return row["share_party"], {counter: row["share_amount"] or 0}
+
+
+def connect_balance_signals(party_model, shares, adjust):
+    """
+    Keep the balance of `party_model` rows in step with the models in
+    `shares`; adjust(party_id, **{counter: delta}) applies a change.
+    """
+    def apply(share, sign=1):
+        if share is None:
+            return
+        party_id, amounts = share
+        adjust(party_id, **{k: sign * v for k, v in amounts.items()})
+
+    def remember_balance_share(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        instance._balance_share = None if instance._state.adding else balance_share(shares, sender, instance.pk)
+
+    def update_balance_on_save(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        apply(getattr(instance, "_balance_share", None), -1)
+        apply(balance_share(shares, sender, instance.pk))
+
+    def update_balance_on_delete(sender, instance, origin=None, **kwargs):
+        # deleting the party removes the balance row along with everything else
+        if isinstance(origin, party_model):
+            return
+        apply(getattr(instance, "_balance_share", None), -1)
+
+    for model in shares:
+        name = model.__name__
+        pre_save.connect(remember_balance_share, sender=model, weak=False, dispatch_uid=f"balance_pre_save_{name}")
+        post_save.connect(update_balance_on_save, sender=model, weak=False, dispatch_uid=f"balance_post_save_{name}")
+        pre_delete.connect(remember_balance_share, sender=model, weak=False, dispatch_uid=f"balance_pre_delete_{name}")
+        post_delete.connect(update_balance_on_delete, sender=model, weak=False, dispatch_uid=f"balance_post_delete_{name}")
+
+
+# ----------------------------
+# Party ledger
+# ----------------------------
+DEBIT = "debit"
+CREDIT = "credit"
+
+
+class PartyLedgerView(APIView):
+    """
+    GET /<parties>/<id>/ledger/?from_date=&to_date=
+
+    A party's entries, newest first, from one UNION query, with its
+    maintained balance. Subclasses describe the party and its entries:
+
+    party_model, party_field   Customer, "customer"; the URL passes
+                               <party_field>_id and the response carries
+                               party_field and party_name_field
+    balance_model, balance_serializer_class, rebuild_balances
+    entry_sources              (entry type, model, party lookup, date lookup,
+                               date is a datetime, reference lookup, amount,
+                               DEBIT or CREDIT)
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    party_model = None
+    party_field = None
+    party_name_field = None
+    balance_model = None
+    balance_serializer_class = None
+    rebuild_balances = None
+    entry_sources = []
+
+    def get(self, request, **kwargs):
+        party = get_object_or_404(self.party_model, pk=kwargs[f"{self.party_field}_id"])
+        from_date = parse_date(request.query_params.get('from_date') or '')
+        to_date = parse_date(request.query_params.get('to_date') or '')
+
+        entries = [
+            self.source_entries(source, party, from_date, to_date)
+            for source in self.entry_sources
+        ]
+        entries = entries[0].union(*entries[1:], all=True).order_by('-entry_date', '-entry_id')
+
+        balance = self.balance_model.objects.filter(**{self.party_field: party}).first()
+        if balance is None:
+            self.rebuild_balances([party.pk])
+            balance = self.balance_model.objects.get(**{self.party_field: party})
+
+        ledger = {
+            self.party_field: party.pk,
+            self.party_name_field: getattr(party, self.party_name_field),
+            "balance": self.balance_serializer_class(balance).data,
+        }
+
+        paginator = ReportPagination()
+        page = paginator.paginate_queryset(entries, request, view=self)
+        if page is not None:
+            response = paginator.get_paginated_response(page)
+            response.data.update(ledger)
+            return response
+
+        return Response({**ledger, "results": list(entries)})
+
+    def source_entries(self, source, party, from_date, to_date):
+        entry_type, model, party_path, date_path, is_datetime, reference_path, amount, side = source
+        zero = Value(Decimal('0'), output_field=MONEY)
+        amount = ExpressionWrapper(amount, output_field=MONEY)
+
+        rows = model.objects.filter(**{party_path: party})
+        if is_datetime:
+            # local-day bounds on the column itself, so its index is used
+            if from_date:
+                rows = rows.filter(**{f"{date_path}__gte": _day_start(from_date)})
+            if to_date:
+                rows = rows.filter(**{f"{date_path}__lt": _day_start(to_date + timedelta(days=1))})
+        else:
+            if from_date:
+                rows = rows.filter(**{f"{date_path}__gte": from_date})
+            if to_date:
+                rows = rows.filter(**{f"{date_path}__lte": to_date})
+
+        return rows.order_by().values(
+            entry_id=F('id'),
+            entry_date=TruncDate(date_path) if is_datetime else F(date_path),
+            entry_type=Value(entry_type),
+            reference=F(reference_path),
+            debit=amount if side == DEBIT else zero,
+            credit=amount if side == CREDIT else zero,
+        )
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
@@ -0,0 +1,165 @@
+import json
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class DefaultCursorPagination(CursorPagination):
+    """
+    Keyset pagination for list endpoints, so a page costs the same however
+    large the table grows. Views set `cursor_ordering` to a column list that
+    ends in a unique, non-null column, e.g. ('-sale_date', '-id').
+
+    DRF's cursor only holds the first column and pages rows that tie on it by
+    offset; here the cursor holds the last row's value of every column, so
+    the next page starts right after (sale_date, id) however many sales share
+    a date. NULLs in nullable columns sort after every value, as PostgreSQL
+    orders them by default, and are stored in the cursor as JSON null.
+
+    Existing clients that need the whole list can pass ?paginate=false.
+    """
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not paginate_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, self.cursor.position
+
+        self.nullable = {
+            order.lstrip('-') for order in self.ordering if _nullable(queryset.model, order.lstrip('-'))
+        }
+        if reverse:
+            queryset = queryset.order_by(*self.order_by(_reverse_ordering(self.ordering)))
+        else:
+            queryset = queryset.order_by(*self.order_by(self.ordering))
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(self.keyset_filter(current_position, reverse))
+            except (TypeError, ValueError, ValidationError):
+                # a position value the column can't hold
+                raise NotFound(self.invalid_cursor_message)
+
+        # one extra row tells whether a following page exists
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            following_position = None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def order_by(self, ordering):
+        return [
+            order if order.lstrip('-') not in self.nullable
+            else F(order[1:]).desc(nulls_first=True) if order.startswith('-')
+            else F(order).asc(nulls_last=True)
+            for order in ordering
+        ]
+
+    def keyset_filter(self, position, reverse):
+        """
+        Rows past `position` in the ordering (before it when paging back):
+        (a > x) | (a = x & b > y) | ... with > flipped for descending columns.
+        NULL sorts after every value: nothing is > NULL, and NULL is > x.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition, ties = Q(), Q()
+        for order, value in zip(self.ordering, values):
+            name = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            if value is None:
+                if name not in self.nullable:
+                    raise NotFound(self.invalid_cursor_message)
+                if lookup == 'lt':
+                    condition |= ties & Q(**{f'{name}__isnull': False})
+                ties &= Q(**{f'{name}__isnull': True})
+                continue
+
+            past = Q(**{f'{name}__{lookup}': value})
+            if lookup == 'gt' and name in self.nullable:
+                past |= Q(**{f'{name}__isnull': True})
+            condition |= ties & past
+            ties &= Q(**{name: value})
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            name = order.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(None if value is None else str(value))
+        return json.dumps(values, separators=(',', ':'))
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering:
+            return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        return super().get_ordering(request, queryset, view)
+
+
+def _nullable(model, name):
+    try:
+        return model._meta.get_field(name).null
+    except FieldDoesNotExist:
+        # an annotation, e.g. a search rank
+        return False
+
+
+def _reverse_ordering(ordering):
+    return tuple(o[1:] if o.startswith('-') else '-' + o for o in ordering)
+
+
+def paginate_requested(request):
+    return request.query_params.get('paginate', '').lower() not in ('false', '0', 'no')
+
+
+class ReportPagination(PageNumberPagination):
+    """
+    Page-number pagination for report views built on UNION queries, where
+    keyset cursors can't be applied. ?paginate=false returns every row.
+    """
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not paginate_requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -66,6 +66,8 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'FirozAuto_Backend.pagination.DefaultCursorPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
 }
 
 TEMPLATES = [
@@ -87,12 +89,57 @@ WSGI_APPLICATION = 'FirozAuto_Backend.wsgi.application'
 
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite for development; DB_ENGINE=postgresql for production. SQLite takes
+# one database-wide write lock, so concurrent sales queue behind each other;
+# PostgreSQL only serializes writers touching the same stock rows.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'firozauto'),
+            'USER': os.environ.get('DB_USER', 'firozauto'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # keep connections open between requests, and check them before reuse
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'sslmode': os.environ.get('DB_SSLMODE', 'prefer'),
+            },
+        }
+    }
+
+    if os.environ.get('DB_POOL', '').lower() in ('1', 'true', 'yes'):
+        # psycopg's connection pool (pip install "psycopg[pool]") shared by the
+        # worker's threads; it replaces persistent connections
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+
+    if os.environ.get('DB_PGBOUNCER', '').lower() in ('1', 'true', 'yes'):
+        # behind PgBouncer in transaction mode a cursor can't outlive its
+        # transaction, so report exports fall back to client-side chunks
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # take the write lock when the transaction starts and wait
+                # for it, instead of failing with "database is locked" when a
+                # read lock can't be upgraded
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': int(os.environ.get('DB_TIMEOUT', 20)),
+            },
+        }
     }
-}
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -134,3 +181,32 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Threads processing background stock uploads (purchase.jobs)
+UPLOAD_JOB_WORKERS = int(os.environ.get('UPLOAD_JOB_WORKERS', 2))
+
+# Per-process cache behind /products/lookup/ (product.lookup): seconds an
+# entry may serve writes made by other processes, and entries kept
+POS_LOOKUP_CACHE_TTL = int(os.environ.get('POS_LOOKUP_CACHE_TTL', 30))
+POS_LOOKUP_CACHE_SIZE = int(os.environ.get('POS_LOOKUP_CACHE_SIZE', 5000))
+
+# Cache backing master.cache. CACHE_BACKEND=locmem (default) keeps a copy per
+# process; file (CACHE_LOCATION is a directory) shares one per host and
+# redis (CACHE_LOCATION=redis://..., needs the redis package) shares one
+# across hosts, so master changes are seen at once by every worker.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'firozauto'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')]
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_LOCATION),
+        'KEY_PREFIX': 'firozauto',
+    }
+}
+# Seconds a cached master table lives; with locmem, how long other
+# processes can serve a changed table
+MASTER_CACHE_TIMEOUT = int(os.environ.get('MASTER_CACHE_TIMEOUT', 300))
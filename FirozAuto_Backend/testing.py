@@ -0,0 +1,17 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """assertQueryBudget() for API test cases: a GET must run at most `budget` queries."""
+
+    def assertQueryBudget(self, budget, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), budget,
+            f"GET {url} ran {len(queries)} queries (budget {budget}):\n"
+            + "\n".join(q['sql'] for q in queries.captured_queries)
+        )
+        return len(queries)
@@ -14,6 +14,7 @@ admin.site.register(BankCategoryMaster)
 admin.site.register(BankMaster)
 admin.site.register(AccountCategory)
 admin.site.register(BankAccount)
+admin.site.register(DocumentSequence)
 
 
 
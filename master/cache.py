@@ -0,0 +1,163 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from .models import *
+from .sequences import reserve
+
+
+# ----------------------------
+# Master table cache
+# ----------------------------
+# Master tables are small and change a few times a year, so each one is
+# cached whole as {pk: instance} under a per-table version. Saving or
+# deleting a row bumps the version (at once and again after commit), so a
+# reader that loaded the old rows can only write them under a version that
+# is never read again. Until its transaction commits, the writing thread
+# reads the changed table from the database.
+#
+# With the default local-memory backend every process has its own copy and
+# sees other processes' changes after MASTER_CACHE_TIMEOUT; the file and
+# Redis backends (settings.CACHES) share one copy and invalidate at once.
+# A thread reuses what it read for MEMO_SECONDS, so serializing a page of
+# rows costs one cache read per table, not one per row.
+
+MASTER_MODELS = [
+    Company,
+    CostCategory,
+    SourceCategory,
+    PaymentMode,
+    DivisionMaster,
+    DistrictMaster,
+    CountryMaster,
+    SupplierTypeMaster,
+    BankCategoryMaster,
+    BankMaster,
+    AccountCategory,
+    BankAccount,
+]
+
+# DocumentSequence key counting master changes (see master_revision)
+REVISION_KEY = "MASTER"
+
+CACHE_ALIAS = getattr(settings, "MASTER_CACHE_ALIAS", "default")
+CACHE_TIMEOUT = getattr(settings, "MASTER_CACHE_TIMEOUT", 300)
+MEMO_SECONDS = 2
+
+_local = threading.local()
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _key(model, suffix):
+    return f"master:{model._meta.label_lower}:{suffix}"
+
+
+def _memo():
+    if not hasattr(_local, "tables"):
+        _local.tables = {}
+    return _local.tables
+
+
+def _dirty():
+    # tables this thread changed in a transaction that is still open
+    if not hasattr(_local, "dirty"):
+        _local.dirty = set()
+    return _local.dirty
+
+
+def master_version(model):
+    """Change counter of a master table; bumped on every save or delete."""
+    cache = _cache()
+    version = cache.get(_key(model, "version"))
+    if version is None:
+        # a fresh start value can't collide with rows cached before eviction
+        cache.add(_key(model, "version"), time.time_ns(), timeout=None)
+        version = cache.get(_key(model, "version"))
+    return version
+
+
+def master_rows(model):
+    """Every row of a master table as {pk: instance}. Don't modify the instances."""
+    dirty = _dirty()
+    if dirty and not transaction.get_connection().in_atomic_block:
+        # the transaction ended; a rollback runs no callback to say so
+        dirty.clear()
+    if model in dirty:
+        # uncommitted changes must not reach the shared cache
+        return {row.pk: row for row in model.objects.order_by("pk")}
+
+    memo = _memo()
+    hit = memo.get(model)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+
+    version = master_version(model)
+    rows_key = _key(model, f"rows:{version}")
+    rows = _cache().get(rows_key)
+    if rows is None:
+        rows = {row.pk: row for row in model.objects.order_by("pk")}
+        _cache().set(rows_key, rows, timeout=CACHE_TIMEOUT)
+
+    memo[model] = (time.monotonic() + MEMO_SECONDS, rows)
+    return rows
+
+
+def master_row(model, pk):
+    if pk is None:
+        return None
+    return master_rows(model).get(pk)
+
+
+def master_revision():
+    """
+    Database-wide change counter of all master tables, bumped in the same
+    transaction as the change; unlike the cache versions it is the same in
+    every process.
+    """
+    return DocumentSequence.objects.filter(key=REVISION_KEY).values_list("last_value", flat=True).first() or 0
+
+
+def invalidate(model):
+    cache = _cache()
+    try:
+        cache.incr(_key(model, "version"))
+    except ValueError:
+        cache.add(_key(model, "version"), time.time_ns(), timeout=None)
+    _memo().pop(model, None)
+
+
+def refresh_local():
+    """
+    Forget what this process may have read before another process's change:
+    this thread's memo and, with the local-memory backend, the cached
+    tables. A shared backend is invalidated by the writer, so it is left be.
+    """
+    _memo().clear()
+    if isinstance(_cache(), LocMemCache):
+        for model in MASTER_MODELS:
+            invalidate(model)
+
+
+def _changed(sender, **kwargs):
+    reserve(REVISION_KEY)
+    invalidate(sender)
+    if transaction.get_connection().in_atomic_block:
+        _dirty().add(sender)
+        transaction.on_commit(lambda: _committed(sender))
+
+
+def _committed(model):
+    _dirty().discard(model)
+    invalidate(model)
+
+
+def connect_signals():
+    for model in MASTER_MODELS:
+        post_save.connect(_changed, sender=model, dispatch_uid=f"master_cache_save_{model.__name__}")
+        post_delete.connect(_changed, sender=model, dispatch_uid=f"master_cache_delete_{model.__name__}")
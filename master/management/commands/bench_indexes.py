@@ -0,0 +1,206 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction, DatabaseError
+from django.db.models import UniqueConstraint
+from django.utils import timezone
+from master.models import SupplierTypeMaster
+from person.models import Customer, Supplier
+from product.models import Product, StockProduct
+from purchase.models import SupplierPurchase, Purchase
+from sale.models import Sale, SalePayment
+from transaction.models import Expense
+
+
+# Models whose Meta indexes, unique constraints and db_index fields are
+# benchmarked. Foreign key indexes are left alone.
+BENCH_MODELS = [StockProduct, Product, Sale, SalePayment, SupplierPurchase, Purchase, Expense]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Show query plans and timings for the hot lookup paths with the indexes "
+        "as migrated and with them dropped. Everything, including --seed data, "
+        "is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Seed this many sales/products/expenses first.")
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per query; the best time is reported.")
+        parser.add_argument("--plans", action="store_true", help="Print full query plans.")
+
+    def handle(self, *args, **options):
+        try:
+            with connection.constraint_checks_disabled():
+                with transaction.atomic():
+                    if options["seed"]:
+                        self.seed(options["seed"])
+                    sample = self.sample()
+                    if sample is None:
+                        raise CommandError("No stock or sales to query; pass --seed N.")
+
+                    indexed = self.measure(sample, options["repeat"])
+                    self.drop_indexes()
+                    plain = self.measure(sample, options["repeat"])
+                    self.report(indexed, plain, options["plans"])
+                    raise Rollback
+        except Rollback:
+            pass
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+    def sample(self):
+        stock = StockProduct.objects.order_by("?").first()
+        sale = Sale.objects.order_by("?").first()
+        if stock is None or sale is None:
+            return None
+        purchase = SupplierPurchase.objects.order_by("?").first()
+        upload = Purchase.objects.order_by("?").first()
+        return {
+            "stock": stock,
+            "sale": sale,
+            "purchase": purchase,
+            "upload": upload,
+            "month": (sale.sale_date - timedelta(days=30), sale.sale_date),
+        }
+
+    def queries(self, sample):
+        stock, sale, month = sample["stock"], sample["sale"], sample["month"]
+        now = timezone.now()
+        queries = [
+            ("stock by product + part_no", StockProduct.objects.filter(product_id=stock.product_id, part_no=stock.part_no)),
+            ("stock by company + part_no", StockProduct.objects.filter(company_name=stock.company_name, part_no=stock.part_no)),
+            ("product by part_no", Product.objects.filter(part_no=stock.part_no)),
+            ("sales in a month", Sale.objects.filter(sale_date__range=month)),
+            ("sale by invoice_no", Sale.objects.filter(invoice_no=sale.invoice_no)),
+            ("customer sales in a month", Sale.objects.filter(customer_id=sale.customer_id, sale_date__range=month)),
+            ("payments in the last 30 days", SalePayment.objects.filter(payment_date__range=(now - timedelta(days=30), now))),
+            ("expenses in a month", Expense.objects.filter(date__range=month)),
+            ("supplier purchases in a month", SupplierPurchase.objects.filter(purchase_date__range=month)),
+        ]
+        if sample["purchase"]:
+            queries.append(("supplier purchase by invoice_no",
+                            SupplierPurchase.objects.filter(invoice_no=sample["purchase"].invoice_no)))
+        if sample["upload"]:
+            queries.append(("upload purchase by invoice_no + date",
+                            Purchase.objects.filter(invoice_no=sample["upload"].invoice_no,
+                                                    purchase_date=sample["upload"].purchase_date)))
+        return queries
+
+    def measure(self, sample, repeat):
+        results = {}
+        for label, queryset in self.queries(sample):
+            best = None
+            for _ in range(max(repeat, 1)):
+                started = time.perf_counter()
+                list(queryset.all())
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            results[label] = (best, queryset.explain())
+        return results
+
+    # ----------------------------
+    # Indexes
+    # ----------------------------
+    def drop_indexes(self):
+        try:
+            with connection.schema_editor(atomic=False) as editor:
+                for model in BENCH_MODELS:
+                    for index in model._meta.indexes:
+                        editor.remove_index(model, index)
+                    for constraint in model._meta.constraints:
+                        if isinstance(constraint, UniqueConstraint):
+                            editor.remove_constraint(model, constraint)
+                    for field in model._meta.local_fields:
+                        if field.db_index and not field.unique and not field.is_relation:
+                            plain = field.clone()
+                            plain.db_index = False
+                            plain.set_attributes_from_name(field.name)
+                            plain.model = model
+                            editor.alter_field(model, field, plain)
+        except DatabaseError as e:
+            raise CommandError(f"Could not drop an index ({e}). Are the index migrations applied?")
+
+    def report(self, indexed, plain, show_plans):
+        self.stdout.write(f"{'query':40} {'indexed ms':>11} {'dropped ms':>11} {'speedup':>8}")
+        for label, (indexed_ms, indexed_plan) in indexed.items():
+            plain_ms, plain_plan = plain[label]
+            speedup = plain_ms / indexed_ms if indexed_ms else 0
+            self.stdout.write(f"{label:40} {indexed_ms:11.3f} {plain_ms:11.3f} {speedup:7.1f}x")
+            if show_plans:
+                self.stdout.write("  with indexes:\n    " + indexed_plan.replace("\n", "\n    "))
+                self.stdout.write("  without:\n    " + plain_plan.replace("\n", "\n    "))
+
+    # ----------------------------
+    # Seed data
+    # ----------------------------
+    def seed(self, count):
+        self.stdout.write(f"Seeding {count} rows per table...")
+        rng = random.Random(42)
+        today = date.today()
+        companies = [f"Company {i}" for i in range(20)]
+
+        customers = Customer.objects.bulk_create([
+            Customer(customer_name=f"Bench customer {i}", phone1="0", address="-")
+            for i in range(max(count // 50, 1))
+        ])
+        supplier_type = SupplierTypeMaster.objects.create(name="Bench")
+        suppliers = Supplier.objects.bulk_create([
+            Supplier(supplier_name=f"Bench supplier {i}", country="-", supplier_type=supplier_type, phone1="0", address="-")
+            for i in range(max(count // 200, 1))
+        ])
+
+        products = Product.objects.bulk_create([
+            Product(company=companies[i % len(companies)], product_name=f"Bench part {i}", part_no=f"BENCH-{i:07d}")
+            for i in range(count)
+        ], batch_size=1000)
+        StockProduct.objects.bulk_create([
+            StockProduct(
+                company_name=product.company, part_no=product.part_no, product=product,
+                purchase_quantity=100, current_stock_quantity=100,
+                purchase_price=Decimal("10"), sale_price=Decimal("12"), current_stock_value=Decimal("1000"),
+            )
+            for product in products
+        ], batch_size=1000)
+
+        sales = Sale.objects.bulk_create([
+            Sale(
+                customer=rng.choice(customers), invoice_no=f"BENCH{i:08d}",
+                sale_date=today - timedelta(days=rng.randrange(730)),
+                total_amount=Decimal("100"), total_payable_amount=Decimal("100"),
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        SalePayment.objects.bulk_create([
+            SalePayment(sale=sale, payment_mode="Cash", paid_amount=Decimal("100")) for sale in sales
+        ], batch_size=1000)
+
+        SupplierPurchase.objects.bulk_create([
+            SupplierPurchase(
+                supplier=rng.choice(suppliers), company_name=rng.choice(companies), invoice_no=f"BENCHPU{i:08d}",
+                purchase_date=today - timedelta(days=rng.randrange(730)),
+                total_amount=Decimal("100"), total_payable_amount=Decimal("100"),
+            )
+            for i in range(max(count // 5, 1))
+        ], batch_size=1000)
+        Purchase.objects.bulk_create([
+            Purchase(
+                invoice_no=f"BENCHEX{i:08d}", purchase_date=today - timedelta(days=rng.randrange(730)),
+                exporter_name="Bench exporter", company_name=rng.choice(companies),
+            )
+            for i in range(max(count // 5, 1))
+        ], batch_size=1000)
+        Expense.objects.bulk_create([
+            Expense(
+                date=today - timedelta(days=rng.randrange(730)), voucherNo=f"BENCHEXP{i:08d}",
+                accountTitle="Bench", costCategory="Bench", transactionType="cash", amount=Decimal("10"),
+            )
+            for i in range(count)
+        ], batch_size=1000)
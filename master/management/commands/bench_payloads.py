@@ -0,0 +1,59 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from product.views import ProductViewSet, StockViewSet
+from sale.views import SaleViewSet
+from purchase.views import SupplierPurchaseViewSet
+
+
+# (label, viewset, sparse query) - each is compared with the full response
+SCENARIOS = [
+    ("products", ProductViewSet, {"fields": "id,part_no,product_name,product_mrp"}),
+    ("stocks", StockViewSet, {"fields": "id,part_no,current_stock_quantity,sale_price,product"}),
+    ("stocks + product name", StockViewSet, {"fields": "id,part_no,current_stock_quantity,product.product_name"}),
+    ("sales", SaleViewSet, {"fields": "id,invoice_no,sale_date,total_payable_amount,customer"}),
+    ("sales + lines", SaleViewSet, {"fields": "id,invoice_no,products.part_no,products.sale_quantity,products.total_price"}),
+    ("supplier purchases", SupplierPurchaseViewSet, {"fields": "id,invoice_no,purchase_date,total_payable_amount,supplier"}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare payload size, queries and latency of list endpoints in full and "
+        "with ?fields= / ?expand= on the current data. Read-only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=10, help="Runs per request; the best time is reported.")
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        self.stdout.write(
+            f"{'endpoint':24} {'full KB':>8} {'sparse KB':>10} {'full q':>7} {'sparse q':>9} "
+            f"{'full ms':>8} {'sparse ms':>10}"
+        )
+        for label, viewset, sparse in SCENARIOS:
+            view = viewset.as_view({"get": "list"})
+            params = {"page_size": options["page_size"]}
+            full = self.measure(factory, view, params, options["repeat"])
+            narrow = self.measure(factory, view, {**params, **sparse}, options["repeat"])
+            self.stdout.write(
+                f"{label:24} {full[0] / 1024:8.1f} {narrow[0] / 1024:10.1f} {full[1]:7d} {narrow[1]:9d} "
+                f"{full[2]:8.2f} {narrow[2]:10.2f}"
+            )
+
+    def measure(self, factory, view, params, repeat):
+        """(bytes, queries, best ms) for one rendered list response."""
+        best = None
+        for _ in range(max(repeat, 1)):
+            request = factory.get("/", params, SERVER_NAME="localhost")
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = view(request)
+                response.render()
+                elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return len(response.content), len(queries), best
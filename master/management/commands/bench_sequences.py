@@ -0,0 +1,77 @@
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction, OperationalError
+from master.models import DocumentSequence
+from master.sequences import reserve, reserve_range
+
+
+class Command(BaseCommand):
+    help = "Reserve document numbers from concurrent threads and check that none collide."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--per-thread", type=int, default=200)
+        parser.add_argument("--batch", type=int, default=1, help="Numbers reserved per call (batched reservation).")
+        parser.add_argument("--key", default="BENCH")
+
+    def handle(self, *args, **options):
+        key = options["key"]
+        threads = options["threads"]
+        per_thread = options["per_thread"]
+        batch = options["batch"]
+
+        DocumentSequence.objects.filter(key=key).delete()
+
+        issued = []
+        errors = []
+        lock = threading.Lock()
+        start_gate = threading.Barrier(threads)
+
+        def worker():
+            numbers = []
+            try:
+                start_gate.wait()
+                for _ in range(per_thread):
+                    for attempt in range(5):
+                        try:
+                            with transaction.atomic():
+                                numbers.extend(reserve_range(key, batch) if batch > 1 else [reserve(key)])
+                            break
+                        except OperationalError:
+                            # SQLite reports lock waits past its timeout as errors
+                            if attempt == 4:
+                                raise
+                            time.sleep(0.01 * (attempt + 1))
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+            finally:
+                connection.close()
+            with lock:
+                issued.extend(numbers)
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.monotonic()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        DocumentSequence.objects.filter(key=key).delete()
+
+        expected = threads * per_thread * batch
+        unique = len(set(issued))
+        self.stdout.write(f"backend:     {connection.vendor}")
+        self.stdout.write(f"threads:     {threads} x {per_thread} calls x {batch} numbers")
+        self.stdout.write(f"issued:      {len(issued)} ({unique} unique, expected {expected})")
+        self.stdout.write(f"elapsed:     {elapsed:.3f}s ({len(issued) / elapsed if elapsed else 0:.0f} numbers/s)")
+        if errors:
+            self.stdout.write(self.style.WARNING(f"errors:      {len(errors)} (first: {errors[0]})"))
+
+        if unique != len(issued):
+            raise CommandError("Duplicate numbers were issued.")
+        if issued and sorted(issued) != list(range(1, len(issued) + 1)):
+            raise CommandError("Issued numbers have gaps.")
+        self.stdout.write(self.style.SUCCESS("No collisions, no gaps."))
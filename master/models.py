@@ -95,3 +95,13 @@ class BankAccount(models.Model):
 
     def __str__(self):
         return f"{self.bankName} - {self.accountName}"
+
+
+
+class DocumentSequence(models.Model):
+    key = models.CharField(max_length=50, unique=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} - {self.last_value}"
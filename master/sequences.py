@@ -0,0 +1,43 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from .models import DocumentSequence
+
+
+# ----------------------------
+# Document number sequences
+# ----------------------------
+# Numbers come from one counter row per key (e.g. "SA", "ORD-20260101").
+# The counter is bumped with an UPDATE, which locks that row until the
+# caller's transaction ends: concurrent callers queue on one row instead of
+# scanning the document table, and a rolled back insert hands its number
+# back, so sequences stay gap-free.
+
+
+def reserve(key, count=1, initial=None):
+    """
+    Reserve `count` consecutive numbers for `key` and return the first.
+    `initial` is called once, when the key is first used, to return the
+    last number already issued under the old scheme.
+    """
+    with transaction.atomic():
+        if not _bump(key, count):
+            start = initial() if initial else 0
+            try:
+                with transaction.atomic():
+                    DocumentSequence.objects.create(key=key, last_value=start + count)
+            except IntegrityError:
+                # another transaction created the key first
+                _bump(key, count)
+
+        last = DocumentSequence.objects.filter(key=key).values_list("last_value", flat=True).get()
+    return last - count + 1
+
+
+def reserve_range(key, count, initial=None):
+    """Batched reservation for bulk inserts: a range of `count` numbers."""
+    first = reserve(key, count, initial)
+    return range(first, first + count)
+
+
+def _bump(key, count):
+    return DocumentSequence.objects.filter(key=key).update(last_value=F("last_value") + count)
@@ -1,5 +1,29 @@
 from rest_framework import serializers
 from .models import*
+from .cache import master_row
+
+
+class MasterDetailField(serializers.Field):
+    """
+    Read-only nested representation of a master row behind a foreign key,
+    e.g. MasterDetailField(CompanySerializer, source='company'). The row is
+    taken from a join or prefetch when the queryset loaded one, otherwise
+    from master.cache, so listing N rows never issues N lookups.
+    """
+
+    def __init__(self, serializer_class, **kwargs):
+        self.serializer_class = serializer_class
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        field = instance._meta.get_field(self.source)
+        if field.is_cached(instance):
+            return field.get_cached_value(instance)
+        return master_row(field.related_model, getattr(instance, field.attname))
+
+    def to_representation(self, row):
+        return self.serializer_class(row, context=self.context).data
 
 
 class CompanySerializer(serializers.ModelSerializer):
@@ -35,11 +59,15 @@ class DivisionMasterSerializer(serializers.ModelSerializer):
 
 
 class DistrictMasterSerializer(serializers.ModelSerializer):
-    division_name = serializers.CharField(source='division.name', read_only=True)
+    division_name = serializers.SerializerMethodField()
     class Meta:
         model = DistrictMaster
         fields = '__all__'
 
+    def get_division_name(self, obj):
+        division = master_row(DivisionMaster, obj.division_id)
+        return division.name if division else None
+
 
 class CountryMasterSerializer(serializers.ModelSerializer):
     class Meta:
@@ -61,7 +89,7 @@ class BankCategoryMasterSerializer(serializers.ModelSerializer):
         
 
 class BankMasterSerializer(serializers.ModelSerializer):
-    bank_category_detail = BankCategoryMasterSerializer(source='bank_category', read_only=True)
+    bank_category_detail = MasterDetailField(BankCategoryMasterSerializer, source='bank_category')
 
     class Meta:
         model = BankMaster
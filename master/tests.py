@@ -1,3 +1,67 @@
-from django.test import TestCase
+from django.core.cache import caches
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .cache import CACHE_ALIAS, master_row
+from .models import Company, BankCategoryMaster, BankMaster
 
-# Create your tests here.
+
+# Committed writes, so the cache sees what production sees.
+class MasterCacheTests(TransactionTestCase):
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+        self.client = APIClient()
+        self.category = BankCategoryMaster.objects.create(name="Private")
+        for name in ["City Bank", "Dutch-Bangla Bank", "BRAC Bank"]:
+            BankMaster.objects.create(name=name, bank_category=self.category)
+
+    def test_list_is_served_from_cache(self):
+        self.client.get(reverse('bankmaster-list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('bankmaster-list'))
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0]['bank_category_detail']['name'], "Private")
+
+    def test_save_and_delete_invalidate(self):
+        company = Company.objects.create(company_name="Hero")
+        self.assertEqual(master_row(Company, company.pk).company_name, "Hero")
+
+        company.company_name = "Hero MotoCorp"
+        company.save()
+        self.assertEqual(master_row(Company, company.pk).company_name, "Hero MotoCorp")
+
+        self.category.name = "Commercial"
+        self.category.save()
+        response = self.client.get(reverse('bankmaster-list'))
+        self.assertEqual(response.data[0]['bank_category_detail']['name'], "Commercial")
+
+        company.delete()
+        self.assertIsNone(master_row(Company, company.pk))
+
+    def test_bootstrap_revalidates_with_etag(self):
+        response = self.client.get(reverse('master-bootstrap'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([bank['name'] for bank in response.data['banks']],
+                         ["City Bank", "Dutch-Bangla Bank", "BRAC Bank"])
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('master-bootstrap'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Company.objects.create(company_name="Honda")
+        response = self.client.get(reverse('master-bootstrap'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([c['company_name'] for c in response.data['companies']], ["Honda"])
+
+    @override_settings(ALLOWED_HOSTS=['a.example', 'b.example'])
+    def test_bootstrap_is_shared_across_hosts(self):
+        Company.objects.create(company_name="Hero", image="company_logos/hero.png")
+        first = self.client.get(reverse('master-bootstrap'), HTTP_HOST='a.example')
+        with self.assertNumQueries(1):
+            second = self.client.get(reverse('master-bootstrap'), HTTP_HOST='b.example')
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(first.data['companies'][0]['image'], "http://a.example/media/company_logos/hero.png")
+        self.assertEqual(second.data['companies'][0]['image'], "http://b.example/media/company_logos/hero.png")
@@ -18,5 +18,6 @@ router.register('bank-accounts', BankAccountViewSet)
 
 
 urlpatterns = [
+    path('master/bootstrap/', MasterBootstrapView.as_view(), name='master-bootstrap'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
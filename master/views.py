@@ -1,67 +1,154 @@
-from rest_framework import viewsets
+from django.core.cache import caches
+from django.utils.http import parse_etags
+from rest_framework import viewsets, status, serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from .models import*
 from .serializers import*
+from .cache import CACHE_ALIAS, CACHE_TIMEOUT, master_rows, master_revision, refresh_local
 
 
 
-class CompanyViewSet(viewsets.ModelViewSet):
+class MasterViewSet(viewsets.ModelViewSet):
+    # Lookup tables are small and loaded whole into dropdowns, so they stay
+    # unpaginated and are listed from master.cache.
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        rows = list(master_rows(self.queryset.model).values())
+        return Response(self.get_serializer(rows, many=True).data)
+
+
+class CompanyViewSet(MasterViewSet):
     queryset = Company.objects.all()
     serializer_class = CompanySerializer
 
     
-class CostCategoryViewSet(viewsets.ModelViewSet):
+class CostCategoryViewSet(MasterViewSet):
     queryset = CostCategory.objects.all()
     serializer_class = CostCategorySerializer
 
     
-class SourceCategoryViewSet(viewsets.ModelViewSet):
+class SourceCategoryViewSet(MasterViewSet):
     queryset = SourceCategory.objects.all()
     serializer_class = SourceCategorySerializer
 
     
-class PaymentModeViewSet(viewsets.ModelViewSet):
+class PaymentModeViewSet(MasterViewSet):
     queryset = PaymentMode.objects.all()
     serializer_class = PaymentModeSerializer
 
 
 
-class DivisionMasterViewSet(viewsets.ModelViewSet):
+class DivisionMasterViewSet(MasterViewSet):
     queryset = DivisionMaster.objects.all()
     serializer_class = DivisionMasterSerializer
 
 
-class DistrictMasterViewSet(viewsets.ModelViewSet):
+class DistrictMasterViewSet(MasterViewSet):
     queryset = DistrictMaster.objects.all()
     serializer_class = DistrictMasterSerializer
 
 
-class CountryMasterViewSet(viewsets.ModelViewSet):
+class CountryMasterViewSet(MasterViewSet):
     queryset = CountryMaster.objects.all()
     serializer_class = CountryMasterSerializer
 
 
-class SupplierTypeMasterViewSet(viewsets.ModelViewSet):
+class SupplierTypeMasterViewSet(MasterViewSet):
     queryset = SupplierTypeMaster.objects.all()
     serializer_class = SupplierTypeMasterSerializer
 
 
 
-class BankCategoryMasterViewSet(viewsets.ModelViewSet):
+class BankCategoryMasterViewSet(MasterViewSet):
     queryset = BankCategoryMaster.objects.all()
     serializer_class = BankCategoryMasterSerializer
     
 
-class BankMasterViewSet(viewsets.ModelViewSet):
+class BankMasterViewSet(MasterViewSet):
     queryset = BankMaster.objects.all()
     serializer_class = BankMasterSerializer
 
 
 
-class AccountCategoryViewSet(viewsets.ModelViewSet):
+class AccountCategoryViewSet(MasterViewSet):
     queryset = AccountCategory.objects.all()
     serializer_class = AccountCategorySerializer
 
 
-class BankAccountViewSet(viewsets.ModelViewSet):
+class BankAccountViewSet(MasterViewSet):
     queryset = BankAccount.objects.all()
-    serializer_class = BankAccountSerializer
\ No newline at end of file
+    serializer_class = BankAccountSerializer
+
+
+
+# ----------------------------
+# Bootstrap
+# ----------------------------
+# key in the response -> (model, serializer), one per master endpoint
+BOOTSTRAP_TABLES = {
+    'companies': (Company, CompanySerializer),
+    'cost_categories': (CostCategory, CostCategorySerializer),
+    'source_categories': (SourceCategory, SourceCategorySerializer),
+    'payment_modes': (PaymentMode, PaymentModeSerializer),
+    'divisions': (DivisionMaster, DivisionMasterSerializer),
+    'districts': (DistrictMaster, DistrictMasterSerializer),
+    'countries': (CountryMaster, CountryMasterSerializer),
+    'supplier_types': (SupplierTypeMaster, SupplierTypeMasterSerializer),
+    'bank_categories': (BankCategoryMaster, BankCategoryMasterSerializer),
+    'banks': (BankMaster, BankMasterSerializer),
+    'account_categories': (AccountCategory, AccountCategorySerializer),
+    'bank_accounts': (BankAccount, BankAccountSerializer),
+}
+
+
+class MasterBootstrapView(APIView):
+    """
+    Every master table in one response for client start-up. The ETag is the
+    master revision (master.cache.master_revision): sending it back in
+    If-None-Match answers 304 Not Modified until a master row changes.
+    """
+
+    def get(self, request):
+        revision = master_revision()
+        etag = f'"master-{revision}"'
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        payload = self.payload(revision)
+        # file URLs are cached relative, so one payload serves every host
+        for name, fields in self.file_fields().items():
+            payload[name] = [
+                {**row, **{field: request.build_absolute_uri(row[field]) for field in fields if row[field]}}
+                for row in payload[name]
+            ]
+        return Response({'version': revision, **payload}, headers=headers)
+
+    def payload(self, revision):
+        cache = caches[CACHE_ALIAS]
+        key = f"master:bootstrap:{revision}"
+        payload = cache.get(key)
+        if payload is None:
+            # the first build of a revision here: tables this process read
+            # may predate it
+            refresh_local()
+            payload = {
+                name: list(serializer(list(master_rows(model).values()), many=True).data)
+                for name, (model, serializer) in BOOTSTRAP_TABLES.items()
+            }
+            cache.set(key, payload, timeout=CACHE_TIMEOUT)
+        return payload
+
+    def file_fields(self):
+        """{table: [file or image field, ...]} for the tables that have any."""
+        tables = {}
+        for name, (model, serializer) in BOOTSTRAP_TABLES.items():
+            fields = [field_name for field_name, field in serializer().fields.items()
+                      if isinstance(field, serializers.FileField)]
+            if fields:
+                tables[name] = fields
+        return tables
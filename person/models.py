@@ -1,7 +1,8 @@
 
-from django.db import models
+from django.db import models, transaction
 from rest_framework.permissions import BasePermission
 from master.models import*
+from master.sequences import reserve
 
 class IsStaffOrAdmin(BasePermission):
     def has_permission(self, request, view):
@@ -74,17 +75,22 @@ class Employee(models.Model):
     created_at = models.DateTimeField(blank=True, null=True, auto_now_add=True)
 
 
+    @staticmethod
+    def last_employee_number():
+        last = 0
+        for code in Employee.objects.filter(employee_code__startswith="FA").values_list('employee_code', flat=True):
+            try:
+                last = max(last, int(code.replace("FA", "")))
+            except ValueError:
+                pass
+        return last
+
     def save(self, *args, **kwargs):
-        if not self.employee_code:
-            last_employee = Employee.objects.order_by('-id').first()
-            last_number = 0
-            if last_employee and last_employee.employee_code and last_employee.employee_code.startswith("FA"):
-                try:
-                    last_number = int(last_employee.employee_code.replace("FA", ""))
-                except:
-                    pass
-            self.employee_code = f"FA{last_number + 1:03d}"
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.employee_code:
+                next_number = reserve("FA", initial=Employee.last_employee_number)
+                self.employee_code = f"FA{next_number:03d}"
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.employee_name
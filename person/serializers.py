@@ -75,7 +75,7 @@ class CustomerSerializer(serializers.ModelSerializer):
 
        
 class SupplierSerializer(serializers.ModelSerializer):
-    supplier_type_detail = SupplierTypeMasterSerializer(source='supplier_type', read_only=True)
+    supplier_type_detail = MasterDetailField(SupplierTypeMasterSerializer, source='supplier_type')
 
     class Meta:
         model = Supplier
@@ -41,6 +41,7 @@ class EmployeeAttendanceViewSet(viewsets.ModelViewSet):
     queryset = EmployeeAttendance.objects.all().order_by("-date")
     serializer_class = EmployeeAttendanceSerializer
     permission_classes = [IsStaffOrAdmin]
+    cursor_ordering = ('-date', '-id')
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -184,22 +185,26 @@ class EmployeeSalarySummary(APIView):
 class SupplierViewSet(viewsets.ModelViewSet):
     queryset = Supplier.objects.all().order_by('-created_at')
     serializer_class = SupplierSerializer
+    cursor_ordering = ('-created_at', '-id')
 
 
 
 class CustomerViewSet(viewsets.ModelViewSet):
     queryset = Customer.objects.all().order_by('-created_at')
     serializer_class = CustomerSerializer
+    cursor_ordering = ('-created_at', '-id')
     permission_classes = [IsStaffOrAdmin]
 
 
 class BorrowerViewSet(viewsets.ModelViewSet):
     queryset = Borrower.objects.all().order_by('-created_at')
     serializer_class = BorrowerSerializer
+    cursor_ordering = ('-created_at', '-id')
     permission_classes = [IsStaffOrAdmin]
 
 
 class OweViewSet(viewsets.ModelViewSet): 
     queryset = Owed.objects.all().order_by('-created_at')
     serializer_class = OweSerializer
+    cursor_ordering = ('-created_at', '-id')
     permission_classes = [IsStaffOrAdmin]
\ No newline at end of file
@@ -5,3 +5,4 @@ admin.site.register(ProductCategory)
 admin.site.register(Product)
 admin.site.register(StockProduct)
 admin.site.register(BikeModel)
+admin.site.register(StockMovement)
@@ -1,9 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProductConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'product'
 
+    def ready(self):
+        from . import signals
+        from .search import install_search_index
+        post_migrate.connect(install_search_index, sender=self)
+
 
     
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from django.conf import settings
+from django.db import transaction
+from .models import Product, StockProduct, normalize_part_no
+
+
+# ----------------------------
+# Part number lookup (POS)
+# ----------------------------
+# Scanned part numbers are answered from a per-process LRU keyed on the
+# normalized part number: a hit costs no query, a miss costs two (products,
+# then their stock rows) for all missing parts together. Entries are dropped
+# when a product or its stock changes in this process, after commit; writes
+# made by other worker processes are picked up when the entry expires
+# (POS_LOOKUP_CACHE_TTL). Sales re-check stock under lock, so a briefly
+# stale quantity on the counter screen can't oversell.
+
+CACHE_TTL = getattr(settings, "POS_LOOKUP_CACHE_TTL", 30)
+CACHE_SIZE = getattr(settings, "POS_LOOKUP_CACHE_SIZE", 5000)
+
+PRODUCT_FIELDS = ["id", "part_no", "part_no_normalized", "product_name", "company", "brand_name", "model_no", "unit", "product_mrp"]
+STOCK_FIELDS = ["id", "product_id", "company_name", "current_stock_quantity", "sale_price"]
+
+_lock = threading.Lock()
+# normalized part_no -> (expires at, [product entry, ...])
+_entries = OrderedDict()
+# product id -> normalized part numbers whose entry lists it
+_keys_by_product = defaultdict(set)
+# bumped by every invalidation; a load that overlapped one isn't stored
+_generation = 0
+
+
+def lookup_parts(part_nos):
+    """
+    {normalized part_no: [product with its stock rows, ...]} for every
+    requested part number. The lists are shared with the cache; don't modify them.
+    """
+    keys = {normalize_part_no(part_no) for part_no in part_nos} - {""}
+    now = time.monotonic()
+
+    found = {}
+    with _lock:
+        for key in keys:
+            cached = _entries.get(key)
+            if cached and cached[0] > now:
+                _entries.move_to_end(key)
+                found[key] = cached[1]
+        generation = _generation
+
+    missing = keys - found.keys()
+    if missing:
+        loaded = _load(missing)
+        with _lock:
+            if generation == _generation:
+                for key in missing:
+                    _store(key, loaded[key], now + CACHE_TTL)
+        found.update(loaded)
+    return found
+
+
+def _load(keys):
+    loaded = {key: [] for key in keys}
+    products = {}
+    for product in Product.objects.filter(part_no_normalized__in=keys).order_by("id").values(*PRODUCT_FIELDS):
+        product["product_mrp"] = str(product["product_mrp"])
+        product["stock"] = []
+        product["current_stock_quantity"] = 0
+        products[product["id"]] = product
+        loaded[product.pop("part_no_normalized")].append(product)
+
+    for stock in StockProduct.objects.filter(product_id__in=list(products)).order_by("id").values(*STOCK_FIELDS):
+        product = products[stock.pop("product_id")]
+        stock["sale_price"] = str(stock["sale_price"])
+        product["stock"].append(stock)
+        product["current_stock_quantity"] += stock["current_stock_quantity"]
+    return loaded
+
+
+def _store(key, products, expires):
+    _discard(key)
+    _entries[key] = (expires, products)
+    for product in products:
+        _keys_by_product[product["id"]].add(key)
+    while len(_entries) > CACHE_SIZE:
+        _discard(next(iter(_entries)))
+
+
+def _discard(key):
+    cached = _entries.pop(key, None)
+    if cached:
+        for product in cached[1]:
+            keys = _keys_by_product.get(product["id"])
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del _keys_by_product[product["id"]]
+
+
+def invalidate(product_ids=(), part_nos=()):
+    """Drop the entries listing these products or part numbers once the transaction commits."""
+    product_ids = set(product_ids)
+    keys = {normalize_part_no(part_no) for part_no in part_nos}
+
+    def drop():
+        global _generation
+        with _lock:
+            _generation += 1
+            for product_id in product_ids:
+                keys.update(_keys_by_product.get(product_id, ()))
+            for key in keys:
+                _discard(key)
+
+    transaction.on_commit(drop)
+
+
+def clear():
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.clear()
+        _keys_by_product.clear()
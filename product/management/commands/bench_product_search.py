@@ -0,0 +1,100 @@
+import random
+import string
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from product.models import Product, normalize_part_no
+from product.search import search_products, has_fts
+
+
+NAME_WORDS = [
+    "engine", "gasket", "brake", "shoe", "clutch", "plate", "chain", "sprocket", "piston", "ring",
+    "cable", "lever", "filter", "bearing", "seal", "mirror", "indicator", "horn", "spark", "plug",
+]
+BIKE_MODELS = ["Glamour", "Splendor", "Pulsar", "Discover", "Apache", "Gixxer", "FZ", "CB Shine"]
+BRANDS = ["Hero", "Honda", "Bajaj", "TVS", "Suzuki", "Yamaha"]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ?search= on the products list before (icontains over every column) "
+        "and after (product.search) on a seeded catalog. Everything is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=200_000, help="Catalog size to seed.")
+        parser.add_argument("--repeat", type=int, default=10, help="Runs per query; the best time is reported.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                sample = self.seed(options["products"])
+                self.report(sample, options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        self.stdout.write(f"Seeding {count} products...")
+        rng = random.Random(42)
+        products = []
+        for i in range(count):
+            part_no = f"{rng.randint(10000, 99999)}-{''.join(rng.choices(string.ascii_uppercase, k=3))}-{rng.randint(100, 999)}"
+            products.append(Product(
+                company=rng.choice(BRANDS),
+                product_name=f"{rng.choice(BIKE_MODELS)} {rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)}",
+                part_no=part_no,
+                part_no_normalized=normalize_part_no(part_no),
+                brand_name=rng.choice(BRANDS),
+                model_no=f"M{rng.randint(1, 500)}",
+            ))
+        Product.objects.bulk_create(products, batch_size=2000)
+        return rng.choice(products)
+
+    def terms(self, sample):
+        return [
+            ("exact part no", sample.part_no),
+            ("part no, no dashes", sample.part_no_normalized),
+            ("part no prefix", sample.part_no[:7]),
+            ("one word", "gasket"),
+            ("two words", "glam brake"),
+            ("no match", "zzqx"),
+        ]
+
+    def old_search(self, term):
+        # what DRF's SearchFilter built from the old search_fields
+        queryset = Product.objects.all()
+        for word in term.split():
+            queryset = queryset.filter(
+                Q(product_name__icontains=word) | Q(part_no__icontains=word)
+                | Q(brand_name__icontains=word) | Q(model_no__icontains=word)
+            )
+        return queryset.order_by("-created_at", "-id")
+
+    def best_ms(self, queryset, repeat):
+        best = None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            list(queryset[:50])
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def report(self, sample, repeat):
+        index = "FTS5" if has_fts(connection.alias) else ("pg_trgm" if connection.vendor == "postgresql" else "none")
+        self.stdout.write(f"backend: {connection.vendor}, search index: {index}")
+        self.stdout.write(f"{'term':22} {'query':16} {'hits':>7} {'before ms':>10} {'after ms':>9} {'speedup':>8}")
+        for label, term in self.terms(sample):
+            before = self.old_search(term)
+            after = search_products(Product.objects.all(), term)
+            before_ms = self.best_ms(before, repeat)
+            after_ms = self.best_ms(after, repeat)
+            speedup = before_ms / after_ms if after_ms else 0
+            self.stdout.write(
+                f"{label:22} {term[:16]:16} {after.count():7d} {before_ms:10.2f} {after_ms:9.2f} {speedup:7.1f}x"
+            )
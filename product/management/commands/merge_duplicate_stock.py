@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from product.models import StockProduct, StockMovement
+
+
+MERGED_FIELDS = [
+    "purchase_quantity",
+    "sale_quantity",
+    "damage_quantity",
+    "current_stock_quantity",
+    "current_stock_value",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge StockProduct rows that share (company_name, part_no) into the oldest one. "
+        "Run before migrating the unique_stock_company_part constraint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only list the duplicate groups.")
+
+    def handle(self, *args, **options):
+        groups = list(
+            StockProduct.objects
+            .values("company_name", "part_no")
+            .annotate(rows=Count("id"))
+            .filter(rows__gt=1)
+            .order_by("company_name", "part_no")
+        )
+
+        for group in groups:
+            self.stdout.write(f"{group['company_name']} / {group['part_no']}: {group['rows']} rows")
+        if options["dry_run"] or not groups:
+            self.stdout.write(f"{len(groups)} duplicate groups.")
+            return
+
+        with transaction.atomic():
+            for group in groups:
+                rows = list(
+                    StockProduct.objects
+                    .select_for_update()
+                    .filter(company_name=group["company_name"], part_no=group["part_no"])
+                    .order_by("id")
+                )
+                keeper, extra = rows[0], rows[1:]
+                for field in MERGED_FIELDS:
+                    setattr(keeper, field, sum(getattr(row, field) for row in rows))
+                keeper.save(update_fields=MERGED_FIELDS)
+
+                StockMovement.objects.filter(stock__in=extra).update(stock=keeper)
+                StockProduct.objects.filter(pk__in=[row.pk for row in extra]).delete()
+
+        self.stdout.write(self.style.SUCCESS(f"Merged {len(groups)} duplicate groups."))
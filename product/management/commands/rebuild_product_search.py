@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from product.models import Product, normalize_part_no
+from product.search import install_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill Product.part_no_normalized for existing rows and rebuild the product "
+        "search index (FTS5 table on SQLite, trigram indexes on PostgreSQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        updated = 0
+        with transaction.atomic():
+            pending = []
+            for product in Product.objects.only("id", "part_no", "part_no_normalized").iterator(chunk_size=batch_size):
+                normalized = normalize_part_no(product.part_no)
+                if product.part_no_normalized != normalized:
+                    product.part_no_normalized = normalized
+                    pending.append(product)
+                if len(pending) >= batch_size:
+                    Product.objects.bulk_update(pending, ["part_no_normalized"])
+                    updated += len(pending)
+                    pending = []
+            Product.objects.bulk_update(pending, ["part_no_normalized"])
+            updated += len(pending)
+
+            install_search_index()
+            rebuild_search_index()
+
+        self.stdout.write(self.style.SUCCESS(f"Normalized {updated} part numbers; search index rebuilt."))
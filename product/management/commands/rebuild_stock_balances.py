@@ -0,0 +1,107 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum, Q, Value, DecimalField
+from django.db.models.functions import Coalesce
+from product.models import StockProduct, StockMovement
+from product.services import movement, stock_key, journal
+
+
+BALANCE_FIELDS = [
+    "purchase_quantity",
+    "sale_quantity",
+    "damage_quantity",
+    "current_stock_quantity",
+    "current_stock_value",
+]
+
+OPENING_REFERENCE = "Opening balance"
+
+
+class Command(BaseCommand):
+    help = "Rebuild StockProduct balances from the StockMovement journal in one streaming pass."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed-opening",
+            action="store_true",
+            help="First journal the current balance of every stock row that has no movements yet.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        with transaction.atomic():
+            if options["seed_opening"]:
+                seeded = self.seed_opening(batch_size)
+                self.stdout.write(f"Seeded opening balances for {seeded} stock rows.")
+
+            rebuilt = self.rebuild(batch_size)
+
+        missing = StockProduct.objects.filter(movements__isnull=True).count()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} stock balances."))
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f"{missing} stock rows have no journal entries and were left as they are; "
+                f"run with --seed-opening to journal them."
+            ))
+
+    def seed_opening(self, batch_size):
+        """
+        Journal each unjournaled stock row so a rebuild reproduces it exactly:
+        its counters as purchase/sale/damage movements and the remainder
+        (returns, clamped legacy updates) plus the stock value as an opening movement.
+        """
+        stocks = StockProduct.objects.filter(movements__isnull=True).order_by("id")
+        seeded = 0
+        pending = []
+
+        for stock in stocks.iterator(chunk_size=batch_size):
+            key = stock_key(stock)
+            residual = (
+                stock.current_stock_quantity
+                - stock.purchase_quantity + stock.sale_quantity + stock.damage_quantity
+            )
+            for movement_type, quantity, value in (
+                ("purchase", stock.purchase_quantity, 0),
+                ("sale", -stock.sale_quantity, 0),
+                ("damage", -stock.damage_quantity, 0),
+                ("opening", residual, stock.current_stock_value),
+            ):
+                if quantity or value:
+                    pending.append(movement(key, movement_type, quantity, value, reference=OPENING_REFERENCE))
+            seeded += 1
+
+            if len(pending) >= batch_size:
+                journal(pending)
+                pending = []
+
+        journal(pending)
+        return seeded
+
+    def rebuild(self, batch_size):
+        zero_value = Value(0, output_field=DecimalField(max_digits=14, decimal_places=2))
+        totals = (
+            StockMovement.objects
+            .order_by("stock_id")
+            .values("stock_id")
+            .annotate(
+                purchase_quantity=Coalesce(Sum("quantity", filter=Q(movement_type__in=["purchase", "upload"])), 0),
+                sale_quantity=Coalesce(-Sum("quantity", filter=Q(movement_type="sale")), 0),
+                damage_quantity=Coalesce(-Sum("quantity", filter=Q(movement_type="damage")), 0),
+                current_stock_quantity=Coalesce(Sum("quantity"), 0),
+                current_stock_value=Coalesce(Sum("value"), zero_value),
+            )
+        )
+
+        rebuilt = 0
+        pending = []
+        for row in totals.iterator(chunk_size=batch_size):
+            pending.append(StockProduct(pk=row["stock_id"], **{f: row[f] for f in BALANCE_FIELDS}))
+            if len(pending) >= batch_size:
+                StockProduct.objects.bulk_update(pending, BALANCE_FIELDS)
+                rebuilt += len(pending)
+                pending = []
+
+        StockProduct.objects.bulk_update(pending, BALANCE_FIELDS)
+        return rebuilt + len(pending)
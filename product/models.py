@@ -1,3 +1,4 @@
+import re
 from django.db import models
 from django.utils import timezone
 from person.models import Supplier
@@ -6,6 +7,11 @@ from django.utils.timezone import now
 from django.utils.text import slugify
 
 
+def normalize_part_no(part_no):
+    """Upper case with separators dropped: "13101-kwp 900" -> "13101KWP900"."""
+    return re.sub(r"[^0-9A-Z]", "", (part_no or "").upper())
+
+
 class ProductCategory(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='product_categories')
     category_name = models.CharField(max_length=255)
@@ -19,7 +25,9 @@ class Product(models.Model):
     company = models.CharField(max_length=100, blank=True, null= True)
     category = models.ForeignKey("ProductCategory", on_delete=models.CASCADE, related_name='products', blank=True, null = True)
     product_name = models.CharField(max_length=100)  
-    part_no = models.CharField(max_length=100)
+    part_no = models.CharField(max_length=100, db_index=True)
+    # exact and prefix lookups for search and scanning; set on save
+    part_no_normalized = models.CharField(max_length=100, db_index=True, blank=True, editable=False)
     image = models.ImageField(upload_to='product_images/', blank=True, null=True)
     brand_name = models.CharField(max_length=100, blank=True, null=True) 
     model_no = models.CharField(max_length=100, blank=True, null=True)
@@ -29,6 +37,12 @@ class Product(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     remarks = models.TextField(blank=True,null=True)
     
+    def save(self, *args, **kwargs):
+        self.part_no_normalized = normalize_part_no(self.part_no)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "part_no" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "part_no_normalized"}
+        super().save(*args, **kwargs)
    
     def __str__(self):
         return f"{self.company}  - {self.product_name} - {self.part_no}"
@@ -78,6 +92,54 @@ class StockProduct(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # sale lines and sale returns find their stock row by product
+            models.Index(fields=["product", "part_no"]),
+        ]
+        constraints = [
+            # purchases find their stock row by company and part; one row each
+            models.UniqueConstraint(fields=["company_name", "part_no"], name="unique_stock_company_part"),
+        ]
+
     def __str__(self):
         return f"{self.product.product_name} - {self.part_no}"
 
+
+
+
+class StockMovement(models.Model):
+    MOVEMENT_TYPES = [
+        ("opening", "Opening Balance"),
+        ("purchase", "Purchase"),
+        ("upload", "Stock Upload"),
+        ("sale", "Sale"),
+        ("sale_return", "Sale Return"),
+        ("purchase_return", "Purchase Return"),
+        ("damage", "Damage"),
+        ("adjustment", "Stock Count Adjustment"),
+    ]
+
+    stock = models.ForeignKey(StockProduct, on_delete=models.CASCADE, related_name="movements")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    company_name = models.CharField(max_length=255)
+    part_no = models.CharField(max_length=100)
+    movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPES)
+
+    # signed change to current_stock_quantity / current_stock_value
+    quantity = models.IntegerField()
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+
+    reference = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["stock", "created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.part_no} {self.movement_type} {self.quantity}"
@@ -0,0 +1,154 @@
+import logging
+import re
+from django.db import connections, transaction, DatabaseError
+from django.db.models import Q, Case, When, Value, IntegerField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+from .models import Product, normalize_part_no
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Product search
+# ----------------------------
+# A term matches a product when its normalized part number starts with the
+# normalized term, or when every word of the term starts a word of the name,
+# part number, brand or model number. Results are ranked exact part number,
+# part number prefix, name prefix, then the rest.
+#
+# SQLite answers the word matches from an FTS5 table (product_search) kept
+# in step with product_product by triggers, so saves, bulk_create and
+# queryset updates all reach it. PostgreSQL uses pg_trgm indexes on the
+# upper-cased columns, which serve Django's icontains. Both are installed
+# after migrate; rebuild_product_search backfills an existing catalog.
+
+SEARCH_COLUMNS = ["product_name", "part_no", "part_no_normalized", "brand_name", "model_no"]
+
+SQLITE_FTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+        {", ".join(SEARCH_COLUMNS)},
+        content='product_product', content_rowid='id', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_search_insert AFTER INSERT ON product_product BEGIN
+        INSERT INTO product_search(rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES (new.id, {", ".join(f"new.{c}" for c in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_search_delete AFTER DELETE ON product_product BEGIN
+        INSERT INTO product_search(product_search, rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join(f"old.{c}" for c in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_search_update AFTER UPDATE ON product_product BEGIN
+        INSERT INTO product_search(product_search, rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join(f"old.{c}" for c in SEARCH_COLUMNS)});
+        INSERT INTO product_search(rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES (new.id, {", ".join(f"new.{c}" for c in SEARCH_COLUMNS)});
+    END""",
+]
+
+POSTGRES_TRIGRAM = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    *(
+        f"CREATE INDEX IF NOT EXISTS product_{column}_trgm ON product_product "
+        f"USING gin (UPPER({column}) gin_trgm_ops)"
+        for column in ["product_name", "part_no", "brand_name", "model_no"]
+    ),
+]
+
+_fts_ready = {}
+
+
+def install_search_index(using="default", **kwargs):
+    """post_migrate hook: create the backend's search index if it is missing."""
+    connection = connections[using]
+    if Product._meta.db_table not in connection.introspection.table_names():
+        return
+    try:
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                if connection.vendor == "sqlite":
+                    created = "product_search" not in connection.introspection.table_names(cursor)
+                    for statement in SQLITE_FTS:
+                        cursor.execute(statement)
+                    if created:
+                        cursor.execute("INSERT INTO product_search(product_search) VALUES ('rebuild')")
+                elif connection.vendor == "postgresql":
+                    for statement in POSTGRES_TRIGRAM:
+                        cursor.execute(statement)
+    except DatabaseError as e:
+        # e.g. SQLite built without FTS5, or no rights to create pg_trgm
+        logger.warning("Product search index not installed (%s); search falls back to table scans.", e)
+    _fts_ready.pop(using, None)
+
+
+def rebuild_search_index(using="default"):
+    """Repopulate the SQLite FTS table from product_product."""
+    connection = connections[using]
+    if connection.vendor == "sqlite" and has_fts(using):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO product_search(product_search) VALUES ('rebuild')")
+
+
+def has_fts(using):
+    if using not in _fts_ready:
+        connection = connections[using]
+        _fts_ready[using] = (
+            connection.vendor == "sqlite"
+            and "product_search" in connection.introspection.table_names()
+        )
+    return _fts_ready[using]
+
+
+def fts_query(words, normalized):
+    """FTS5 MATCH expression: a part number prefix, or every word as a prefix."""
+    quote = lambda token: '"' + token.replace('"', '""') + '"*'
+    options = []
+    if normalized:
+        options.append(f"part_no_normalized : {quote(normalized)}")
+    if words:
+        options.append("(" + " AND ".join(quote(word) for word in words) + ")")
+    return " OR ".join(options)
+
+
+def search_products(queryset, term):
+    """Filter `queryset` to products matching `term`, annotated with search_rank (0 is best)."""
+    term = (term or "").strip()
+    # the same word split as FTS5's unicode61 tokenizer
+    words = re.findall(r"[^\W_]+", term)
+    normalized = normalize_part_no(term)
+    if not words and not normalized:
+        return queryset.annotate(search_rank=Value(3, output_field=IntegerField()))
+
+    using = queryset.db
+    if has_fts(using):
+        matches = Q(pk__in=RawSQL(
+            "SELECT rowid FROM product_search WHERE product_search MATCH %s",
+            [fts_query(words, normalized)],
+        ))
+    else:
+        matches = Q(part_no_normalized__startswith=normalized) if normalized else Q()
+        if words:
+            every_word = Q()
+            for word in words:
+                every_word &= (
+                    Q(product_name__icontains=word) | Q(part_no__icontains=word)
+                    | Q(brand_name__icontains=word) | Q(model_no__icontains=word)
+                )
+            matches = matches | every_word if normalized else every_word
+
+    ranks = [When(product_name__istartswith=term, then=Value(2))]
+    if normalized:
+        ranks[:0] = [
+            When(part_no_normalized=normalized, then=Value(0)),
+            When(part_no_normalized__startswith=normalized, then=Value(1)),
+        ]
+    rank = Case(*ranks, default=Value(3), output_field=IntegerField())
+    return queryset.filter(matches).annotate(search_rank=rank).order_by("search_rank", "part_no_normalized", "id")
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """?search= backed by search_products instead of icontains over every column."""
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, "")
+        return search_products(queryset, term.replace("\x00", ""))
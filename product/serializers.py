@@ -1,15 +1,18 @@
 from .models import *
 from rest_framework import serializers
-from master.serializers import CompanySerializer
+from django.db import transaction
+from master.serializers import CompanySerializer, MasterDetailField
+from FirozAuto_Backend.fieldsets import SparseFieldsMixin
 from person.models import Supplier
 from person.serializers import SupplierSerializer
+from .services import record_adjustment
 
 
 # ----------------------------
 # Category Serializer
 # ----------------------------
-class ProductCategorySerializer(serializers.ModelSerializer):
-    company_detail = CompanySerializer(source='company', read_only=True)
+class ProductCategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    company_detail = MasterDetailField(CompanySerializer, source='company')
 
     class Meta:
         model = ProductCategory
@@ -19,8 +22,8 @@ class ProductCategorySerializer(serializers.ModelSerializer):
 # ----------------------------
 # Bike Model Serializer
 # ----------------------------
-class BikeModelSerializer(serializers.ModelSerializer):
-    company_detail = CompanySerializer(source="company", read_only=True)
+class BikeModelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    company_detail = MasterDetailField(CompanySerializer, source="company")
 
     class Meta:
         model = BikeModel
@@ -30,7 +33,7 @@ class BikeModelSerializer(serializers.ModelSerializer):
 # ----------------------------
 # Product Serializer
 # ----------------------------
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category_detail = ProductCategorySerializer(source='category', read_only=True)
     bike_model_detail = BikeModelSerializer(source="bike_model", read_only=True)
 
@@ -43,10 +46,46 @@ class ProductSerializer(serializers.ModelSerializer):
 # ----------------------------
 # Stock Serializer
 # ----------------------------
-class StockSerializer(serializers.ModelSerializer):
+class StockSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
 
+    # Balances move only through product.services, which journals every
+    # change: on update the counters are read-only and a new
+    # current_stock_quantity is booked as a stock count adjustment.
+    BALANCE_FIELDS = ['purchase_quantity', 'sale_quantity', 'damage_quantity', 'current_stock_value']
+
     class Meta:
         model = StockProduct
         fields = '__all__'
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            for name in self.BALANCE_FIELDS:
+                if name in fields:
+                    fields[name].read_only = True
+        return fields
+
+    def update(self, instance, validated_data):
+        quantity = validated_data.pop('current_stock_quantity', None)
+        with transaction.atomic():
+            for name, value in validated_data.items():
+                setattr(instance, name, value)
+            if validated_data:
+                # only the edited columns, so concurrent stock moves aren't overwritten
+                instance.save(update_fields=list(validated_data))
+            if quantity is not None:
+                record_adjustment(instance.pk, quantity, reference="Stock count")
+                instance.refresh_from_db()
+        return instance
+
+
+
+
+# ----------------------------
+# Stock Movement Serializer
+# ----------------------------
+class StockMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockMovement
+        fields = '__all__'
@@ -0,0 +1,204 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction, IntegrityError
+from django.db.models import F, Case, When
+from django.dispatch import Signal
+from .models import StockProduct, StockMovement
+
+
+# ----------------------------
+# Stock movements
+# ----------------------------
+# Every change to StockProduct quantities goes through these helpers. Each one
+# is a single UPDATE with F() expressions on the columns it changes, and stock
+# is only taken out with a `current_stock_quantity >= n` guard, so concurrent
+# counters cannot lose updates or drive stock negative.
+#
+# Each change is also written to the StockMovement journal. StockProduct is
+# the materialized balance of that journal (see rebuild_stock_balances).
+
+STOCK_KEY_FIELDS = ("pk", "product_id", "company_name", "part_no")
+
+# Sent after movements are journaled, with movements=[StockMovement, ...].
+# Movements are bulk created, so post_save does not fire for them.
+stock_moved = Signal()
+
+
+class InsufficientStock(Exception):
+    def __init__(self, message, shortages=None):
+        super().__init__(message)
+        # {(product_id, part_no): available quantity}
+        self.shortages = shortages or {}
+
+
+def _locate(queryset):
+    # Older data can hold duplicate stock rows; like the .first() lookups
+    # this replaces, only the oldest one is moved.
+    return queryset.order_by("id").values(*STOCK_KEY_FIELDS).first()
+
+
+def stock_key(stock):
+    return {field: getattr(stock, field) for field in STOCK_KEY_FIELDS}
+
+
+def movement(stock, movement_type, quantity, value=0, unit_price=None, reference=None):
+    return StockMovement(
+        stock_id=stock["pk"],
+        product_id=stock["product_id"],
+        company_name=stock["company_name"],
+        part_no=stock["part_no"],
+        movement_type=movement_type,
+        quantity=quantity,
+        value=value,
+        unit_price=unit_price,
+        reference=reference,
+    )
+
+
+def journal(movements):
+    StockMovement.objects.bulk_create(movements)
+    stock_moved.send(sender=StockMovement, movements=movements)
+
+
+def _take(stock, quantity, counter=None):
+    changes = {"current_stock_quantity": F("current_stock_quantity") - quantity}
+    if counter:
+        changes[counter] = F(counter) + quantity
+
+    queryset = StockProduct.objects.filter(pk=stock["pk"])
+    if not queryset.filter(current_stock_quantity__gte=quantity).update(**changes):
+        available = queryset.values_list("current_stock_quantity", flat=True).first()
+        raise InsufficientStock(f"Insufficient stock! Only {available} available.")
+
+
+def record_sale(product, part_no, quantity, reference=None):
+    stock = _locate(StockProduct.objects.filter(product=product, part_no=part_no))
+    if stock is None:
+        return
+    _take(stock, quantity, "sale_quantity")
+    journal([movement(stock, "sale", -quantity, reference=reference)])
+
+
+def record_sales(lines, reference=None):
+    """
+    Take stock for a whole sale at once. `lines` are (product_id, part_no,
+    quantity) tuples. The stock rows are read and locked in one query, every
+    short line is reported together, and all rows move in one UPDATE.
+    """
+    wanted = defaultdict(int)
+    for product_id, part_no, quantity in lines:
+        wanted[(product_id, part_no)] += quantity
+    if not wanted:
+        return
+
+    stocks = {}
+    locked = (
+        StockProduct.objects
+        .select_for_update()
+        .filter(product_id__in={k[0] for k in wanted}, part_no__in={k[1] for k in wanted})
+        .order_by("id")
+        .values(*STOCK_KEY_FIELDS, "current_stock_quantity")
+    )
+    for stock in locked:
+        stocks.setdefault((stock["product_id"], stock["part_no"]), stock)
+
+    shortages = {
+        key: stocks[key]["current_stock_quantity"]
+        for key, quantity in wanted.items()
+        if key in stocks and stocks[key]["current_stock_quantity"] < quantity
+    }
+    if shortages:
+        raise InsufficientStock("Insufficient stock.", shortages)
+
+    moving = [(stocks[key], quantity) for key, quantity in wanted.items() if key in stocks]
+    if not moving:
+        return
+
+    StockProduct.objects.filter(pk__in=[stock["pk"] for stock, _ in moving]).update(
+        current_stock_quantity=Case(
+            *[When(pk=stock["pk"], then=F("current_stock_quantity") - quantity) for stock, quantity in moving]
+        ),
+        sale_quantity=Case(
+            *[When(pk=stock["pk"], then=F("sale_quantity") + quantity) for stock, quantity in moving]
+        ),
+    )
+    journal([movement(stock, "sale", -quantity, reference=reference) for stock, quantity in moving])
+
+
+def record_sale_return(product, part_no, quantity, reference=None):
+    stock = _locate(StockProduct.objects.filter(product=product, part_no=part_no))
+    if stock is None:
+        return
+    StockProduct.objects.filter(pk=stock["pk"]).update(
+        current_stock_quantity=F("current_stock_quantity") + quantity
+    )
+    journal([movement(stock, "sale_return", quantity, reference=reference)])
+
+
+def record_purchase(company_name, part_no, product, quantity, purchase_price, sale_price, reference=None):
+    quantity = int(quantity)
+    purchase_price = Decimal(purchase_price)
+    sale_price = Decimal(sale_price)
+    value = purchase_price * quantity
+
+    created = False
+    stock = _locate(StockProduct.objects.filter(company_name=company_name, part_no=part_no))
+    if stock is None:
+        try:
+            with transaction.atomic():
+                stock = stock_key(StockProduct.objects.create(
+                    company_name=company_name,
+                    part_no=part_no,
+                    product=product,
+                    purchase_quantity=quantity,
+                    current_stock_quantity=quantity,
+                    purchase_price=purchase_price,
+                    sale_price=sale_price,
+                    current_stock_value=value,
+                ))
+                created = True
+        except IntegrityError:
+            # a concurrent purchase created the (company_name, part_no) row first
+            stock = _locate(StockProduct.objects.filter(company_name=company_name, part_no=part_no))
+            if stock is None:
+                raise
+
+    if not created:
+        StockProduct.objects.filter(pk=stock["pk"]).update(
+            purchase_quantity=F("purchase_quantity") + quantity,
+            current_stock_quantity=F("current_stock_quantity") + quantity,
+            purchase_price=purchase_price,
+            sale_price=sale_price,
+            current_stock_value=F("current_stock_value") + value,
+        )
+
+    journal([movement(stock, "purchase", quantity, value, purchase_price, reference)])
+
+
+def record_purchase_return(company_name, product, part_no, quantity, reference=None):
+    stock = _locate(StockProduct.objects.filter(company_name=company_name, part_no=part_no, product=product))
+    if stock is None:
+        return
+    _take(stock, quantity)
+    journal([movement(stock, "purchase_return", -quantity, reference=reference)])
+
+
+def record_damage(stock_id, quantity):
+    stock = _locate(StockProduct.objects.filter(pk=stock_id))
+    _take(stock, quantity, "damage_quantity")
+    journal([movement(stock, "damage", -quantity)])
+
+
+def record_adjustment(stock_id, quantity, reference=None):
+    """Set a stock row's quantity to a counted `quantity`, journaling the difference."""
+    with transaction.atomic():
+        stock = (
+            StockProduct.objects.select_for_update().filter(pk=stock_id)
+            .values(*STOCK_KEY_FIELDS, "current_stock_quantity").first()
+        )
+        change = quantity - stock["current_stock_quantity"]
+        if not change:
+            return
+        StockProduct.objects.filter(pk=stock_id).update(current_stock_quantity=F("current_stock_quantity") + change)
+        journal([movement(stock, "adjustment", change, reference=reference)])
+
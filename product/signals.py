@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Product, StockProduct
+from .services import stock_moved
+from . import lookup
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def drop_product_lookup(sender, instance, **kwargs):
+    # by id for the part number it was cached under, by part number for a
+    # "not found" entry it now answers
+    lookup.invalidate(product_ids=[instance.pk], part_nos=[instance.part_no])
+
+
+@receiver(post_save, sender=StockProduct)
+@receiver(post_delete, sender=StockProduct)
+def drop_stock_lookup(sender, instance, **kwargs):
+    lookup.invalidate(product_ids=[instance.product_id])
+
+
+@receiver(stock_moved)
+def drop_moved_lookup(sender, movements, **kwargs):
+    # stock is moved with queryset updates, and uploads bulk create products
+    lookup.invalidate(
+        product_ids={movement.product_id for movement in movements},
+        part_nos={movement.part_no for movement in movements},
+    )
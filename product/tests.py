@@ -1,3 +1,113 @@
-from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from .models import Product, StockProduct, normalize_part_no
+from .services import record_damage, record_purchase
+from . import lookup
 
-# Create your tests here.
+
+class ProductSearchTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.exact = Product.objects.create(company="Hero", product_name="Glamour engine gasket", part_no="13101-KWP-900")
+        cls.longer = Product.objects.create(company="Hero", product_name="Piston ring", part_no="13101-KWP-9001")
+        cls.other = Product.objects.create(company="Honda", product_name="Brake shoe", part_no="BS-22", brand_name="Glamstar")
+
+    def search(self, term):
+        response = self.client.get(reverse('product-list'), {'search': term, 'paginate': 'false'})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_normalize_part_no(self):
+        self.assertEqual(normalize_part_no(" 13101-kwp 900 "), "13101KWP900")
+
+    def test_part_number_exact_match_ranks_first(self):
+        self.assertEqual(self.search("13101kwp900"), [self.exact.id, self.longer.id])
+
+    def test_part_number_prefix(self):
+        self.assertEqual(self.search("13101-kw"), [self.exact.id, self.longer.id])
+
+    def test_every_word_must_prefix_a_word(self):
+        self.assertEqual(self.search("glam gask"), [self.exact.id])
+        self.assertEqual(self.search("glam"), [self.exact.id, self.other.id])
+
+    def test_index_follows_updates(self):
+        self.other.product_name = "Clutch plate"
+        self.other.brand_name = None
+        self.other.save()
+        self.assertEqual(self.search("clutch"), [self.other.id])
+        self.assertEqual(self.search("brake"), [])
+
+
+class PartLookupTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(company="Hero", product_name="Brake shoe", part_no="BS-22")
+        cls.stock = StockProduct.objects.create(
+            company_name="Hero", part_no="BS-22", product=cls.product,
+            purchase_quantity=10, current_stock_quantity=10,
+            purchase_price=Decimal("80"), sale_price=Decimal("100"), current_stock_value=Decimal("800"),
+        )
+
+    def setUp(self):
+        # test transactions roll back without invalidating
+        lookup.clear()
+
+    def test_lookup_many_part_numbers(self):
+        response = self.client.get(reverse('product-lookup'), {'part_no': 'bs 22,NOPE-1'})
+        self.assertEqual(response.status_code, 200)
+        hit, miss = response.data['results']
+        self.assertEqual((hit['part_no'], hit['found']), ('bs 22', True))
+        self.assertEqual(hit['products'][0]['current_stock_quantity'], 10)
+        self.assertEqual(hit['products'][0]['stock'][0]['sale_price'], "100.00")
+        self.assertEqual((miss['part_no'], miss['found'], miss['products']), ('NOPE-1', False, []))
+
+    def test_cache_hit_and_invalidation(self):
+        lookup.lookup_parts(["BS-22"])
+        with self.assertNumQueries(0):
+            lookup.lookup_parts(["bs22"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record_damage(self.stock.pk, 3)
+        self.assertEqual(lookup.lookup_parts(["BS-22"])["BS22"][0]["current_stock_quantity"], 7)
+
+
+class StockJournalTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(company="Hero", product_name="Brake shoe", part_no="BS-22")
+
+    def create_stock(self):
+        record_purchase("Hero", "BS-22", self.product, 10, "80", "100", reference="PU1")
+        return StockProduct.objects.get(part_no="BS-22")
+
+    def assertRebuildKeeps(self, stock):
+        before = StockProduct.objects.filter(pk=stock.pk).values().get()
+        call_command('rebuild_stock_balances', stdout=StringIO())
+        self.assertEqual(StockProduct.objects.filter(pk=stock.pk).values().get(), before)
+
+    def test_quantity_edit_is_journaled_as_adjustment(self):
+        stock = self.create_stock()
+        url = reverse('stockproduct-detail', args=[stock.id])
+        response = self.client.patch(url, {'current_stock_quantity': 7, 'sale_quantity': 99, 'sale_price': "110"})
+        self.assertEqual(response.status_code, 200)
+
+        stock.refresh_from_db()
+        self.assertEqual((stock.current_stock_quantity, stock.sale_quantity, stock.sale_price), (7, 0, Decimal("110")))
+        self.assertEqual(stock.movements.latest('id').movement_type, "adjustment")
+        self.assertEqual(stock.movements.latest('id').quantity, -3)
+        self.assertRebuildKeeps(stock)
+
+    def test_movements_are_paginated(self):
+        stock = self.create_stock()
+        for _ in range(3):
+            record_damage(stock.pk, 1)
+        response = self.client.get(reverse('stockproduct-movements', args=[stock.id]), {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['count'], len(response.data['results'])), (4, 2))
+        self.assertEqual(response.data['quantity'], 7)
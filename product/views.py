@@ -4,7 +4,14 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import *
 from .serializers import *
+from .services import InsufficientStock, record_damage
+from .search import ProductSearchFilter
+from .lookup import lookup_parts
+from FirozAuto_Backend.fieldsets import SparseFieldsViewMixin
 from rest_framework.decorators import action
+from django.db.models import Sum
+from django.utils.dateparse import parse_date
+from FirozAuto_Backend.pagination import ReportPagination
 
 
 # ----------------------------
@@ -39,18 +46,16 @@ class BikeModelViewSet(viewsets.ModelViewSet):
 # ----------------------------
 # Product
 # ----------------------------
-class ProductViewSet(viewsets.ModelViewSet):
+LOOKUP_MAX_PARTS = 200
+
+
+class ProductViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Product.objects.select_related('category', 'bike_model').all()
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-
-    search_fields = [
-        'product_name',
-        'part_no',
-        'brand_name',
-        'model_no',
-    ]
+    # ?search= matches part numbers (exact or prefix) and words of
+    # product_name, part_no, brand_name and model_no; see product.search
+    filter_backends = [ProductSearchFilter, DjangoFilterBackend]
 
     filterset_fields = ['company', 'category', 'bike_model', 'model_no']
 
@@ -79,14 +84,53 @@ class ProductViewSet(viewsets.ModelViewSet):
 
         return qs
 
+    @action(detail=False, methods=['get', 'post'], url_path='lookup', pagination_class=None, filter_backends=[])
+    def lookup(self, request):
+        """
+        Scan lookup for the counter: products with their stock rows and sale
+        prices for one or many part numbers, matched after normalization.
+          - GET /products/lookup/?part_no=13101-KWP-900&part_no=BS-22
+          - POST /products/lookup/ {"part_nos": ["13101-KWP-900", "BS-22"]}
+        """
+        if request.method == 'POST':
+            part_nos = request.data.get('part_nos')
+        else:
+            part_nos = [p for value in request.query_params.getlist('part_no') for p in value.split(',')]
+
+        if not isinstance(part_nos, list) or not part_nos or not all(isinstance(p, str) for p in part_nos):
+            return Response(
+                {"error": "give one or more part numbers (part_no=... or part_nos: [...])"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(part_nos) > LOOKUP_MAX_PARTS:
+            return Response(
+                {"error": f"at most {LOOKUP_MAX_PARTS} part numbers per lookup"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        found = lookup_parts(part_nos)
+        results = []
+        for part_no in part_nos:
+            products = found.get(normalize_part_no(part_no), [])
+            results.append({"part_no": part_no, "found": bool(products), "products": products})
+        return Response({"results": results})
+
+    @property
+    def cursor_ordering(self):
+        # search results page in relevance order
+        if self.request and self.request.query_params.get('search', '').strip():
+            return ('search_rank', 'part_no_normalized', 'id')
+        return ('-created_at', '-id')
+
 
 
 # ----------------------------
 # Stock
 # ----------------------------
-class StockViewSet(viewsets.ModelViewSet):
+class StockViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = StockProduct.objects.all()
     serializer_class = StockSerializer
+    cursor_ordering = ('-created_at', '-id')
 
     @action(detail=True, methods=['patch'], url_path="set-damage-quantity")
     def set_damage_quantity(self, request, pk=None):
@@ -109,12 +153,51 @@ class StockViewSet(viewsets.ModelViewSet):
             )
 
         # Update the stock damage quantity
-        stock.current_stock_quantity = max(stock.current_stock_quantity - damage_qty, 0)
-        stock.damage_quantity += damage_qty
-        stock.save()
+        try:
+            record_damage(stock.pk, damage_qty)
+        except InsufficientStock as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        stock.refresh_from_db()
 
         return Response(
             {"message": "Damage quantity updated successfully", "data": StockSerializer(stock).data},
             status=status.HTTP_200_OK
         )
 
+
+    @action(detail=True, methods=['get'])
+    def movements(self, request, pk=None):
+        """
+        Journal of a stock row, a page at a time (?paginate=false for all of
+        it). With ?to_date=YYYY-MM-DD only movements up to that day are
+        listed and the balance on that date is returned.
+        """
+        stock = self.get_object()
+        movements = stock.movements.all().order_by('created_at', 'id')
+
+        to_date = request.query_params.get('to_date')
+        if to_date:
+            to_date = parse_date(to_date)
+            if not to_date:
+                return Response(
+                    {"error": "to_date must be YYYY-MM-DD"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            movements = movements.filter(created_at__date__lte=to_date)
+
+        balance = movements.aggregate(quantity=Sum('quantity'), value=Sum('value'))
+        summary = {
+            "stock": stock.id,
+            "to_date": to_date,
+            "quantity": balance['quantity'] or 0,
+            "value": balance['value'] or 0,
+        }
+
+        paginator = ReportPagination()
+        page = paginator.paginate_queryset(movements, request, view=self)
+        if page is not None:
+            response = paginator.get_paginated_response(StockMovementSerializer(page, many=True).data)
+            response.data.update(summary)
+            return response
+
+        return Response({**summary, "movements": StockMovementSerializer(movements, many=True).data})
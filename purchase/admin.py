@@ -8,6 +8,8 @@ admin.site.register(SupplierPurchase)
 admin.site.register(SupplierPurchaseReturn)
 admin.site.register(Purchase)
 admin.site.register(PurchaseItem)
+admin.site.register(UploadJob)
+admin.site.register(SupplierBalance)
 # Orders (minimal, same style)
 admin.site.register(Order)
 admin.site.register(OrderItem)
@@ -0,0 +1,129 @@
+from decimal import Decimal
+from django.db.models import Sum, F, ExpressionWrapper
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from person.models import Supplier
+from FirozAuto_Backend.ledgers import MONEY, ZERO, sum_per_row, aging_sums
+from .models import SupplierPurchase, PurchasePayment, SupplierPurchaseReturn, SupplierBalance
+
+
+# ----------------------------
+# Supplier payables
+# ----------------------------
+# Same scheme as sale.balances: SupplierBalance moves by F() deltas in the
+# transaction that changes a purchase, payment or return, and a missing row
+# is rebuilt from the source tables.
+
+def returned_value():
+    return F("quantity") * F("purchase_product__purchase_price")
+
+
+def annotate_purchase_totals(purchases):
+    return purchases.annotate(
+        paid_amount=sum_per_row(PurchasePayment.objects.all(), "purchase", "paid_amount"),
+        returned_amount=sum_per_row(SupplierPurchaseReturn.objects.all(), "purchase_product__purchase", returned_value()),
+    )
+
+
+def rebuild_supplier_balances(supplier_ids=None, batch_size=1000):
+    """Recompute SupplierBalance rows from the source tables. Returns the number written."""
+    suppliers = Supplier.objects.all()
+    if supplier_ids is not None:
+        suppliers = suppliers.filter(pk__in=supplier_ids)
+
+    rows = suppliers.order_by("pk").annotate(
+        purchases=sum_per_row(SupplierPurchase.objects.all(), "supplier", "total_payable_amount"),
+        paid=sum_per_row(PurchasePayment.objects.all(), "purchase__supplier", "paid_amount"),
+        returned=sum_per_row(SupplierPurchaseReturn.objects.all(), "purchase_product__purchase__supplier", returned_value()),
+    ).values_list("pk", "previous_due_amount", "purchases", "paid", "returned")
+
+    written = 0
+    batch = []
+    for supplier_id, opening, purchases, paid, returned in rows.iterator(chunk_size=batch_size):
+        opening = opening or Decimal("0")
+        batch.append(SupplierBalance(
+            supplier_id=supplier_id,
+            opening_due=opening,
+            purchases_amount=purchases,
+            paid_amount=paid,
+            returned_amount=returned,
+            balance=opening + purchases - paid - returned,
+        ))
+        if len(batch) >= batch_size:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+    return written
+
+
+def _upsert(balances):
+    SupplierBalance.objects.bulk_create(
+        balances,
+        update_conflicts=True,
+        unique_fields=["supplier"],
+        update_fields=["opening_due", "purchases_amount", "paid_amount", "returned_amount", "balance", "updated_at"],
+    )
+    return len(balances)
+
+
+def adjust_supplier_balance(supplier_id, purchases=0, paid=0, returned=0):
+    if not supplier_id or not (purchases or paid or returned):
+        return
+    updated = SupplierBalance.objects.filter(supplier_id=supplier_id).update(
+        purchases_amount=F("purchases_amount") + purchases,
+        paid_amount=F("paid_amount") + paid,
+        returned_amount=F("returned_amount") + returned,
+        balance=F("balance") + purchases - paid - returned,
+    )
+    if not updated:
+        # the change is already written, so the rebuild includes it
+        rebuild_supplier_balances([supplier_id])
+
+
+def set_opening_due(supplier_id, opening_due):
+    opening_due = opening_due or Decimal("0")
+    updated = SupplierBalance.objects.filter(supplier_id=supplier_id).update(
+        opening_due=opening_due,
+        balance=opening_due + F("purchases_amount") - F("paid_amount") - F("returned_amount"),
+    )
+    if not updated:
+        rebuild_supplier_balances([supplier_id])
+
+
+# model -> (supplier lookup, SupplierBalance counter, amount)
+BALANCE_SHARES = {
+    SupplierPurchase: ("supplier_id", "purchases", F("total_payable_amount")),
+    PurchasePayment: ("purchase__supplier_id", "paid", F("paid_amount")),
+    SupplierPurchaseReturn: ("purchase_product__purchase__supplier_id", "returned", returned_value()),
+}
+
+
+def supplier_aging(suppliers=None, today=None):
+    """
+    Outstanding purchase dues per supplier, bucketed by purchase age, in one
+    grouped query. Opening dues (Supplier.previous_due_amount) are reported apart.
+    """
+    today = today or timezone.localdate()
+    purchases = annotate_purchase_totals(SupplierPurchase.objects.all())
+    if suppliers is not None:
+        purchases = purchases.filter(supplier__in=suppliers)
+
+    due = ExpressionWrapper(
+        F("total_payable_amount") - F("paid_amount") - F("returned_amount"),
+        output_field=MONEY,
+    )
+
+    return (
+        purchases
+        .annotate(due=due)
+        .filter(due__gt=0)
+        .values("supplier_id")
+        .annotate(
+            supplier_name=F("supplier__supplier_name"),
+            opening_due=Coalesce(F("supplier__previous_due_amount"), ZERO, output_field=MONEY),
+            total_due=Sum("due"),
+            **aging_sums("due", "purchase_date", today),
+        )
+        .order_by("-total_due", "supplier_id")
+    )
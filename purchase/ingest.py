@@ -0,0 +1,308 @@
+import time
+from decimal import Decimal
+from django.db import transaction, DatabaseError
+from django.db.models import Q
+from master.models import Company
+from product.models import Product, StockProduct, normalize_part_no
+from product.services import journal, movement, stock_key
+from report.rollups import schedule_refresh
+from .models import Purchase, PurchaseItem
+
+
+# ----------------------------
+# Stock upload ingest
+# ----------------------------
+# Rows are applied set-wise: one query resolves every part number, missing
+# products and stock rows are bulk created and the rest bulk updated, so the
+# number of round trips does not grow with the size of the sheet.
+
+STOCK_UPDATE_FIELDS = [
+    "purchase_quantity",
+    "current_stock_quantity",
+    "purchase_price",
+    "current_stock_value",
+]
+
+
+DEFAULT_CHUNK_SIZE = 500
+
+UPLOAD_COLUMNS = ["Description", "Part_no", "Group", "Rate", "Qty", "Unit"]
+
+
+class UploadError(Exception):
+    pass
+
+
+def parse_upload_row(row):
+    """Read one spreadsheet row (a mapping keyed by header) into ingest values."""
+    return {
+        "product_name": str(row["Description"]).strip(),
+        "part_no": str(row["Part_no"]).strip(),
+        "company_name": str(row["Group"]).strip(),
+        "price": Decimal(str(row["Rate"])),
+        "quantity": int(row["Qty"]),
+        "unit": str(row["Unit"]),
+    }
+
+
+def validate_upload_row(row):
+    data = parse_upload_row(row)
+    if not data["part_no"] or data["part_no"] == "None":
+        raise ValueError("Part_no is required")
+    if data["quantity"] < 0:
+        raise ValueError("Qty cannot be negative")
+    if data["price"] < 0:
+        raise ValueError("Rate cannot be negative")
+    return data
+
+
+def resolve_purchase(company_id, exporter_name, invoice_no, purchase_date):
+    try:
+        company = Company.objects.get(id=company_id)
+    except (Company.DoesNotExist, ValueError, TypeError):
+        raise UploadError("Company not found")
+
+    purchase, created = Purchase.objects.get_or_create(
+        invoice_no=invoice_no,
+        purchase_date=purchase_date,
+        defaults={
+            "exporter_name": exporter_name,
+            "company_name": company.company_name,
+        }
+    )
+    return purchase
+
+
+def _resolve_products(rows):
+    part_nos = {row["part_no"] for row in rows}
+
+    products = {}
+    for product in Product.objects.filter(part_no__in=part_nos).order_by("id"):
+        products.setdefault(product.part_no, product)
+    existing = list(products.values())
+
+    new_products = []
+    for row in rows:
+        product = products.get(row["part_no"])
+        if product is None:
+            product = Product(
+                part_no=row["part_no"],
+                # bulk_create skips Product.save()
+                part_no_normalized=normalize_part_no(row["part_no"]),
+                company=row["company_name"],
+                category=None,
+                product_name=row["product_name"],
+                unit=row["unit"],
+            )
+            products[row["part_no"]] = product
+            new_products.append(product)
+        # the last row for a part decides its MRP
+        product.product_mrp = row["price"]
+
+    Product.objects.bulk_create(new_products)
+    Product.objects.bulk_update(existing, ["product_mrp"])
+    return products
+
+
+def _apply_stock(rows, products, reference=None):
+    # A row moves the stock of its product, or failing that the row already
+    # held for its (company_name, part_no), which is unique.
+    stocks = {}
+    by_company = {}
+    locked = (
+        StockProduct.objects
+        .select_for_update()
+        .filter(
+            Q(product__in=list(products.values()), part_no__in=list(products))
+            | Q(company_name__in={row["company_name"] for row in rows}, part_no__in=list(products))
+        )
+        .order_by("id")
+    )
+    for stock in locked:
+        stocks.setdefault((stock.product_id, stock.part_no), stock)
+        by_company.setdefault((stock.company_name, stock.part_no), stock)
+    existing = list({stock.pk: stock for stock in [*stocks.values(), *by_company.values()]}.values())
+
+    new_stocks = []
+    row_stocks = []
+    for row in rows:
+        product = products[row["part_no"]]
+        stock = stocks.get((product.pk, product.part_no)) or by_company.get((row["company_name"], product.part_no))
+        if stock is None:
+            stock = StockProduct(
+                product=product,
+                part_no=product.part_no,
+                company_name=row["company_name"],
+                purchase_quantity=0,
+                sale_quantity=0,
+                damage_quantity=0,
+                current_stock_quantity=0,
+                purchase_price=row["price"],
+                sale_price=row["price"],
+                current_stock_value=0,
+            )
+            stocks[(product.pk, product.part_no)] = stock
+            by_company[(row["company_name"], product.part_no)] = stock
+            new_stocks.append(stock)
+
+        stock.purchase_quantity += row["quantity"]
+        stock.current_stock_quantity += row["quantity"]
+        stock.purchase_price = row["price"]
+        stock.current_stock_value += row["quantity"] * row["price"]
+        row_stocks.append(stock)
+
+    StockProduct.objects.bulk_create(new_stocks)
+    StockProduct.objects.bulk_update(existing, STOCK_UPDATE_FIELDS)
+
+    journal([
+        movement(
+            stock_key(stock), "upload", row["quantity"],
+            row["quantity"] * row["price"], row["price"], reference,
+        )
+        for row, stock in zip(rows, row_stocks)
+    ])
+
+
+def ingest_rows(purchase, rows):
+    """
+    Apply parsed upload rows to products, stock and the exporter purchase.
+    Returns one summary dict per row.
+    """
+    if not rows:
+        return []
+
+    with transaction.atomic():
+        products = _resolve_products(rows)
+        _apply_stock(rows, products, reference=purchase.invoice_no)
+
+        PurchaseItem.objects.bulk_create([
+            PurchaseItem(
+                purchase=purchase,
+                product=products[row["part_no"]],
+                quantity=row["quantity"],
+                purchase_price=row["price"],
+                total_price=row["quantity"] * row["price"],
+            )
+            for row in rows
+        ])
+        schedule_refresh(purchase.purchase_date)
+
+    return [
+        {
+            "product": products[row["part_no"]].product_name,
+            "part_no": row["part_no"],
+            "added_quantity": row["quantity"],
+            "updated_mrp": float(row["price"]),
+        }
+        for row in rows
+    ]
+
+
+
+# ----------------------------
+# Streaming upload
+# ----------------------------
+def iter_sheet_rows(file):
+    """
+    Yield (excel_row_number, row_dict) from the first sheet using openpyxl's
+    read-only mode, so only the current row is held in memory.
+
+    The workbook is opened and its header checked before this returns, so an
+    unreadable file fails before anything is written. close() the iterator
+    if it is not consumed.
+    """
+    sheet_rows = _read_sheet(file)
+    next(sheet_rows)
+    return sheet_rows
+
+
+def _read_sheet(file):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is not None:
+            header = [str(h).strip() if h is not None else "" for h in header]
+            missing = [c for c in UPLOAD_COLUMNS if c not in header]
+            if missing:
+                raise UploadError(f"Missing columns: {', '.join(missing)}")
+        # opened; iter_sheet_rows stops here
+        yield
+
+        if header is None:
+            return
+        for number, values in enumerate(rows, start=2):
+            if all(v is None for v in values):
+                continue
+            yield number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def count_sheet_rows(file):
+    """Data rows in the first sheet, as recorded in the sheet's dimensions."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True)
+    try:
+        return max((workbook.worksheets[0].max_row or 1) - 1, 0)
+    finally:
+        workbook.close()
+
+
+def stream_upload(sheet_rows, purchase, chunk_size=DEFAULT_CHUNK_SIZE, on_chunk=None):
+    """
+    Validate and commit `sheet_rows` (from iter_sheet_rows) in chunks of
+    `chunk_size`. Each chunk is
+    its own transaction, so a bad chunk does not roll back the ones before it.
+    `on_chunk` is called with the progress dict after every chunk.
+    """
+    result = {
+        "row_count": 0,
+        "imported_count": 0,
+        "failed_count": 0,
+        "chunks": [],
+        "errors": [],
+    }
+
+    def flush(chunk, numbers):
+        started = time.monotonic()
+        try:
+            ingest_rows(purchase, chunk)
+            imported = len(chunk)
+        except DatabaseError as e:
+            imported = 0
+            result["errors"].extend({"row": n, "error": str(e)} for n in numbers)
+            result["failed_count"] += len(chunk)
+
+        result["imported_count"] += imported
+        result["chunks"].append({
+            "chunk": len(result["chunks"]) + 1,
+            "first_row": numbers[0],
+            "last_row": numbers[-1],
+            "imported": imported,
+            "elapsed_ms": round((time.monotonic() - started) * 1000),
+        })
+        if on_chunk:
+            on_chunk(result)
+
+    chunk, numbers = [], []
+    for number, row in sheet_rows:
+        result["row_count"] += 1
+        try:
+            chunk.append(validate_upload_row(row))
+            numbers.append(number)
+        except (KeyError, ValueError, TypeError, ArithmeticError) as e:
+            result["failed_count"] += 1
+            result["errors"].append({"row": number, "error": str(e)})
+
+        if len(chunk) >= chunk_size:
+            flush(chunk, numbers)
+            chunk, numbers = [], []
+
+    if chunk:
+        flush(chunk, numbers)
+
+    return result
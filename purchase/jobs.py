@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from .ingest import UploadError, resolve_purchase, stream_upload, count_sheet_rows, iter_sheet_rows
+from .models import UploadJob
+
+
+# ----------------------------
+# Background upload worker
+# ----------------------------
+# Uploads run on a small in-process thread pool, so no broker is needed.
+# Jobs are only handed to the pool once the row that describes them is
+# committed; a job left "running" by a restarted process has to be resubmitted.
+
+MAX_STORED_ERRORS = 1000
+
+PROGRESS_FIELDS = ["processed_rows", "imported_rows", "failed_rows", "chunks"]
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "UPLOAD_JOB_WORKERS", 2),
+            thread_name_prefix="upload-job",
+        )
+    return _executor
+
+
+def submit_upload_job(job):
+    transaction.on_commit(lambda: _get_executor().submit(run_upload_job, job.pk))
+
+
+def _save_progress(job_id, result):
+    UploadJob.objects.filter(pk=job_id).update(
+        processed_rows=result["imported_count"] + result["failed_count"],
+        imported_rows=result["imported_count"],
+        failed_rows=result["failed_count"],
+        chunks=result["chunks"],
+    )
+
+
+def run_upload_job(job_id):
+    close_old_connections()
+    try:
+        job = UploadJob.objects.get(pk=job_id)
+        job.status = "running"
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "started_at"])
+
+        try:
+            with job.file.open("rb") as file:
+                job.total_rows = count_sheet_rows(file)
+                job.save(update_fields=["total_rows"])
+
+                file.seek(0)
+                sheet_rows = iter_sheet_rows(file)
+                purchase = resolve_purchase(
+                    job.company_id, job.exporter_name, job.invoice_no, job.purchase_date
+                )
+                result = stream_upload(
+                    sheet_rows,
+                    purchase,
+                    chunk_size=job.chunk_size,
+                    on_chunk=lambda progress: _save_progress(job_id, progress),
+                )
+        except UploadError as e:
+            job.refresh_from_db(fields=PROGRESS_FIELDS)
+            job.status = "failed"
+            job.message = str(e)
+        except Exception as e:
+            job.refresh_from_db(fields=PROGRESS_FIELDS)
+            job.status = "failed"
+            job.message = f"Upload failed: {str(e)}"
+        else:
+            job.status = "completed"
+            job.total_rows = result["row_count"]
+            job.processed_rows = result["row_count"]
+            job.imported_rows = result["imported_count"]
+            job.failed_rows = result["failed_count"]
+            job.chunks = result["chunks"]
+            job.errors = result["errors"][:MAX_STORED_ERRORS]
+            job.message = (
+                "Stock uploaded successfully" if not result["failed_count"]
+                else "Stock uploaded with errors"
+            )
+
+        job.finished_at = timezone.now()
+        job.save(update_fields=[
+            "status", "total_rows", "processed_rows", "imported_rows", "failed_rows",
+            "chunks", "errors", "message", "finished_at",
+        ])
+    finally:
+        connection.close()
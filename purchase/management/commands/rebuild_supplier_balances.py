@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from purchase.balances import rebuild_supplier_balances
+
+
+class Command(BaseCommand):
+    help = "Recompute SupplierBalance rows from purchases, payments and returns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--supplier", type=int, action="append", help="Only these supplier ids (repeatable).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            written = rebuild_supplier_balances(options["supplier"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} supplier balances."))
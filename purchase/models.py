@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Max
 from django.utils import timezone
 from person.models import Supplier
 from master.models import Company
+from master.sequences import reserve
 from product.models import Product
 from django.utils.timezone import now
 from django.utils.text import slugify
@@ -12,7 +14,7 @@ from django.utils.text import slugify
 class SupplierPurchase(models.Model):
     supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE)
     company_name = models.CharField(max_length=255)
-    purchase_date = models.DateField()
+    purchase_date = models.DateField(db_index=True)
     invoice_no = models.CharField(max_length=100, blank=True, null = True)
     total_amount = models.DecimalField(max_digits=12, decimal_places=2)
     discount_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
@@ -20,26 +22,40 @@ class SupplierPurchase(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     # --- Return summary fields ---
+    # List and detail querysets annotate these in SQL (see
+    # SupplierPurchaseSerializer.setup_eager_loading); otherwise they are
+    # summed from the purchase's lines.
     @property
     def total_returned_quantity(self):
+        if hasattr(self, 'returned_quantity_total'):
+            return self.returned_quantity_total
         return sum([p.returned_quantity for p in self.products.all()])
 
     @property
     def total_returned_value(self):
+        if hasattr(self, 'returned_value_total'):
+            return self.returned_value_total
         return sum([
             p.returned_quantity * p.purchase_price for p in self.products.all()
         ])
 
     def generate_invoice_no(self):
-        last_id = SupplierPurchase.objects.all().order_by('-id').first()
-        next_number = (last_id.id + 1) if last_id else 1
+        # seeded from the last id, which the old id-based numbers used
+        next_number = reserve("PU", initial=lambda: SupplierPurchase.objects.aggregate(last=Max('id'))['last'] or 0)
         return f"PU{next_number:08d}"
 
     def save(self, *args, **kwargs):
-        if not self.invoice_no:
-            self.invoice_no = self.generate_invoice_no()
+        with transaction.atomic():
+            if not self.invoice_no:
+                self.invoice_no = self.generate_invoice_no()
+
+            super().save(*args, **kwargs)
 
-        super().save(*args, **kwargs)
+    class Meta:
+        indexes = [
+            models.Index(fields=['invoice_no']),
+            models.Index(fields=['supplier', 'purchase_date']),
+        ]
 
     def __str__(self):
         return f"Invoice {self.invoice_no} - {self.supplier.supplier_name}"
@@ -94,22 +110,24 @@ class Order(models.Model):
     order_date = models.DateField(default=now)
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='orders',blank=True, null=True)
 
-    def save(self, *args, **kwargs):
-        if not self.order_no:
-            today = now().strftime('%Y%m%d')
-            last_order = Order.objects.filter(order_no__startswith=f"ORD-{today}").order_by('id').last()
-            next_number = 1
-
-            if last_order:
-                try:
-                    last_no = last_order.order_no.split('-')[-1]
-                    next_number = int(last_no) + 1
-                except:
-                    pass
+    @staticmethod
+    def last_order_number(prefix):
+        last = 0
+        for order_no in Order.objects.filter(order_no__startswith=prefix).values_list('order_no', flat=True):
+            try:
+                last = max(last, int(order_no.split('-')[-1]))
+            except ValueError:
+                pass
+        return last
 
-            self.order_no = f"ORD-{today}-{next_number:03d}"
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if not self.order_no:
+                prefix = f"ORD-{now().strftime('%Y%m%d')}"
+                next_number = reserve(prefix, initial=lambda: Order.last_order_number(prefix))
+                self.order_no = f"{prefix}-{next_number:03d}"
 
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.order_no
@@ -136,6 +154,13 @@ class Purchase(models.Model):
     company_name = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # uploads get_or_create their purchase on (invoice_no, purchase_date)
+            models.Index(fields=['invoice_no', 'purchase_date']),
+            models.Index(fields=['purchase_date']),
+        ]
+
     def __str__(self):
         return f"{self.invoice_no} ({self.purchase_date})"
 
@@ -153,4 +178,73 @@ class PurchaseItem(models.Model):
     total_price = models.DecimalField(max_digits=12, decimal_places=2)
 
     def __str__(self):
-        return f"{self.product} - Qty {self.quantity}"
\ No newline at end of file
+        return f"{self.product} - Qty {self.quantity}"
+
+
+class UploadJob(models.Model):
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+
+    file = models.FileField(upload_to="upload_jobs/")
+    company_id = models.CharField(max_length=50, blank=True, null=True)
+    exporter_name = models.CharField(max_length=255, blank=True, null=True)
+    invoice_no = models.CharField(max_length=100)
+    purchase_date = models.CharField(max_length=20, blank=True, null=True)
+    chunk_size = models.PositiveIntegerField(default=500)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    imported_rows = models.PositiveIntegerField(default=0)
+    failed_rows = models.PositiveIntegerField(default=0)
+    chunks = models.JSONField(default=list, blank=True)
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    @property
+    def progress(self):
+        if not self.total_rows:
+            return 100 if self.status == "completed" else 0
+        return min(round(self.processed_rows * 100 / self.total_rows), 100)
+
+    @property
+    def elapsed_seconds(self):
+        if not self.started_at:
+            return 0
+        end = self.finished_at or timezone.now()
+        return round((end - self.started_at).total_seconds(), 3)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.status})"
+
+
+
+class SupplierBalance(models.Model):
+    """
+    Running payable per supplier, kept in step with purchases, payments and
+    returns by purchase.balances (see purchase/signals.py).
+    balance = opening_due + purchases_amount - paid_amount - returned_amount
+    """
+    supplier = models.OneToOneField(Supplier, on_delete=models.CASCADE, primary_key=True, related_name='balance')
+    opening_due = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    purchases_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    returned_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-balance', 'supplier']),
+        ]
+
+    def __str__(self):
+        return f"{self.supplier} - {self.balance}"
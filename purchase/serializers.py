@@ -1,16 +1,20 @@
 from .models import *
 from rest_framework import serializers
 from master.serializers import CompanySerializer
+from master.cache import master_row
+from FirozAuto_Backend.fieldsets import SparseFieldsMixin
 from person.models import Supplier
 from person.serializers import SupplierSerializer
 from product.serializers import ProductSerializer
+from django.db.models import Sum, F, Value, Prefetch, DecimalField
+from django.db.models.functions import Coalesce
 
 
 
 # ----------------------------
 # Purchase Product Serializer
 # ----------------------------
-class PurchaseProductSerializer(serializers.ModelSerializer):
+class PurchaseProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(),
@@ -36,7 +40,7 @@ class PurchaseProductSerializer(serializers.ModelSerializer):
 # ----------------------------
 # Purchase Payment Serializer
 # ----------------------------
-class PurchasePaymentSerializer(serializers.ModelSerializer):
+class PurchasePaymentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = PurchasePayment
         fields = [
@@ -52,7 +56,7 @@ class PurchasePaymentSerializer(serializers.ModelSerializer):
 # ----------------------------
 # Supplier Purchase Serializer
 # ----------------------------
-class SupplierPurchaseSerializer(serializers.ModelSerializer):
+class SupplierPurchaseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     products = PurchaseProductSerializer(many=True)
     payments = PurchasePaymentSerializer(many=True)
     supplier = SupplierSerializer(read_only=True)
@@ -84,6 +88,36 @@ class SupplierPurchaseSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load the purchase graph in a fixed number of queries: supplier in the
+        main query, lines (with product, category/bike model and company) and
+        payments prefetched, and the return totals summed in SQL.
+        """
+        return (
+            queryset
+            .select_related('supplier__supplier_type')
+            .prefetch_related(
+                Prefetch(
+                    'products',
+                    queryset=PurchaseProduct.objects.select_related(
+                        'product__category__company',
+                        'product__bike_model__company',
+                    ),
+                ),
+                'payments',
+            )
+            .annotate(
+                returned_quantity_total=Coalesce(Sum('products__returned_quantity'), 0),
+                returned_value_total=Coalesce(
+                    Sum(F('products__returned_quantity') * F('products__purchase_price')),
+                    Value(0),
+                    output_field=DecimalField(max_digits=14, decimal_places=2),
+                ),
+            )
+        )
+
     def create(self, validated_data):
         products_data = validated_data.pop('products')
         payments_data = validated_data.pop('payments')
@@ -162,13 +196,17 @@ class OrderItemSerializer(serializers.ModelSerializer):
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     company = serializers.PrimaryKeyRelatedField(queryset=Company.objects.all())
-    company_name = serializers.CharField(source='company.company_name', read_only=True)
+    company_name = serializers.SerializerMethodField()
 
 
     class Meta:
         model = Order
         fields = ['id', 'order_no', 'order_date','company','company_name', 'items']
 
+    def get_company_name(self, obj):
+        company = master_row(Company, obj.company_id)
+        return company.company_name if company else None
+
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         order = Order.objects.create(**validated_data)
@@ -272,3 +310,47 @@ class PurchaseSerializer(serializers.ModelSerializer):
                 old_item.delete()
 
         return instance
+
+
+
+
+class UploadJobSerializer(serializers.ModelSerializer):
+    progress = serializers.IntegerField(read_only=True)
+    elapsed_seconds = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = UploadJob
+        fields = [
+            'id',
+            'status',
+            'invoice_no',
+            'purchase_date',
+            'exporter_name',
+            'chunk_size',
+            'total_rows',
+            'processed_rows',
+            'imported_rows',
+            'failed_rows',
+            'progress',
+            'chunks',
+            'errors',
+            'message',
+            'created_at',
+            'started_at',
+            'finished_at',
+            'elapsed_seconds',
+        ]
+        read_only_fields = fields
+
+
+
+# ----------------------------
+# Supplier Balance Serializer
+# ----------------------------
+class SupplierBalanceSerializer(serializers.ModelSerializer):
+    supplier_name = serializers.CharField(source='supplier.supplier_name', read_only=True)
+
+    class Meta:
+        model = SupplierBalance
+        fields = ['supplier', 'supplier_name', 'opening_due', 'purchases_amount', 'paid_amount',
+                  'returned_amount', 'balance', 'updated_at']
@@ -1,8 +1,10 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import *
+from .balances import BALANCE_SHARES, adjust_supplier_balance, set_opening_due
+from FirozAuto_Backend.ledgers import connect_balance_signals
+from product.services import record_purchase
 # from transaction.models import PurchaseEntry
-from decimal import Decimal
 
 
 
@@ -11,39 +13,33 @@ def update_stock_product(sender, instance, created, **kwargs):
 
     if not created:
         return
-    
-
-    company_name = instance.purchase.company_name
-    part_no = instance.part_no
-    product = instance.product
-
-    
-
-    stock, created_stock = StockProduct.objects.get_or_create(
-        company_name = company_name,
-        part_no = part_no,
-        defaults={
-            'product': product,
-            'purchase_quantity': instance.purchase_quantity,
-            'current_stock_quantity': instance.purchase_quantity,
-            'purchase_price': instance.purchase_price,
-            'sale_price': instance.purchase_price_with_percentage,
-            'current_stock_value': instance.purchase_price * instance.purchase_quantity
-        }
+
+    record_purchase(
+        company_name = instance.purchase.company_name,
+        part_no = instance.part_no,
+        product = instance.product,
+        quantity = instance.purchase_quantity,
+        purchase_price = instance.purchase_price,
+        sale_price = instance.purchase_price_with_percentage,
+        reference = instance.purchase.invoice_no,
     )
 
 
-    if not created_stock:
-        pq = int(instance.purchase_quantity)
-        pp = Decimal(instance.purchase_price)
-        ppwp = Decimal(instance.purchase_price_with_percentage)
 
-        stock.purchase_quantity += pq
-        stock.current_stock_quantity += pq
-        stock.purchase_price = pp
-        stock.sale_price = ppwp
-        stock.current_stock_value += pp * pq
-        stock.save()
+# ----------------------------
+# Supplier balance upkeep
+# ----------------------------
+# Purchases, payments and returns move their supplier's balance (see
+# FirozAuto_Backend.ledgers).
+
+connect_balance_signals(Supplier, BALANCE_SHARES, adjust_supplier_balance)
+
+
+@receiver(post_save, sender=Supplier)
+def update_opening_due(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    set_opening_due(instance.pk, instance.previous_due_amount)
 
 
 
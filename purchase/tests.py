@@ -1,3 +1,249 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from master.models import Company, SupplierTypeMaster
+from person.models import Supplier
+from product.models import ProductCategory, BikeModel, Product, StockProduct, StockMovement
+from FirozAuto_Backend.testing import QueryBudgetMixin
+from .ingest import UPLOAD_COLUMNS
+from .jobs import run_upload_job
+from .models import (
+    SupplierPurchase, PurchaseProduct, PurchasePayment, SupplierPurchaseReturn, SupplierBalance, Purchase,
+    UploadJob,
+)
 
-# Create your tests here.
+
+# The purchase graph (supplier -> type, lines -> product -> category/bike
+# model -> company, payments) and the return totals must load in a fixed
+# number of queries however many purchases are listed.
+PURCHASE_LIST_BUDGET = 3
+PURCHASE_DETAIL_BUDGET = 3
+
+
+class SupplierPurchaseQueryBudgetTests(QueryBudgetMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(company_name="Hero")
+        category = ProductCategory.objects.create(company=company, category_name="Engine")
+        bike_model = BikeModel.objects.create(company=company, name="Glamour")
+        supplier_type = SupplierTypeMaster.objects.create(name="Local")
+        cls.supplier = Supplier.objects.create(
+            supplier_name="Rahman Traders", country="Bangladesh", supplier_type=supplier_type,
+            phone1="01800000000", address="Dhaka",
+        )
+        cls.products = [
+            Product.objects.create(
+                company="Hero", category=category, bike_model=bike_model,
+                product_name=f"Part {i}", part_no=f"P-{i}",
+            )
+            for i in range(3)
+        ]
+
+    def create_purchases(self, count):
+        for _ in range(count):
+            purchase = SupplierPurchase.objects.create(
+                supplier=self.supplier, company_name="Hero", purchase_date="2025-01-15",
+                total_amount=Decimal("30"), total_payable_amount=Decimal("30"),
+            )
+            for product in self.products:
+                PurchaseProduct.objects.create(
+                    purchase=purchase, product=product, part_no=product.part_no,
+                    purchase_quantity=2, purchase_price=Decimal("5"), percentage=Decimal("0"),
+                    purchase_price_with_percentage=Decimal("5"), total_price=Decimal("10"),
+                    returned_quantity=1,
+                )
+            PurchasePayment.objects.create(purchase=purchase, payment_mode="Cash", paid_amount=Decimal("30"))
+        return purchase
+
+    def test_purchase_list_within_budget(self):
+        self.create_purchases(2)
+        few = self.assertQueryBudget(PURCHASE_LIST_BUDGET, reverse('supplierpurchase-list'))
+
+        self.create_purchases(20)
+        many = self.assertQueryBudget(PURCHASE_LIST_BUDGET, reverse('supplierpurchase-list'))
+
+        self.assertEqual(few, many)
+
+    def test_purchase_detail_within_budget(self):
+        purchase = self.create_purchases(1)
+        self.assertQueryBudget(PURCHASE_DETAIL_BUDGET, reverse('supplierpurchase-detail', args=[purchase.id]))
+
+    def test_return_totals_are_annotated(self):
+        purchase = self.create_purchases(1)
+        response = self.client.get(reverse('supplierpurchase-detail', args=[purchase.id]))
+        self.assertEqual(response.data['total_returned_quantity'], 3)
+        self.assertEqual(Decimal(response.data['total_returned_value']), Decimal("15"))
+
+    def test_supplier_ledger_and_balance(self):
+        purchase = self.create_purchases(1)
+        SupplierPurchaseReturn.objects.create(purchase_product=purchase.products.first(), quantity=1)
+        balance = SupplierBalance.objects.get(supplier=self.supplier)
+        self.assertEqual(balance.balance, Decimal("-5"))
+
+        response = self.client.get(reverse('supplier-ledger', args=[self.supplier.id]), {'paginate': 'false'})
+        self.assertEqual(response.data['supplier_name'], "Rahman Traders")
+        self.assertEqual(
+            sorted((entry['entry_type'], entry['debit'], entry['credit']) for entry in response.data['results']),
+            [("payment", Decimal("30"), 0), ("purchase", 0, Decimal("30")), ("return", Decimal("5"), 0)],
+        )
+
+
+def stock_sheet(rows, columns=UPLOAD_COLUMNS):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return SimpleUploadedFile("stock.xlsx", buffer.getvalue())
+
+
+class UploadStockExcelTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(company_name="Hero")
+        cls.existing = Product.objects.create(company="Hero", product_name="Brake shoe", part_no="BS-22")
+
+    def setUp(self):
+        # async uploads store the sheet on the job
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def upload(self, rows, **data):
+        data = {
+            'xl_file': stock_sheet(rows), 'company_name': self.company.id,
+            'exporter_name': "Hero Exports", 'invoice_no': "EX-1", 'purchase_date': "2025-01-15",
+            **data,
+        }
+        return self.client.post(reverse('upload-stock-excel'), data, format='multipart')
+
+    def test_sync_upload_creates_products_stock_and_movements(self):
+        response = self.upload([
+            ["Brake shoe", "BS-22", "Hero", 80, 10, "Pcs"],
+            ["Clutch plate", "CP-7", "Hero", 120.5, 4, "Pcs"],
+            ["Brake shoe", "BS-22", "Hero", 90, 5, "Pcs"],
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['row_count'], 3)
+
+        self.assertEqual(Product.objects.get(part_no="BS-22"), self.existing)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.product_mrp, Decimal("90"))
+        stock = StockProduct.objects.get(part_no="BS-22")
+        self.assertEqual((stock.product, stock.current_stock_quantity, stock.current_stock_value),
+                         (self.existing, 15, Decimal("1250")))
+        self.assertEqual(StockProduct.objects.get(part_no="CP-7").product.product_name, "Clutch plate")
+
+        self.assertEqual(
+            list(StockMovement.objects.values_list('part_no', 'movement_type', 'quantity', 'reference')),
+            [("BS-22", "upload", 10, "EX-1"), ("CP-7", "upload", 4, "EX-1"), ("BS-22", "upload", 5, "EX-1")],
+        )
+        self.assertEqual(Purchase.objects.get(invoice_no="EX-1").items.count(), 3)
+
+    def test_sync_upload_rejects_the_sheet_on_a_bad_row(self):
+        response = self.upload([
+            ["Brake shoe", "BS-22", "Hero", 80, 10, "Pcs"],
+            ["Clutch plate", "CP-7", "Hero", 120, -1, "Pcs"],
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], "Invalid row 3: Qty cannot be negative")
+        self.assertFalse(StockProduct.objects.exists())
+        self.assertFalse(Purchase.objects.exists())
+
+    def test_stream_upload_reports_bad_rows_and_commits_the_rest(self):
+        response = self.upload([
+            ["Brake shoe", "BS-22", "Hero", 80, 10, "Pcs"],
+            ["Clutch plate", "CP-7", "Hero", 120, -1, "Pcs"],
+            ["Chain", None, "Hero", 50, 2, "Pcs"],
+            ["Clutch plate", "CP-7", "Hero", 120, 4, "Pcs"],
+            ["Spark plug", "SP-1", "Hero", 30, 6, "Pcs"],
+        ], mode='stream', chunk_size=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.data['row_count'], response.data['imported_count'], response.data['failed_count']), (5, 3, 2)
+        )
+        self.assertEqual(response.data['errors'], [
+            {'row': 3, 'error': "Qty cannot be negative"},
+            {'row': 4, 'error': "Part_no is required"},
+        ])
+        self.assertEqual(
+            [(chunk['first_row'], chunk['last_row'], chunk['imported']) for chunk in response.data['chunks']],
+            [(2, 5, 2), (6, 6, 1)],
+        )
+        self.assertEqual(
+            dict(StockProduct.objects.values_list('part_no', 'current_stock_quantity')),
+            {"BS-22": 10, "CP-7": 4, "SP-1": 6},
+        )
+        self.assertEqual(StockMovement.objects.filter(movement_type="upload").count(), 3)
+
+    def test_stream_upload_of_unreadable_file_writes_nothing(self):
+        data = {
+            'xl_file': SimpleUploadedFile("stock.xlsx", b"not a workbook"), 'company_name': self.company.id,
+            'invoice_no': "EX-1", 'purchase_date': "2025-01-15", 'mode': 'stream',
+        }
+        response = self.client.post(reverse('upload-stock-excel'), data, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data['error'].startswith("Invalid Excel file"))
+
+        response = self.client.post(reverse('upload-stock-excel'), {
+            **data, 'xl_file': stock_sheet([["Brake shoe", "BS-22", 80]], columns=["Description", "Part_no", "Rate"]),
+        }, format='multipart')
+        self.assertEqual(response.data['error'], "Missing columns: Group, Qty, Unit")
+        self.assertFalse(Purchase.objects.exists())
+
+    def test_async_upload_job_and_status(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.upload([
+                ["Brake shoe", "BS-22", "Hero", 80, 10, "Pcs"],
+                ["Clutch plate", "CP-7", "Hero", 120, -1, "Pcs"],
+                ["Clutch plate", "CP-7", "Hero", 120, 4, "Pcs"],
+            ], mode='async', chunk_size=1)
+        self.assertEqual(response.status_code, 202)
+        status_url = reverse('uploadjob-detail', args=[response.data['job_id']])
+        self.assertEqual(self.client.get(status_url).data['status'], "pending")
+        self.assertFalse(StockProduct.objects.exists())
+
+        # run the worker inline, on the test's connection
+        executor = mock.Mock(submit=lambda fn, *args: fn(*args))
+        with mock.patch('purchase.jobs._get_executor', return_value=executor), \
+                mock.patch('purchase.jobs.close_old_connections'), mock.patch('purchase.jobs.connection'):
+            for callback in callbacks:
+                callback()
+
+        job = self.client.get(status_url).data
+        self.assertEqual(
+            (job['status'], job['total_rows'], job['imported_rows'], job['failed_rows'], len(job['chunks'])),
+            ("completed", 3, 2, 1, 2),
+        )
+        self.assertEqual(job['errors'], [{'row': 3, 'error': "Qty cannot be negative"}])
+        self.assertEqual(job['message'], "Stock uploaded with errors")
+        self.assertEqual(
+            dict(StockProduct.objects.values_list('part_no', 'current_stock_quantity')), {"BS-22": 10, "CP-7": 4}
+        )
+
+    def test_async_upload_job_fails_on_unreadable_file(self):
+        job = UploadJob.objects.create(
+            file=SimpleUploadedFile("stock.xlsx", b"not a workbook"), company_id=self.company.id,
+            invoice_no="EX-1", purchase_date="2025-01-15",
+        )
+        with mock.patch('purchase.jobs.close_old_connections'), mock.patch('purchase.jobs.connection'):
+            run_upload_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertTrue(job.message.startswith("Upload failed"))
+        self.assertFalse(Purchase.objects.exists())
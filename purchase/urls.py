@@ -1,7 +1,8 @@
 from rest_framework.routers import DefaultRouter
 from .views import (
     SupplierPurchaseViewSet, SupplierPurchaseReturnViewSet,
-    OrderViewSet, UploadStockExcelView
+    OrderViewSet, UploadStockExcelView, UploadJobViewSet,
+    SupplierBalanceViewSet, SupplierLedgerView,
 )
 from django.urls import path, include
 
@@ -9,8 +10,11 @@ router = DefaultRouter()
 router.register(r'supplier-purchases', SupplierPurchaseViewSet)
 router.register(r'supplier-purchase-returns', SupplierPurchaseReturnViewSet)
 router.register(r'orders', OrderViewSet)
+router.register(r'upload-jobs', UploadJobViewSet)
+router.register(r'supplier-balances', SupplierBalanceViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
     path('upload-order-excel/', UploadStockExcelView.as_view(), name='upload-stock-excel'),
+    path('suppliers/<int:supplier_id>/ledger/', SupplierLedgerView.as_view(), name='supplier-ledger'),
 ]
\ No newline at end of file
@@ -4,19 +4,48 @@ from rest_framework.response import Response
 from .models import *
 from .serializers import *
 from rest_framework.views import APIView
-from decimal import Decimal
-from product.models import Product, StockProduct
+from product.services import InsufficientStock, record_purchase_return
+from django.db.models import F
+from rest_framework import serializers
+from .jobs import submit_upload_job
+from .balances import supplier_aging, rebuild_supplier_balances, returned_value
+from FirozAuto_Backend.ledgers import PartyLedgerView, DEBIT, CREDIT
+from FirozAuto_Backend.pagination import ReportPagination
+from FirozAuto_Backend.fieldsets import SparseFieldsViewMixin
+from rest_framework.decorators import action
+from .ingest import (
+    UploadError, DEFAULT_CHUNK_SIZE, validate_upload_row, resolve_purchase,
+    ingest_rows, iter_sheet_rows, stream_upload,
+)
 import pandas as pd
+import time
 from django.db import transaction
+from openpyxl.utils.exceptions import InvalidFileException
+from zipfile import BadZipFile
+
+
+# what reading an upload that isn't a readable .xlsx workbook raises
+EXCEL_ERRORS = (ValueError, KeyError, BadZipFile, InvalidFileException)
 
 
 # ----------------------------
 # Supplier Purchase
 # ----------------------------
-class SupplierPurchaseViewSet(viewsets.ModelViewSet):
-    queryset = SupplierPurchase.objects.all().order_by('-purchase_date')
+class SupplierPurchaseViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    queryset = SupplierPurchaseSerializer.setup_eager_loading(SupplierPurchase.objects.all()).order_by('-purchase_date')
     serializer_class = SupplierPurchaseSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-purchase_date', '-id')
+
+    # the purchase, its lines and payments, stock and the supplier balance
+    # are written together or not at all
+    @transaction.atomic
+    def perform_create(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
 
 
 
@@ -27,6 +56,7 @@ class SupplierPurchaseReturnViewSet(viewsets.ModelViewSet):
     queryset = SupplierPurchaseReturn.objects.all().order_by('-return_date')
     serializer_class = SupplierPurchaseReturnSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-return_date', '-id')
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -35,112 +65,120 @@ class SupplierPurchaseReturnViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(purchase_product__purchase__invoice_no=invoice_no)
         return queryset
 
+    @transaction.atomic
     def perform_create(self, serializer):
         instance = serializer.save()
         purchase_product = instance.purchase_product
-        # Update returned_quantity
-        purchase_product.returned_quantity += instance.quantity
-        purchase_product.save()
+
+        # Update returned_quantity, guarded against concurrent returns
+        updated = PurchaseProduct.objects.filter(
+            pk=purchase_product.pk,
+            returned_quantity__lte=F('purchase_quantity') - instance.quantity,
+        ).update(returned_quantity=F('returned_quantity') + instance.quantity)
+        if not updated:
+            raise serializers.ValidationError('Cannot return more than purchased minus already returned.')
+
         # Update stock
-        stock = StockProduct.objects.filter(
-            company_name=purchase_product.purchase.company_name,
-            part_no=purchase_product.part_no,
-            product=purchase_product.product
-        ).first()
-        if stock:
-            stock.current_stock_quantity = max(stock.current_stock_quantity - instance.quantity, 0)
-            stock.save()
+        try:
+            record_purchase_return(
+                purchase_product.purchase.company_name,
+                purchase_product.product_id,
+                purchase_product.part_no,
+                instance.quantity,
+                reference=purchase_product.purchase.invoice_no,
+            )
+        except InsufficientStock as e:
+            raise serializers.ValidationError(str(e))
 
 
 # ----------------------------
-# Order
+# Upload Job
 # ----------------------------
-class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.prefetch_related('items__product').all()
-    serializer_class = OrderSerializer
+class UploadJobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = UploadJob.objects.all().order_by('-created_at')
+    serializer_class = UploadJobSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-created_at', '-id')
 
 
+# ----------------------------
+# Supplier Balance
+# ----------------------------
+class SupplierBalanceViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Maintained payable per supplier, all suppliers in one query.
+    ?has_due=true keeps only suppliers that are owed money.
+    """
+    queryset = SupplierBalance.objects.select_related('supplier').order_by('-balance', 'supplier_id')
+    serializer_class = SupplierBalanceSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-balance', 'supplier_id')
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        supplier = self.request.query_params.get('supplier')
+        if supplier:
+            queryset = queryset.filter(supplier_id=supplier)
+        if self.request.query_params.get('has_due', '').lower() in ('true', '1', 'yes'):
+            queryset = queryset.filter(balance__gt=0)
+        return queryset
 
-def create_purchase_entry(data):
-    try:
-        company = Company.objects.get(id=data["company_id"])
-    except Company.DoesNotExist:
-        raise ValueError("Company not found")
-    
-
-    try:
-        product = Product.objects.get(part_no=data["part_no"])
-    except Product.DoesNotExist:
-        raise ValueError("Product not found")
-
-    # Get or create the Purchase
-    purchase, created = Purchase.objects.get_or_create(
-        invoice_no=data["invoice_no"],
-        purchase_date =data["purchase_date"],
-        defaults={
-            "exporter_name": data["exporter_name"],
-            "company_name": company.company_name,
-        }
-    )
-
-    # Create PurchaseItem
-    purchase_item = PurchaseItem.objects.create(
-        purchase=purchase,
-        product=product,
-        quantity=data["quantity"],
-        purchase_price=data["purchase_price"],
-        total_price= Decimal(data["quantity"]) * Decimal(data["purchase_price"]),
-    )
-
-    return purchase_item
-
-
-
+    @action(detail=False, methods=['get'])
+    def aging(self, request):
+        """Outstanding purchase dues per supplier in 0-30 / 31-60 / 61-90 / 90+ day buckets."""
+        rows = supplier_aging()
+        paginator = ReportPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(page)
+        return Response(list(rows))
+
+
+
+class SupplierLedgerView(PartyLedgerView):
+    """
+    GET /suppliers/<id>/ledger/?from_date=&to_date=
+
+    The supplier's purchases (credit), payments and returns (debit), newest
+    first, from one UNION query, with the maintained balance. Payments carry
+    their purchase's date, as PurchasePayment has none of its own.
+    """
+    party_model = Supplier
+    party_field = 'supplier'
+    party_name_field = 'supplier_name'
+    balance_model = SupplierBalance
+    balance_serializer_class = SupplierBalanceSerializer
+    rebuild_balances = staticmethod(rebuild_supplier_balances)
+    entry_sources = [
+        ('purchase', SupplierPurchase, 'supplier', 'purchase_date', False, 'invoice_no',
+            F('total_payable_amount'), CREDIT),
+        ('payment', PurchasePayment, 'purchase__supplier', 'purchase__purchase_date', False, 'purchase__invoice_no',
+            F('paid_amount'), DEBIT),
+        ('return', SupplierPurchaseReturn, 'purchase_product__purchase__supplier', 'return_date', True,
+            'purchase_product__purchase__invoice_no', returned_value(), DEBIT),
+    ]
 
-def update_stock(product, company_name, quantity, price, unit):
-    
-    stock, created = StockProduct.objects.get_or_create(
-        product=product,
-        part_no=product.part_no,
-        defaults={
-            "company_name": company_name,
-            "purchase_quantity": quantity,
-            "sale_quantity": 0,
-            "damage_quantity": 0,
-            "current_stock_quantity": quantity,
-            "purchase_price": price,
-            "sale_price": price,
-            "current_stock_value": quantity * price,
-        }
-    )
 
-    
-    if not created:
-        stock.purchase_quantity += quantity
-        stock.current_stock_quantity += quantity
-        stock.purchase_price = price
-        stock.current_stock_value += Decimal(quantity) * Decimal(price)
-        stock.save()
+# ----------------------------
+# Order
+# ----------------------------
+class OrderViewSet(viewsets.ModelViewSet):
+    queryset = Order.objects.prefetch_related('items__product').all()
+    serializer_class = OrderSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
 
-    return stock
 
 
 
 class UploadStockExcelView(APIView):
     def post(self, request):
+        started = time.monotonic()
         file = request.FILES.get("xl_file")
         company_id = request.data.get("company_name")
         exporter_name = request.data.get("exporter_name")
         invoice_no = request.data.get("invoice_no", "AUTO_GENERATE")
         purchase_date = request.data.get("purchase_date")
-
-        # Validate company
-        # try:
-        #     company = Company.objects.get(id=company_id)
-        # except Company.DoesNotExist:
-        #     return Response({"error": "No Company Selected or Found"}, status=400)
+        mode = request.data.get("mode") or request.query_params.get("mode")
 
         # Validate file
         if not file:
@@ -148,63 +186,105 @@ class UploadStockExcelView(APIView):
         if not file.name.endswith(".xlsx"):
             return Response({"error": "Please upload an .xlsx file"}, status=400)
 
+        if mode == "stream":
+            return self.stream(request, file, started, company_id, exporter_name, invoice_no, purchase_date)
+        if mode == "async":
+            return self.enqueue(request, file, company_id, exporter_name, invoice_no, purchase_date)
+
         # Read Excel
         try:
             df = pd.read_excel(file, engine="openpyxl")
-        except Exception as e:
+        except EXCEL_ERRORS as e:
             return Response({"error": f"Invalid Excel file: {str(e)}"}, status=400)
 
-        
-        created_stocks = []
-        with transaction.atomic():
-            for _, row in df.iterrows():
-                product_name = str(row["Description"]).strip()
-                part_no = str(row["Part_no"]).strip()
-                company_name = str(row["Group"]).strip()
-                price = float(row["Rate"])
-                quantity = int(row["Qty"])
-                unit = str(row["Unit"])
-
-                print("Processing:", part_no, price, quantity, unit, company_name)
-
-                product, created = Product.objects.get_or_create(
-                    part_no=part_no,
-                    defaults={
-                        "company": company_name,
-                        "category": None, 
-                        "product_name": product_name,
-                        "product_mrp": price,
-                        'unit' : unit,
-                    }
-                )
-
-                # Update product MRP
-                if not created:
-                    product.product_mrp = price
-                    product.save()
-
-                # Update stock using the helper function
-                update_stock(product, company_name, quantity, price, unit)
-
-                # Create purchase entry
-                create_purchase_entry({
-                    "invoice_no": invoice_no,
-                    "purchase_date": purchase_date,
-                    "exporter_name": exporter_name,
-                    "company_id": company_id,
-                    "part_no": part_no,
-                    "quantity": quantity,
-                    "purchase_price": price,
-                })
-
-                created_stocks.append({
-                    "product": product.product_name,
-                    "part_no": product.part_no,
-                    "added_quantity": quantity,
-                    "updated_mrp": price,
-                })
+        rows = []
+        for index, row in df.iterrows():
+            try:
+                rows.append(validate_upload_row(row))
+            except (KeyError, ValueError, TypeError, ArithmeticError) as e:
+                # +2: header line and 1-based numbering, as shown in Excel
+                return Response({"error": f"Invalid row {index + 2}: {str(e)}"}, status=400)
+
+        try:
+            with transaction.atomic():
+                purchase = resolve_purchase(company_id, exporter_name, invoice_no, purchase_date)
+                created_stocks = ingest_rows(purchase, rows)
+        except UploadError as e:
+            return Response({"error": str(e)}, status=400)
 
         return Response({
             "message": "Stock uploaded successfully",
+            "row_count": len(rows),
+            "elapsed_ms": round((time.monotonic() - started) * 1000),
             "items": created_stocks
         }, status=200)
+
+    def get_chunk_size(self, request):
+        try:
+            chunk_size = int(
+                request.data.get("chunk_size") or request.query_params.get("chunk_size") or DEFAULT_CHUNK_SIZE
+            )
+        except (TypeError, ValueError):
+            raise UploadError("chunk_size must be a number")
+        if chunk_size <= 0:
+            raise UploadError("chunk_size must be positive")
+        return chunk_size
+
+    def enqueue(self, request, file, company_id, exporter_name, invoice_no, purchase_date):
+        """
+        Store the file and process it on the background worker. The client
+        polls upload-jobs/<id>/ for progress.
+        """
+        try:
+            chunk_size = self.get_chunk_size(request)
+        except UploadError as e:
+            return Response({"error": str(e)}, status=400)
+
+        with transaction.atomic():
+            job = UploadJob.objects.create(
+                file=file,
+                company_id=company_id,
+                exporter_name=exporter_name,
+                invoice_no=invoice_no,
+                purchase_date=purchase_date,
+                chunk_size=chunk_size,
+            )
+            submit_upload_job(job)
+
+        return Response({
+            "message": "Upload queued",
+            "job_id": job.id,
+            "status_url": request.build_absolute_uri(f"/api/upload-jobs/{job.id}/"),
+        }, status=202)
+
+    def stream(self, request, file, started, company_id, exporter_name, invoice_no, purchase_date):
+        """
+        Read the sheet row by row and commit it in chunks. Bad rows are
+        reported individually instead of failing the whole upload.
+        """
+        try:
+            chunk_size = self.get_chunk_size(request)
+        except UploadError as e:
+            return Response({"error": str(e)}, status=400)
+
+        try:
+            sheet_rows = iter_sheet_rows(file)
+        except UploadError as e:
+            return Response({"error": str(e)}, status=400)
+        except EXCEL_ERRORS as e:
+            return Response({"error": f"Invalid Excel file: {str(e)}"}, status=400)
+
+        try:
+            purchase = resolve_purchase(company_id, exporter_name, invoice_no, purchase_date)
+        except UploadError as e:
+            sheet_rows.close()
+            return Response({"error": str(e)}, status=400)
+
+        result = stream_upload(sheet_rows, purchase, chunk_size=chunk_size)
+
+        result["elapsed_ms"] = round((time.monotonic() - started) * 1000)
+        result["message"] = (
+            "Stock uploaded successfully" if not result["failed_count"]
+            else "Stock uploaded with errors"
+        )
+        return Response(result, status=200)
@@ -0,0 +1,50 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from report.rollups import BUSINESS_FLOWS, as_date, refresh_range
+
+
+class Command(BaseCommand):
+    help = "Recompute DailySummary rollups for a date range from the source tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from-date", help="YYYY-MM-DD, defaults to the earliest recorded activity.")
+        parser.add_argument("--to-date", help="YYYY-MM-DD, defaults to today.")
+        parser.add_argument("--days-per-batch", type=int, default=31)
+
+    def handle(self, *args, **options):
+        start = self.parse(options["from_date"]) if options["from_date"] else self.first_activity()
+        end = self.parse(options["to_date"]) if options["to_date"] else timezone.localdate()
+        step = max(options["days_per_batch"], 1)
+
+        if start is None:
+            self.stdout.write("Nothing to summarise.")
+            return
+        if start > end:
+            raise CommandError("--from-date is after --to-date.")
+
+        written = 0
+        batch_start = start
+        while batch_start <= end:
+            batch_end = min(batch_start + timedelta(days=step - 1), end)
+            written += refresh_range(batch_start, batch_end)
+            self.stdout.write(f"{batch_start} .. {batch_end}: {written} rows so far")
+            batch_start = batch_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} daily summary rows for {start} .. {end}."))
+
+    def parse(self, value):
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date: {value}")
+        return day
+
+    def first_activity(self):
+        firsts = [
+            as_date(model.objects.aggregate(first=Min(date_path))["first"])
+            for _, model, date_path, _, _ in BUSINESS_FLOWS
+        ]
+        firsts = [day for day in firsts if day]
+        return min(firsts) if firsts else None
@@ -1,3 +1,35 @@
 from django.db import models
 
 # Create your models here.
+
+
+class DailySummary(models.Model):
+    """
+    One row per day and company, rolled up from the sale, purchase and
+    transaction tables by report.rollups. company_name "" is the
+    business-wide row; company rows only carry the flows that can be
+    attributed to a company (sale and purchase lines, supplier payments,
+    returns and stock value).
+    """
+    date = models.DateField()
+    company_name = models.CharField(max_length=255, blank=True, default="")
+
+    sale_count = models.PositiveIntegerField(default=0)
+    sales_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    collections_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sale_returns_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    purchases_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    supplier_payments_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    purchase_returns_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expenses_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    income_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    loans_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    stock_value_change = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("date", "company_name")
+
+    def __str__(self):
+        return f"{self.date} {self.company_name or 'All companies'}"
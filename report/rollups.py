@@ -0,0 +1,185 @@
+import threading
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Sum, Count, F, Case, When, DecimalField
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from sale.models import Sale, SaleProduct, SalePayment, SaleReturn
+from purchase.models import SupplierPurchase, PurchasePayment, SupplierPurchaseReturn, PurchaseItem
+from transaction.models import Expense, Income, Loan
+from product.models import StockMovement
+from .models import DailySummary
+
+
+# ----------------------------
+# Daily summary rollups
+# ----------------------------
+# DailySummary rows are recomputed per day from the source tables with a few
+# grouped queries. Saves schedule their day (see report.signals) and the
+# refresh runs once per day after the transaction commits, so a dashboard
+# reads a handful of rollup rows instead of scanning every table.
+
+BUSINESS = ""
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+SUMMARY_FIELDS = [
+    "sale_count",
+    "sales_amount",
+    "collections_amount",
+    "sale_returns_amount",
+    "purchases_amount",
+    "supplier_payments_amount",
+    "purchase_returns_amount",
+    "expenses_amount",
+    "income_amount",
+    "loans_amount",
+    "stock_value_change",
+]
+
+# Movements that carry their own value; the rest only move quantity.
+VALUED_MOVEMENTS = ("opening", "purchase", "upload")
+
+
+def stock_value():
+    """A movement's value, or its quantity at the stock row's purchase price."""
+    return Sum(
+        Case(
+            When(movement_type__in=VALUED_MOVEMENTS, then=F("value")),
+            default=F("quantity") * F("stock__purchase_price"),
+            output_field=MONEY,
+        )
+    )
+
+
+# (summary field, model, date lookup, date lookup is a datetime, amount)
+BUSINESS_FLOWS = [
+    ("sale_count", Sale, "sale_date", False, Count("id")),
+    ("sales_amount", Sale, "sale_date", False, Sum("total_payable_amount")),
+    ("collections_amount", SalePayment, "payment_date", True, Sum("paid_amount")),
+    ("sale_returns_amount", SaleReturn, "return_date", True,
+        Sum(F("quantity") * F("sale_product__sale_price_with_percentage"), output_field=MONEY)),
+    ("purchases_amount", SupplierPurchase, "purchase_date", False, Sum("total_payable_amount")),
+    ("purchases_amount", PurchaseItem, "purchase__purchase_date", False, Sum("total_price")),
+    ("supplier_payments_amount", PurchasePayment, "purchase__purchase_date", False, Sum("paid_amount")),
+    ("purchase_returns_amount", SupplierPurchaseReturn, "return_date", True,
+        Sum(F("quantity") * F("purchase_product__purchase_price"), output_field=MONEY)),
+    ("expenses_amount", Expense, "date", False, Sum("amount")),
+    ("income_amount", Income, "date", False, Sum("amount")),
+    ("loans_amount", Loan, "date", False, Sum("principal_amount")),
+    ("stock_value_change", StockMovement, "created_at", True, stock_value()),
+]
+
+# (summary field, model, date lookup, date lookup is a datetime, company lookup, amount)
+# Company sales are line totals, before the sale-level discount.
+COMPANY_FLOWS = [
+    ("sale_count", SaleProduct, "sale__sale_date", False, "product__company", Count("sale", distinct=True)),
+    ("sales_amount", SaleProduct, "sale__sale_date", False, "product__company", Sum("total_price")),
+    ("sale_returns_amount", SaleReturn, "return_date", True, "sale_product__product__company",
+        Sum(F("quantity") * F("sale_product__sale_price_with_percentage"), output_field=MONEY)),
+    ("purchases_amount", SupplierPurchase, "purchase_date", False, "company_name", Sum("total_payable_amount")),
+    ("purchases_amount", PurchaseItem, "purchase__purchase_date", False, "purchase__company_name", Sum("total_price")),
+    ("supplier_payments_amount", PurchasePayment, "purchase__purchase_date", False, "purchase__company_name",
+        Sum("paid_amount")),
+    ("purchase_returns_amount", SupplierPurchaseReturn, "return_date", True, "purchase_product__purchase__company_name",
+        Sum(F("quantity") * F("purchase_product__purchase_price"), output_field=MONEY)),
+    ("stock_value_change", StockMovement, "created_at", True, "company_name", stock_value()),
+]
+
+
+def as_date(value):
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    if isinstance(value, str):
+        return parse_date(value)
+    return value
+
+
+def day_bounds(start, end):
+    """[start 00:00, the day after end 00:00) as aware datetimes in the local time zone."""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def _grouped(model, date_path, is_datetime, start, end, amount, company_path=None):
+    if is_datetime:
+        # a plain range on the column, so its index is used (__date wraps it in DATE())
+        low, high = day_bounds(start, end)
+        queryset = model.objects.filter(**{f"{date_path}__gte": low, f"{date_path}__lt": high})
+    else:
+        queryset = model.objects.filter(**{f"{date_path}__range": (start, end)})
+    keys = {"summary_day": TruncDate(date_path) if is_datetime else F(date_path)}
+    if company_path:
+        queryset = queryset.exclude(**{f"{company_path}__isnull": True}).exclude(**{company_path: BUSINESS})
+        keys["summary_company"] = F(company_path)
+    return queryset.order_by().values(**keys).annotate(summary_total=amount)
+
+
+def compute_summaries(start, end):
+    """{(date, company_name): {field: value}} for every day in start..end with activity."""
+    rows = defaultdict(lambda: dict.fromkeys(SUMMARY_FIELDS, 0))
+
+    for field, model, date_path, is_datetime, amount in BUSINESS_FLOWS:
+        for row in _grouped(model, date_path, is_datetime, start, end, amount):
+            rows[(row["summary_day"], BUSINESS)][field] += row["summary_total"] or 0
+
+    for field, model, date_path, is_datetime, company_path, amount in COMPANY_FLOWS:
+        for row in _grouped(model, date_path, is_datetime, start, end, amount, company_path):
+            rows[(row["summary_day"], row["summary_company"])][field] += row["summary_total"] or 0
+
+    return rows
+
+
+def refresh_range(start, end):
+    """Recompute the DailySummary rows for start..end. Returns the number of rows written."""
+    started = timezone.now()
+    rows = compute_summaries(start, end)
+
+    with transaction.atomic():
+        DailySummary.objects.bulk_create(
+            [
+                DailySummary(date=day, company_name=company, **values)
+                for (day, company), values in rows.items()
+            ],
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["date", "company_name"],
+            update_fields=[*SUMMARY_FIELDS, "updated_at"],
+        )
+        # days or companies that no longer have any activity
+        DailySummary.objects.filter(date__range=(start, end), updated_at__lt=started).delete()
+
+    return len(rows)
+
+
+_pending = threading.local()
+
+
+def schedule_refresh(*days):
+    """
+    Refresh the summaries for `days` once the current transaction commits.
+    Days scheduled in the same transaction are refreshed once each.
+    """
+    days = {as_date(day) for day in days if day}
+    days.discard(None)
+    if not days:
+        return
+    if not hasattr(_pending, "days"):
+        _pending.days = set()
+    _pending.days |= days
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    days = getattr(_pending, "days", None)
+    if not days:
+        return
+    _pending.days = set()
+    for day in sorted(days):
+        refresh_range(day, day)
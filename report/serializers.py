@@ -3,22 +3,23 @@ from rest_framework import serializers
 
 
 class CombinedPurchaseSerializer(serializers.Serializer):
-    date = serializers.DateField()
+    date = serializers.DateField(source='purchase_date')
     invoice_no = serializers.CharField()
     part_no = serializers.CharField()
     product_name = serializers.CharField()
     supplier_or_exporter = serializers.CharField()
     quantity = serializers.IntegerField()
-    purchase_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    purchase_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    source = serializers.CharField()
 
 
 
 class CombinedExpenseSerializer(serializers.Serializer):
-    date = serializers.DateField()
+    date = serializers.DateField(source='entry_date')
     voucher_no = serializers.CharField()
     account_title = serializers.CharField()
     cost_category = serializers.CharField()
-    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
-    description = serializers.CharField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, source='entry_amount')
+    description = serializers.CharField(source='entry_description', allow_null=True)
     transaction_type = serializers.CharField()
 
@@ -0,0 +1,68 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from sale.models import Sale, SaleProduct, SalePayment, SaleReturn
+from purchase.models import SupplierPurchase, PurchasePayment, SupplierPurchaseReturn, Purchase, PurchaseItem
+from transaction.models import Expense, Income, Loan
+from product.services import stock_moved
+from .rollups import schedule_refresh
+
+
+# model -> lookup of the date its DailySummary row is keyed on
+SUMMARY_SOURCES = {
+    Sale: "sale_date",
+    SaleProduct: "sale__sale_date",
+    SalePayment: "payment_date",
+    SaleReturn: "return_date",
+    SupplierPurchase: "purchase_date",
+    PurchasePayment: "purchase__purchase_date",
+    SupplierPurchaseReturn: "return_date",
+    Purchase: "purchase_date",
+    PurchaseItem: "purchase__purchase_date",
+    Expense: "date",
+    Income: "date",
+    Loan: "date",
+}
+
+
+def _summary_date(instance, lookup):
+    value = instance
+    try:
+        for part in lookup.split("__"):
+            value = getattr(value, part)
+    except ObjectDoesNotExist:
+        return None
+    return value
+
+
+def remember_summary_date(sender, instance, raw=False, **kwargs):
+    # an edit can move a record to another day; both days are refreshed
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._summary_previous_date = (
+        sender.objects.filter(pk=instance.pk).values_list(SUMMARY_SOURCES[sender], flat=True).first()
+    )
+
+
+def refresh_summary_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_refresh(
+        getattr(instance, "_summary_previous_date", None),
+        _summary_date(instance, SUMMARY_SOURCES[sender]),
+    )
+
+
+def refresh_summary_on_delete(sender, instance, **kwargs):
+    schedule_refresh(_summary_date(instance, SUMMARY_SOURCES[sender]))
+
+
+for model in SUMMARY_SOURCES:
+    pre_save.connect(remember_summary_date, sender=model, dispatch_uid=f"summary_pre_save_{model.__name__}")
+    post_save.connect(refresh_summary_on_save, sender=model, dispatch_uid=f"summary_post_save_{model.__name__}")
+    post_delete.connect(refresh_summary_on_delete, sender=model, dispatch_uid=f"summary_post_delete_{model.__name__}")
+
+
+@receiver(stock_moved)
+def refresh_summary_on_stock_movement(sender, movements, **kwargs):
+    schedule_refresh(*{movement.created_at for movement in movements})
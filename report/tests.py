@@ -1,3 +1,330 @@
-from django.test import TestCase
+import csv
+from datetime import date
+from decimal import Decimal
+from io import BytesIO, StringIO
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from master.models import SupplierTypeMaster
+from person.models import Customer, Supplier
+from product.models import Product, StockProduct
+from product.services import record_damage
+from purchase.models import SupplierPurchase, PurchaseProduct, PurchasePayment, Purchase, PurchaseItem
+from sale.models import Sale, SaleProduct, SalePayment
+from transaction.models import Expense
+from .exports import XLSX_MEDIA_TYPE
+from .models import DailySummary
+from .rollups import BUSINESS, SUMMARY_FIELDS
+from .views import PURCHASE_REPORT_COLUMNS
 
-# Create your tests here.
+
+class SaleReportGroupingTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(customer_name="Walk-in", phone1="01700000000", address="Dhaka")
+        for day, amount in [(date(2025, 1, 15), "100"), (date(2025, 1, 15), "50"), (date(2025, 2, 3), "80")]:
+            sale = Sale.objects.create(
+                customer=cls.customer, sale_date=day,
+                total_amount=Decimal(amount), total_payable_amount=Decimal(amount),
+            )
+            SalePayment.objects.create(sale=sale, payment_mode="Cash", paid_amount=Decimal("30"))
+
+    def report(self, **params):
+        response = self.client.get(reverse('sale-report'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_group_by_day(self):
+        data = self.report(group_by='day')
+        self.assertEqual(
+            [(group['period'], group['sale_count'], group['total_sales_amount']) for group in data['groups']],
+            [(date(2025, 1, 15), 2, Decimal("150")), (date(2025, 2, 3), 1, Decimal("80"))],
+        )
+        self.assertEqual(data['summary']['total_due_amount'], Decimal("140"))
+
+    def test_group_by_month_and_customer(self):
+        months = self.report(group_by='month')['groups']
+        self.assertEqual([group['sale_count'] for group in months], [2, 1])
+
+        customers = self.report(group_by='customer')['groups']
+        self.assertEqual(len(customers), 1)
+        self.assertEqual(customers[0]['customer_name'], "Walk-in")
+        self.assertEqual(customers[0]['total_paid_amount'], Decimal("90"))
+
+    def test_csv_export_of_groups(self):
+        response = self.client.get(reverse('sale-report'), {'group_by': 'day', 'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(lines[0][:3], ['period', 'sale_count', 'total_sales_amount'])
+        self.assertEqual((lines[1][0], lines[1][1], Decimal(lines[1][2])), ('2025-01-15', '2', Decimal("150")))
+        self.assertEqual(len(lines), 3)
+
+    def test_unknown_group_by_is_rejected(self):
+        response = self.client.get(reverse('sale-report'), {'group_by': 'week'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PurchaseReportTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        supplier_type = SupplierTypeMaster.objects.create(name="Local")
+        supplier = Supplier.objects.create(
+            supplier_name="Rahman Traders", country="Bangladesh", supplier_type=supplier_type,
+            phone1="01800000000", address="Dhaka",
+        )
+        shoe = Product.objects.create(company="Hero", product_name="Brake shoe", part_no="BS-22")
+        plate = Product.objects.create(company="Hero", product_name="Clutch plate", part_no="CP-7")
+
+        for company_name, day, lines in [
+            ("Hero", date(2025, 1, 10), [(shoe, 2, "20"), (plate, 1, "5")]),
+            ("Honda", date(2025, 1, 20), [(plate, 3, "15")]),
+        ]:
+            purchase = SupplierPurchase.objects.create(
+                supplier=supplier, company_name=company_name, purchase_date=day,
+                total_amount=Decimal("0"), total_payable_amount=Decimal("0"),
+            )
+            for product, quantity, total in lines:
+                PurchaseProduct.objects.create(
+                    purchase=purchase, product=product, part_no=product.part_no, purchase_quantity=quantity,
+                    purchase_price=Decimal("5"), percentage=Decimal("0"),
+                    purchase_price_with_percentage=Decimal("5"), total_price=Decimal(total),
+                )
+
+        for invoice_no, day, lines in [
+            ("EX-1", date(2025, 1, 15), [(shoe, 4, "40")]),
+            ("EX-2", date(2025, 1, 5), []),
+        ]:
+            purchase = Purchase.objects.create(
+                invoice_no=invoice_no, purchase_date=day, exporter_name="Hero Exports", company_name="Hero",
+            )
+            for product, quantity, total in lines:
+                PurchaseItem.objects.create(
+                    purchase=purchase, product=product, quantity=quantity,
+                    purchase_price=Decimal("10"), total_price=Decimal(total),
+                )
+
+    def per_source(self, company=None, part_no=None):
+        """The report as it was built before the UNION: one pass per source."""
+        rows = []
+        sources = [
+            (SupplierPurchase.objects.prefetch_related('products__product'), 'products', 'purchase_quantity',
+             lambda purchase: purchase.supplier.supplier_name, "supplier"),
+            (Purchase.objects.prefetch_related('items__product'), 'items', 'quantity',
+             lambda purchase: purchase.exporter_name, "exporter"),
+        ]
+        for purchases, items, quantity_field, party, source in sources:
+            if company:
+                purchases = purchases.filter(company_name__iexact=company)
+            for purchase in purchases:
+                lines = [
+                    item for item in getattr(purchase, items).all()
+                    if not part_no or item.product.part_no == part_no
+                ]
+                quantity = sum(getattr(item, quantity_field) for item in lines)
+                if not quantity:
+                    continue
+                rows.append((purchase.purchase_date, purchase.id, {
+                    'date': purchase.purchase_date, 'invoice_no': purchase.invoice_no,
+                    'part_no': sorted(item.product.part_no for item in lines),
+                    'product_name': sorted(item.product.product_name for item in lines),
+                    'supplier_or_exporter': party(purchase), 'quantity': quantity,
+                    'purchase_amount': sum(item.total_price for item in lines), 'source': source,
+                }))
+        rows.sort(key=lambda row: (row[0], row[1]), reverse=True)
+        return [row for _, _, row in rows]
+
+    def report(self, **params):
+        response = self.client.get(reverse('purchase-report'), {'paginate': 'false', **params})
+        self.assertEqual(response.status_code, 200)
+        return [
+            {
+                **row,
+                'date': date.fromisoformat(row['date']),
+                'part_no': sorted(row['part_no'].split('|')),
+                'product_name': sorted(row['product_name'].split('|')),
+                'purchase_amount': Decimal(row['purchase_amount']),
+            }
+            for row in response.data
+        ]
+
+    def test_union_matches_per_source_rows_and_order(self):
+        expected = self.per_source()
+        # the sources interleave by date
+        self.assertEqual([row['source'] for row in expected], ["supplier", "exporter", "supplier"])
+        self.assertEqual(self.report(), expected)
+
+    def test_filters_match_per_source(self):
+        self.assertEqual(self.report(part_no="CP-7"), self.per_source(part_no="CP-7"))
+        self.assertEqual(self.report(company="hero"), self.per_source(company="hero"))
+        self.assertEqual(len(self.report(part_no="BS-22", company="honda")), 0)
+
+    def test_rows_are_paginated(self):
+        response = self.client.get(reverse('purchase-report'), {'page_size': 2})
+        self.assertEqual((response.data['count'], len(response.data['results'])), (3, 2))
+
+    def test_csv_export(self):
+        response = self.client.get(reverse('purchase-report'), {'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('filename="purchase-report.csv"', response['Content-Disposition'])
+        lines = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(lines[0], PURCHASE_REPORT_COLUMNS)
+        self.assertEqual(len(lines), 1 + len(self.per_source()))
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get(reverse('purchase-report'), {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], XLSX_MEDIA_TYPE)
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(list(rows[0]), PURCHASE_REPORT_COLUMNS)
+        self.assertEqual([row[1] for row in rows[1:]], [row['invoice_no'] for row in self.per_source()])
+
+
+class ExpenseReportTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        supplier_type = SupplierTypeMaster.objects.create(name="Local")
+        supplier = Supplier.objects.create(
+            supplier_name="Rahman Traders", country="Bangladesh", supplier_type=supplier_type,
+            phone1="01800000000", address="Dhaka",
+        )
+        purchase = SupplierPurchase.objects.create(
+            supplier=supplier, company_name="Hero", purchase_date=date(2025, 1, 12), invoice_no="PU-7",
+            total_amount=Decimal("50"), total_payable_amount=Decimal("50"),
+        )
+        PurchasePayment.objects.create(purchase=purchase, payment_mode="Cash", paid_amount=Decimal("30"))
+        PurchasePayment.objects.create(purchase=purchase, payment_mode="Bank Transfer", paid_amount=Decimal("20"))
+
+        for day, voucher_no, title, category, amount in [
+            (date(2025, 1, 10), "V-1", "Shop rent", "Office", "100"),
+            (date(2025, 1, 13), "V-2", "Carrying", "supplier purchase", "15"),
+            (date(2025, 1, 14), "V-3", "Tea", "Entertainment", "10"),
+        ]:
+            Expense.objects.create(
+                date=day, voucherNo=voucher_no, accountTitle=title, costCategory=category,
+                transactionType="cash", amount=Decimal(amount),
+            )
+
+    def report(self, **params):
+        response = self.client.get(reverse('expense-report'), {'paginate': 'false', **params})
+        self.assertEqual(response.status_code, 200)
+        return [(row['voucher_no'], row['account_title'], Decimal(row['amount'])) for row in response.data]
+
+    def test_all_lists_expenses_only(self):
+        expenses = [
+            ("V-3", "Tea", Decimal("10")), ("V-2", "Carrying", Decimal("15")), ("V-1", "Shop rent", Decimal("100")),
+        ]
+        self.assertEqual(self.report(cost_category="all"), expenses)
+        self.assertEqual(self.report(), expenses)
+        self.assertEqual(self.report(cost_category="Office"), expenses[2:])
+
+    def test_supplier_purchase_adds_payments(self):
+        self.assertEqual(self.report(cost_category="supplier purchase"), [
+            ("V-2", "Carrying", Decimal("15")),
+            ("Payment for PU-7", "Rahman Traders", Decimal("20")),
+            ("Payment for PU-7", "Cash Buy", Decimal("30")),
+        ])
+
+    def test_filters_apply_to_both_sources(self):
+        self.assertEqual(self.report(cost_category="supplier purchase", from_date="2025-01-13"), [
+            ("V-2", "Carrying", Decimal("15")),
+        ])
+        self.assertEqual(self.report(cost_category="supplier purchase", receipt_no="pu-7"), [
+            ("Payment for PU-7", "Rahman Traders", Decimal("20")),
+            ("Payment for PU-7", "Cash Buy", Decimal("30")),
+        ])
+
+    def test_account_title_matches_each_payment(self):
+        # the purchase has a bank payment too, which must not come along
+        self.assertEqual(self.report(cost_category="supplier purchase", account_title="cash"), [
+            ("Payment for PU-7", "Cash Buy", Decimal("30")),
+        ])
+
+
+class DailySummaryTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        supplier_type = SupplierTypeMaster.objects.create(name="Local")
+        cls.supplier = Supplier.objects.create(
+            supplier_name="Rahman Traders", country="Bangladesh", supplier_type=supplier_type,
+            phone1="01800000000", address="Dhaka",
+        )
+        cls.customer = Customer.objects.create(customer_name="Walk-in", phone1="01700000000", address="Dhaka")
+        cls.product = Product.objects.create(company="Hero", product_name="Brake shoe", part_no="BS-22")
+
+    def buy(self, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            purchase = SupplierPurchase.objects.create(
+                supplier=self.supplier, company_name="Hero", purchase_date=timezone.localdate(),
+                total_amount=Decimal(80 * quantity), total_payable_amount=Decimal(80 * quantity),
+            )
+            PurchaseProduct.objects.create(
+                purchase=purchase, product=self.product, part_no="BS-22", purchase_quantity=quantity,
+                purchase_price=Decimal("80"), percentage=Decimal("25"),
+                purchase_price_with_percentage=Decimal("100"), total_price=Decimal(80 * quantity),
+            )
+
+    def sell(self, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            sale = Sale.objects.create(
+                customer=self.customer, total_amount=Decimal(100 * quantity),
+                total_payable_amount=Decimal(100 * quantity),
+            )
+            SaleProduct.objects.create(
+                sale=sale, product=self.product, part_no="BS-22", sale_quantity=quantity,
+                sale_price=Decimal("100"), percentage=Decimal("0"),
+                sale_price_with_percentage=Decimal("100"), total_price=Decimal(100 * quantity),
+            )
+
+    def summary(self, company=BUSINESS):
+        return DailySummary.objects.filter(date=timezone.localdate(), company_name=company).values(
+            'sale_count', 'sales_amount', 'purchases_amount', 'stock_value_change'
+        ).get()
+
+    def test_purchase_and_sale_refresh_the_day(self):
+        self.buy(10)
+        self.assertEqual(
+            self.summary(),
+            {'sale_count': 0, 'sales_amount': 0, 'purchases_amount': Decimal("800"),
+             'stock_value_change': Decimal("800")},
+        )
+
+        self.sell(3)
+        # the sale takes 3 out at the purchase price
+        expected = {'sale_count': 1, 'sales_amount': Decimal("300"), 'purchases_amount': Decimal("800"),
+                    'stock_value_change': Decimal("560")}
+        self.assertEqual(self.summary(), expected)
+        self.assertEqual(self.summary("Hero"), expected)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record_damage(StockProduct.objects.get().pk, 1)
+        self.assertEqual(self.summary()['stock_value_change'], Decimal("480"))
+
+    def test_view_reads_the_rollups(self):
+        self.buy(10)
+        self.sell(3)
+        response = self.client.get(reverse('daily-summary'), {'period': 'month'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['rows']), 1)
+        self.assertEqual(response.data['totals']['sale_count'], 1)
+        self.assertEqual(response.data['totals']['closing_stock_value'], Decimal("560"))
+        self.assertEqual(
+            self.client.get(reverse('daily-summary'), {'company': "Honda"}).data['totals']['sale_count'], 0
+        )
+
+    def test_rebuild_gives_the_same_totals(self):
+        self.buy(10)
+        self.sell(3)
+        before = list(DailySummary.objects.order_by('date', 'company_name').values(*SUMMARY_FIELDS))
+
+        DailySummary.objects.all().delete()
+        call_command('rebuild_daily_summary', stdout=StringIO())
+        self.assertEqual(list(DailySummary.objects.order_by('date', 'company_name').values(*SUMMARY_FIELDS)), before)
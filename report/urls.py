@@ -5,4 +5,5 @@ urlpatterns = [
     path('sale-report/', SaleReportView.as_view(), name='sale-report'),
     path('purchase-report/', CombinedPurchaseView.as_view(), name="purchase-report"),
     path('expense-report/', CombinedExpanseView.as_view(), name="expense-report"),
+    path('reports/daily-summary/', DailySummaryView.as_view(), name="daily-summary"),
 ]
@@ -5,202 +5,345 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from .serializers import CombinedPurchaseSerializer
 from decimal import Decimal
-from django.db.models import Sum
-from sale.models import Sale
+from django.db.models import Sum, Count, F, Value, CharField, Aggregate, Case, When
+from django.db.models.functions import Coalesce, TruncMonth, TruncYear, Concat
+from sale.models import Sale, SaleProduct
 from sale.serializers import SaleSerializer
+from sale.balances import annotate_sale_totals
+from FirozAuto_Backend.ledgers import MONEY
 from transaction.models import Expense
-from purchase.models import SupplierPurchase, Purchase
+from purchase.models import SupplierPurchase, Purchase, PurchasePayment
+from FirozAuto_Backend.pagination import ReportPagination
+from .models import DailySummary
+from .rollups import BUSINESS, SUMMARY_FIELDS
+from .exports import REPORT_RENDERERS, EXPORT_CHUNK_SIZE, export_format, export_response
 
 
 
+class GroupConcat(Aggregate):
+    """'|'-joined text of the grouped rows (GROUP_CONCAT / STRING_AGG)."""
+    function = 'GROUP_CONCAT'
+    template = "%(function)s(%(expressions)s, '|')"
+
+    def __init__(self, expression, **extra):
+        super().__init__(expression, output_field=CharField(), **extra)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template="%(function)s(%(expressions)s SEPARATOR '|')",
+            **extra_context,
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            function='STRING_AGG',
+            template="%(function)s((%(expressions)s)::text, '|')",
+            **extra_context,
+        )
+
+
+def purchase_rows(queryset, items, supplier_or_exporter, source, company_name, part_num, from_date, to_date):
+    """
+    One row per purchase with its item totals, shaped the same for supplier
+    and exporter purchases so the two can be unioned.
+    """
+    if company_name:
+        queryset = queryset.filter(company_name__iexact=company_name)
+    if from_date:
+        queryset = queryset.filter(purchase_date__gte=parse_date(from_date))
+    if to_date:
+        queryset = queryset.filter(purchase_date__lte=parse_date(to_date))
+    if part_num:
+        # restricts the item join, so the totals below only cover this part
+        queryset = queryset.filter(**{f"{items}__product__part_no": part_num})
+
+    quantity_field = "purchase_quantity" if items == "products" else "quantity"
+    return (
+        queryset
+        .order_by()
+        .values(
+            'id', 'purchase_date', 'invoice_no',
+            supplier_or_exporter=supplier_or_exporter,
+            source=Value(source),
+        )
+        .annotate(
+            part_no=GroupConcat(Coalesce(f"{items}__product__part_no", Value("—"))),
+            product_name=GroupConcat(Coalesce(f"{items}__product__product_name", Value("—"))),
+            quantity=Sum(f"{items}__{quantity_field}"),
+            purchase_amount=Sum(f"{items}__total_price"),
+        )
+        .filter(quantity__gt=0)
+    )
+
+
+PURCHASE_REPORT_COLUMNS = [
+    "purchase_date", "invoice_no", "part_no", "product_name",
+    "supplier_or_exporter", "quantity", "purchase_amount", "source",
+]
+
+
 class CombinedPurchaseView(APIView):
+    """
+    Supplier and exporter purchases in one UNION query, ordered and
+    paginated in the database. ?format=csv|xlsx streams every row.
+    """
+    renderer_classes = REPORT_RENDERERS
+
     def get(self, request):
 
         company_name = request.query_params.get("company")
         part_num = request.query_params.get("part_no")
         from_date = request.query_params.get("from_date")
         to_date = request.query_params.get("to_date")
-        grouped_data = []
+        filters = (company_name, part_num, from_date, to_date)
 
+        supplier_purchases = purchase_rows(
+            SupplierPurchase.objects.all(), "products",
+            F("supplier__supplier_name"), "supplier", *filters
+        )
+        exporter_purchases = purchase_rows(
+            Purchase.objects.all(), "items",
+            F("exporter_name"), "exporter", *filters
+        )
 
-        supplier_purchases = (
-            SupplierPurchase.objects
-            .select_related("supplier")          # forward FK → best option
-            .prefetch_related("products__product")  # reverse FK + nested FK
+        rows = (
+            supplier_purchases
+            .union(exporter_purchases, all=True)
+            .order_by('-purchase_date', '-id')
         )
 
-        if company_name:
-            supplier_purchases = supplier_purchases.filter(company_name__iexact=company_name)
-        if from_date:
-            supplier_purchases = supplier_purchases.filter(purchase_date__gte=parse_date(from_date))
-        if to_date:
-            supplier_purchases = supplier_purchases.filter(purchase_date__lte=parse_date(to_date))
-
-        for purchase in supplier_purchases:
-
-            # All product names and part numbers
-            product_names = []
-            part_no_list = []
-            total_qty = 0
-            total_amt = 0
-
-            for item in purchase.products.all():
-                # for Part Wise Filtering
-                if part_num:
-                    if item.product and item.product.part_no != part_num:
-                        continue
-                
-                print("Item Product:", item.product)
-                if item.product:
-                    name_part = f"{item.product.product_name}"
-                    product_names.append(name_part)
-                else:
-                    product_names.append("—")
-                
-                if item.product:
-                    part_no = f"{item.product.part_no}"
-                    part_no_list.append(part_no)
-                else:
-                    part_no_list.append("—")
-
-                total_qty += item.purchase_quantity
-                total_amt += float(item.total_price)
-
-            if total_qty == 0:
-                continue
-
-            grouped_data.append({
-                "date": purchase.purchase_date,
-                "invoice_no": purchase.invoice_no,
-                "part_no" : "|".join(part_no_list),
-                "product_name": "|".join(product_names),
-                "supplier_or_exporter":  purchase.supplier.supplier_name,
-                "quantity": total_qty,
-                "purchase_amount": round(total_amt, 2),
-            })
+        fmt = export_format(request)
+        if fmt:
+            return export_response(
+                rows.iterator(chunk_size=EXPORT_CHUNK_SIZE),
+                PURCHASE_REPORT_COLUMNS, "purchase-report", fmt,
+            )
 
-            print("Grouped Data", grouped_data)
+        paginator = ReportPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(CombinedPurchaseSerializer(page, many=True).data)
 
+        serializer = CombinedPurchaseSerializer(rows, many=True)
+        return Response(serializer.data)
 
 
-        # Purchase from Exporter
-        purchases = Purchase.objects.prefetch_related('items__product').all()
 
-        if company_name:
-            purchases = purchases.filter(company_name__iexact=company_name)
-        if from_date:
-            purchases = purchases.filter(purchase_date__gte=parse_date(from_date))
-        if to_date:
-            purchases = purchases.filter(purchase_date__lte=parse_date(to_date))
-
-        for purchase in purchases:
-            product_names = []
-            part_no_list = []
-            total_qty = 0
-            total_amt = 0
-
-
-            for item in purchase.items.all():
-                print("Item Product:", item.product)
-
-                # for Part Wise Filtering
-                if part_num:
-                    if item.product and item.product.part_no != part_num:
-                        continue
-
-                # print("Item Product:", item.product)
-                if item.product:
-                    name_part = f"{item.product.product_name}"
-                    product_names.append(name_part)
-                else:
-                    product_names.append("—")
-                
-                if item.product:
-                    part_no = f"{item.product.part_no}"
-                    part_no_list.append(part_no)
-                else:
-                    part_no_list.append("—")
-
-                total_qty += item.quantity
-                total_amt += float(item.total_price)
-
-
-            if total_qty == 0:
-                continue
-        
-            grouped_data.append({
-                "date": purchase.purchase_date,
-                "invoice_no": purchase.invoice_no,
-                "part_no": part_no_list,
-                "product_name": product_names,  
-                "supplier_or_exporter": purchase.exporter_name,
-                "quantity": total_qty,
-                "purchase_amount": total_amt,
-            })
 
-        # print("Grouped Data", grouped_data)
 
-        # --- Sort by Date Descending ---
-        grouped_data.sort(key=lambda x: x["date"], reverse=True)
 
-        serializer = CombinedPurchaseSerializer(grouped_data, many=True)
-        return Response(serializer.data)
+
+# group_by -> (model fields, named expressions) passed to .values()
+SALE_GROUPINGS = {
+    "day": ((), {"period": F("sale_date")}),
+    "month": ((), {"period": TruncMonth("sale_date")}),
+    "customer": (("customer_id",), {"customer_name": F("customer__customer_name")}),
+}
 
 
+def sale_totals():
+    return {
+        "sale_count": Count("id"),
+        "total_sales_amount": Coalesce(Sum("total_amount"), Value(Decimal("0")), output_field=MONEY),
+        "total_discount_amount": Coalesce(Sum("discount_amount"), Value(Decimal("0")), output_field=MONEY),
+        "total_payable_amount": Coalesce(Sum("total_payable_amount"), Value(Decimal("0")), output_field=MONEY),
+        "total_paid_amount": Coalesce(Sum("paid_amount"), Value(Decimal("0")), output_field=MONEY),
+        "total_returned_amount": Coalesce(Sum("returned_amount"), Value(Decimal("0")), output_field=MONEY),
+    }
 
 
+SALE_TOTAL_COLUMNS = [
+    "sale_count", "total_sales_amount", "total_discount_amount", "total_payable_amount",
+    "total_paid_amount", "total_returned_amount", "total_due_amount", "net_due_amount",
+]
 
+SALE_ROW_COLUMNS = [
+    "id", "invoice_no", "sale_date", "customer_id", "customer_name",
+    "total_amount", "discount_amount", "total_payable_amount",
+    "paid_amount", "returned_amount", "due_amount",
+]
+
+
+def sale_rows(sales):
+    return sales.values(
+        'id', 'invoice_no', 'sale_date', 'customer_id',
+        'total_amount', 'discount_amount', 'total_payable_amount',
+        'paid_amount', 'returned_amount',
+        customer_name=F('customer__customer_name'),
+    )
+
+
+def with_row_due(row):
+    row["due_amount"] = row["total_payable_amount"] - row["paid_amount"] - row["returned_amount"]
+    return row
+
+
+def with_due(totals):
+    # total_due_amount keeps its original meaning (sales - paid)
+    totals["total_due_amount"] = totals["total_sales_amount"] - totals["total_paid_amount"]
+    totals["net_due_amount"] = (
+        totals["total_payable_amount"] - totals["total_paid_amount"] - totals["total_returned_amount"]
+    )
+    return totals
 
 
 class SaleReportView(APIView):
+    """
+    GET /sale-report/?customer=&company=&from_date=&to_date=
+        &projection=full|rows   (default full: nested SaleSerializer)
+        &group_by=day|month|customer
+        &format=csv|xlsx
+
+    The summary is one aggregate query. `projection=rows` returns flat sale
+    rows, and `group_by` returns grouped totals instead of sale rows. An
+    export format streams the sale rows (or groups) without the summary.
+    """
+    renderer_classes = REPORT_RENDERERS
+
     def get(self, request):
-        sales = Sale.objects.all().order_by('-sale_date').prefetch_related('payments')
+        sales = Sale.objects.all()
 
         # query params
         customer = request.query_params.get('customer')
         company = request.query_params.get('company')
         from_date = request.query_params.get('from_date')
         to_date = request.query_params.get('to_date')
+        projection = request.query_params.get('projection', 'full')
+        group_by = request.query_params.get('group_by')
+
+        if group_by and group_by not in SALE_GROUPINGS:
+            return Response({"error": f"group_by must be one of: {', '.join(SALE_GROUPINGS)}"}, status=400)
 
         # filtering
         if customer:
             sales = sales.filter(customer_id=customer)
         if company:
-            sales = sales.filter(company_name=company)
+            # Sale has no company column; a sale belongs to a company via its lines
+            sales = sales.filter(pk__in=SaleProduct.objects.filter(product__company=company).values('sale_id'))
         if from_date:
             sales = sales.filter(sale_date__gte=parse_date(from_date))
         if to_date:
             sales = sales.filter(sale_date__lte=parse_date(to_date))
 
-        serializer = SaleSerializer(sales, many=True)
+        sales = annotate_sale_totals(sales)
+        fmt = export_format(request)
 
-        # totals
-        total_sales_amount = sales.aggregate(total=Sum('total_amount'))['total'] or 0
+        if group_by:
+            fields, expressions = SALE_GROUPINGS[group_by]
+            groups = (
+                sales
+                .values(*fields, **expressions)
+                .annotate(**sale_totals())
+                .order_by(*fields, *expressions)
+            )
+            if fmt:
+                return export_response(
+                    (with_due(group) for group in groups.iterator(chunk_size=EXPORT_CHUNK_SIZE)),
+                    [*fields, *expressions, *SALE_TOTAL_COLUMNS],
+                    f"sale-report-{group_by}", fmt,
+                )
+            summary = with_due(sales.aggregate(**sale_totals()))
+            return Response({
+                "group_by": group_by,
+                "groups": [with_due(group) for group in groups],
+                "summary": summary,
+            })
 
-        total_paid_amount = sum(
-            sum(payment.paid_amount for payment in sale.payments.all())
-            for sale in sales
-        )
+        sales = sales.order_by('-sale_date', '-id')
 
-        total_due_amount = total_sales_amount - total_paid_amount
+        if fmt:
+            return export_response(
+                (with_row_due(row) for row in sale_rows(sales).iterator(chunk_size=EXPORT_CHUNK_SIZE)),
+                SALE_ROW_COLUMNS, "sale-report", fmt,
+            )
+
+        summary = with_due(sales.aggregate(**sale_totals()))
+
+        if projection == 'rows':
+            data = [with_row_due(row) for row in sale_rows(sales)]
+        else:
+            data = SaleSerializer(SaleSerializer.setup_eager_loading(sales), many=True).data
 
         return Response({
-            "sales": serializer.data,
-            "summary": {
-                "total_sales_amount": total_sales_amount,
-                "total_paid_amount": total_paid_amount,
-                "total_due_amount": total_due_amount,
-            }
+            "sales": data,
+            "summary": summary,
         })
 
 
 
+EXPENSE_REPORT_COLUMNS = [
+    ("entry_date", "date"), "voucher_no", "account_title", "cost_category",
+    ("entry_description", "description"), ("entry_amount", "amount"), "transaction_type",
+]
+
+
+def expense_entries(from_date, to_date, account_title, cost_category, receipt_no):
+    expenses = Expense.objects.all()
+    if from_date:
+        expenses = expenses.filter(date__gte=parse_date(from_date))
+    if to_date:
+        expenses = expenses.filter(date__lte=parse_date(to_date))
+    if account_title:
+        expenses = expenses.filter(accountTitle__icontains=account_title)
+    if cost_category and cost_category.lower() != 'all':
+        expenses = expenses.filter(costCategory=cost_category)
+    if receipt_no:
+        expenses = expenses.filter(voucherNo__icontains=receipt_no)
+
+    return expenses.order_by().values(
+        entry_id=F('id'),
+        entry_date=F('date'),
+        voucher_no=F('voucherNo'),
+        account_title=F('accountTitle'),
+        cost_category=F('costCategory'),
+        entry_description=F('remarks'),
+        entry_amount=F('amount'),
+        transaction_type=F('transactionType'),
+    )
+
+
+def supplier_payment_entries(from_date, to_date, account_title, receipt_no):
+    payments = PurchasePayment.objects.all()
+    if from_date:
+        payments = payments.filter(purchase__purchase_date__gte=parse_date(from_date))
+    if to_date:
+        payments = payments.filter(purchase__purchase_date__lte=parse_date(to_date))
+    if account_title:
+        # payments have no account title; the payment mode stands in for it
+        payments = payments.filter(payment_mode__icontains=account_title)
+    if receipt_no:
+        payments = payments.filter(purchase__invoice_no__icontains=receipt_no)
+
+    return payments.order_by().values(
+        entry_id=F('id'),
+        entry_date=F('purchase__purchase_date'),
+        voucher_no=Concat(Value('Payment for '), F('purchase__invoice_no'), output_field=CharField()),
+        account_title=Case(
+            When(payment_mode='Cash', then=Value('Cash Buy')),
+            default=F('purchase__supplier__supplier_name'),
+            output_field=CharField(),
+        ),
+        cost_category=Value('Supplier Purchase', output_field=CharField()),
+        entry_description=F('purchase__company_name'),
+        entry_amount=F('paid_amount'),
+        transaction_type=F('payment_mode'),
+    )
+
+
 class CombinedExpanseView(APIView):
-    def get(self, request):
-        
-        grouped_data = []
+    """
+    Expenses and supplier purchase payments as one cash-out ledger: a single
+    UNION query, filtered, ordered and paginated in the database.
+
+    Supplier payments are opt-in: they are only included for
+    cost_category="supplier purchase". Without it, or with "all", only
+    expenses are listed.
+    """
+    renderer_classes = REPORT_RENDERERS
 
-        expenses = Expense.objects.all().order_by('-date')
+    def get(self, request):
 
         # query params
         from_date = request.query_params.get('from_date')
@@ -209,81 +352,83 @@ class CombinedExpanseView(APIView):
         cost_category = request.query_params.get('cost_category')
         receipt_no = request.query_params.get('receipt_no')
 
-        # filtering
-        if from_date:
-            expenses = expenses.filter(date__gte=parse_date(from_date))
-        if to_date:
-            expenses = expenses.filter(date__lte=parse_date(to_date))
-        if account_title:
-            expenses = expenses.filter(accountTitle__icontains=account_title)
-        if cost_category and cost_category.lower() != 'all':
-            expenses = expenses.filter(costCategory=cost_category)
-        if receipt_no:
-            expenses = expenses.filter(voucherNo__icontains=receipt_no)
-
-        for expense in expenses:
-            grouped_data.append({
-                "date": expense.date,
-                "voucher_no": expense.voucherNo,
-                "account_title": expense.accountTitle,
-                "cost_category": expense.costCategory,
-                "description": expense.remarks,
-                "amount": expense.amount,
-                "transaction_type": expense.transactionType,
-            })  
-
-
-       
-
-        if cost_category.lower() == "supplier purchase":
-
-            supplier_purchases = (
-                SupplierPurchase.objects
-                .prefetch_related("payments", "supplier")  # prefetch supplier + related payments
+        rows = expense_entries(from_date, to_date, account_title, cost_category, receipt_no)
+
+        if cost_category and cost_category.lower() == 'supplier purchase':
+            rows = rows.union(
+                supplier_payment_entries(from_date, to_date, account_title, receipt_no),
+                all=True,
             )
 
-            if from_date:
-                supplier_purchases = supplier_purchases.filter(
-                    purchase_date__gte=parse_date(from_date)
-                )
+        rows = rows.order_by('-entry_date', '-entry_id')
 
-            if to_date:
-                supplier_purchases = supplier_purchases.filter(
-                    purchase_date__lte=parse_date(to_date)
-                )
+        fmt = export_format(request)
+        if fmt:
+            return export_response(
+                rows.iterator(chunk_size=EXPORT_CHUNK_SIZE),
+                EXPENSE_REPORT_COLUMNS, "expense-report", fmt,
+            )
 
-            # account_title is not a model field → using payment_mode as the filter
-            if account_title:
-                supplier_purchases = supplier_purchases.filter(
-                    payments__payment_mode__icontains=account_title
-                )
+        paginator = ReportPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(CombinedExpenseSerializer(page, many=True).data)
 
-            if receipt_no:
-                supplier_purchases = supplier_purchases.filter(
-                    invoice_no__icontains=receipt_no
-                )
+        serializer = CombinedExpenseSerializer(rows, many=True)
+        return Response(serializer.data)
 
-            for purchase in supplier_purchases:
-                for payment in purchase.payments.all():
 
-                    account_title_value = (
-                        "Cash Buy" if payment.payment_mode == "Cash" 
-                        else purchase.supplier.supplier_name
-                    )
 
-                    grouped_data.append({
-                        "date": purchase.purchase_date,
-                        "voucher_no": f"Payment for {purchase.invoice_no}",
-                        "account_title": account_title_value,
-                        "cost_category": "Supplier Purchase",
-                        "description": purchase.company_name,   # OR purchase.remarks (your model has no remarks field)
-                        "amount": payment.paid_amount,
-                        "transaction_type": payment.payment_mode,
-                    })
+DAILY_SUMMARY_PERIODS = {
+    "day": F("date"),
+    "month": TruncMonth("date"),
+    "year": TruncYear("date"),
+}
 
 
+class DailySummaryView(APIView):
+    """
+    GET /reports/daily-summary/?from_date=&to_date=&company=&period=day|month|year
 
-        grouped_data.sort(key=lambda x: x["date"], reverse=True)
+    Reads only the DailySummary rollups. Without `company` the business-wide
+    rows are used. `closing_stock_value` is the stock value journaled up to
+    the end of the range.
+    """
+
+    def get(self, request):
+        company = request.query_params.get('company') or BUSINESS
+        from_date = request.query_params.get('from_date')
+        to_date = request.query_params.get('to_date')
+        period = request.query_params.get('period', 'day')
 
-        serializer = CombinedExpenseSerializer(grouped_data, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        if period not in DAILY_SUMMARY_PERIODS:
+            return Response({"error": f"period must be one of: {', '.join(DAILY_SUMMARY_PERIODS)}"}, status=400)
+
+        summaries = DailySummary.objects.filter(company_name=company)
+        until = summaries
+        if from_date:
+            summaries = summaries.filter(date__gte=parse_date(from_date))
+        if to_date:
+            summaries = summaries.filter(date__lte=parse_date(to_date))
+            until = until.filter(date__lte=parse_date(to_date))
+
+        rows = (
+            summaries
+            .values(period=DAILY_SUMMARY_PERIODS[period])
+            .annotate(**{field: Sum(field) for field in SUMMARY_FIELDS})
+            .order_by('period')
+        )
+        totals = summaries.aggregate(**{
+            field: Coalesce(Sum(field), 0, output_field=DailySummary._meta.get_field(field))
+            for field in SUMMARY_FIELDS
+        })
+        totals["closing_stock_value"] = until.aggregate(
+            value=Coalesce(Sum('stock_value_change'), Value(Decimal("0")), output_field=MONEY)
+        )["value"]
+
+        return Response({
+            "period": period,
+            "company": company,
+            "rows": list(rows),
+            "totals": totals,
+        })
@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Sale, SaleProduct, SalePayment, SaleReturn
+from .models import Sale, SaleProduct, SalePayment, SaleReturn, CustomerBalance
 
 admin.site.register(Sale)
 admin.site.register(SaleProduct)
 admin.site.register(SalePayment)
 admin.site.register(SaleReturn)
+admin.site.register(CustomerBalance)
@@ -0,0 +1,129 @@
+from decimal import Decimal
+from django.db.models import Sum, F, ExpressionWrapper
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from person.models import Customer
+from FirozAuto_Backend.ledgers import MONEY, ZERO, sum_per_row, aging_sums
+from .models import Sale, SalePayment, SaleReturn, CustomerBalance
+
+
+# ----------------------------
+# Customer receivables
+# ----------------------------
+# CustomerBalance is adjusted with F() deltas in the same transaction as the
+# sale, payment or return that changes it. A missing row is rebuilt from the
+# source tables, so the first change for a customer also backfills them.
+
+def returned_value():
+    return F("quantity") * F("sale_product__sale_price_with_percentage")
+
+
+def annotate_sale_totals(sales):
+    return sales.annotate(
+        paid_amount=sum_per_row(SalePayment.objects.all(), "sale", "paid_amount"),
+        returned_amount=sum_per_row(SaleReturn.objects.all(), "sale_product__sale", returned_value()),
+    )
+
+
+def rebuild_customer_balances(customer_ids=None, batch_size=1000):
+    """Recompute CustomerBalance rows from the source tables. Returns the number written."""
+    customers = Customer.objects.all()
+    if customer_ids is not None:
+        customers = customers.filter(pk__in=customer_ids)
+
+    rows = customers.order_by("pk").annotate(
+        sales=sum_per_row(Sale.objects.all(), "customer", "total_payable_amount"),
+        paid=sum_per_row(SalePayment.objects.all(), "sale__customer", "paid_amount"),
+        returned=sum_per_row(SaleReturn.objects.all(), "sale_product__sale__customer", returned_value()),
+    ).values_list("pk", "previous_due_amount", "sales", "paid", "returned")
+
+    written = 0
+    batch = []
+    for customer_id, opening, sales, paid, returned in rows.iterator(chunk_size=batch_size):
+        opening = opening or Decimal("0")
+        batch.append(CustomerBalance(
+            customer_id=customer_id,
+            opening_due=opening,
+            sales_amount=sales,
+            paid_amount=paid,
+            returned_amount=returned,
+            balance=opening + sales - paid - returned,
+        ))
+        if len(batch) >= batch_size:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+    return written
+
+
+def _upsert(balances):
+    CustomerBalance.objects.bulk_create(
+        balances,
+        update_conflicts=True,
+        unique_fields=["customer"],
+        update_fields=["opening_due", "sales_amount", "paid_amount", "returned_amount", "balance", "updated_at"],
+    )
+    return len(balances)
+
+
+def adjust_customer_balance(customer_id, sales=0, paid=0, returned=0):
+    if not customer_id or not (sales or paid or returned):
+        return
+    updated = CustomerBalance.objects.filter(customer_id=customer_id).update(
+        sales_amount=F("sales_amount") + sales,
+        paid_amount=F("paid_amount") + paid,
+        returned_amount=F("returned_amount") + returned,
+        balance=F("balance") + sales - paid - returned,
+    )
+    if not updated:
+        # the change is already written, so the rebuild includes it
+        rebuild_customer_balances([customer_id])
+
+
+def set_opening_due(customer_id, opening_due):
+    opening_due = opening_due or Decimal("0")
+    updated = CustomerBalance.objects.filter(customer_id=customer_id).update(
+        opening_due=opening_due,
+        balance=opening_due + F("sales_amount") - F("paid_amount") - F("returned_amount"),
+    )
+    if not updated:
+        rebuild_customer_balances([customer_id])
+
+
+# model -> (customer lookup, CustomerBalance counter, amount)
+BALANCE_SHARES = {
+    Sale: ("customer_id", "sales", F("total_payable_amount")),
+    SalePayment: ("sale__customer_id", "paid", F("paid_amount")),
+    SaleReturn: ("sale_product__sale__customer_id", "returned", returned_value()),
+}
+
+
+def customer_aging(customers=None, today=None):
+    """
+    Outstanding sale dues per customer, bucketed by sale age, in one grouped
+    query. Opening dues (Customer.previous_due_amount) are reported apart.
+    """
+    today = today or timezone.localdate()
+    sales = annotate_sale_totals(Sale.objects.all())
+    if customers is not None:
+        sales = sales.filter(customer__in=customers)
+
+    due = ExpressionWrapper(
+        F("total_payable_amount") - F("paid_amount") - F("returned_amount"),
+        output_field=MONEY,
+    )
+
+    return (
+        sales
+        .annotate(due=due)
+        .filter(due__gt=0)
+        .values("customer_id")
+        .annotate(
+            customer_name=F("customer__customer_name"),
+            opening_due=Coalesce(F("customer__previous_due_amount"), ZERO, output_field=MONEY),
+            total_due=Sum("due"),
+            **aging_sums("due", "sale_date", today),
+        )
+        .order_by("-total_due", "customer_id")
+    )
@@ -0,0 +1,177 @@
+import queue
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction, DatabaseError
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from person.models import Customer
+from product.models import Product, StockProduct
+from sale.serializers import SaleSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Post sales from several threads through SaleSerializer (the POST /sales/ "
+        "path) and report throughput on the configured database (DB_ENGINE). The "
+        "sales are committed and deleted afterwards, but they use up invoice "
+        "numbers: run it against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--sales", type=int, default=200, help="Total sales to post.")
+        parser.add_argument("--lines", type=int, default=3, help="Products per sale.")
+        parser.add_argument("--products", type=int, default=20,
+                            help="Size of the product pool; fewer products means more contention on stock rows.")
+        parser.add_argument("--keep", action="store_true", help="Keep the posted sales and test products.")
+
+    def handle(self, *args, **options):
+        customer, products = self.setup(options["products"], options["sales"] * options["lines"])
+        try:
+            rng = random.Random(42)
+            lines = min(options["lines"], len(products))
+            payloads = [self.payload(customer, rng.sample(products, lines)) for _ in range(options["sales"])]
+
+            started = time.perf_counter()
+            results = self.run(payloads, options["threads"])
+            elapsed = time.perf_counter() - started
+
+            self.report(results, elapsed, options["threads"])
+            self.check_stock(products, [p for p, (_, error) in zip(payloads, results) if error is None])
+        finally:
+            if not options["keep"]:
+                self.cleanup(customer, products)
+
+    # ----------------------------
+    # Setup
+    # ----------------------------
+    def setup(self, count, stock):
+        tag = timezone.now().strftime("%Y%m%d%H%M%S")
+        with transaction.atomic():
+            customer = Customer.objects.create(customer_name=f"Load test {tag}", phone1="0", address="-")
+            products = Product.objects.bulk_create([
+                Product(company="Load test", product_name=f"Load test part {i}", part_no=f"LOAD-{tag}-{i:04d}")
+                for i in range(count)
+            ])
+            StockProduct.objects.bulk_create([
+                StockProduct(
+                    company_name=product.company, part_no=product.part_no, product=product,
+                    purchase_quantity=stock, current_stock_quantity=stock,
+                    purchase_price=Decimal("10"), sale_price=Decimal("12"), current_stock_value=Decimal("10") * stock,
+                )
+                for product in products
+            ])
+        return customer, products
+
+    def payload(self, customer, products):
+        price = Decimal("12.00")
+        total = price * len(products)
+        return {
+            "customer_id": customer.id,
+            "sale_date": timezone.localdate().isoformat(),
+            "total_amount": str(total),
+            "discount_amount": "0",
+            "total_payable_amount": str(total),
+            "products": [
+                {
+                    "product_id": product.id,
+                    "part_no": product.part_no,
+                    "sale_quantity": 1,
+                    "sale_price": str(price),
+                    "percentage": "0",
+                    "sale_price_with_percentage": str(price),
+                    "total_price": str(price),
+                }
+                for product in products
+            ],
+            "payments": [{"payment_mode": "Cash", "paid_amount": str(total)}],
+        }
+
+    # ----------------------------
+    # Load
+    # ----------------------------
+    def post(self, data):
+        started = time.perf_counter()
+        error = None
+        try:
+            # same transaction boundary as SaleViewSet.create
+            with transaction.atomic():
+                serializer = SaleSerializer(data=data)
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+        except ValidationError as e:
+            error = f"ValidationError: {e.detail}"[:120]
+        except DatabaseError as e:
+            error = f"{type(e).__name__}: {e}"[:120]
+        return time.perf_counter() - started, error
+
+    def run(self, payloads, threads):
+        jobs = queue.Queue()
+        for index, payload in enumerate(payloads):
+            jobs.put((index, payload))
+        results = [None] * len(payloads)
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        index, payload = jobs.get_nowait()
+                    except queue.Empty:
+                        return
+                    results[index] = self.post(payload)
+            finally:
+                # each thread has its own connection
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker) for _ in range(max(threads, 1))]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return results
+
+    # ----------------------------
+    # Results
+    # ----------------------------
+    def report(self, results, elapsed, threads):
+        latencies = sorted(seconds * 1000 for seconds, _ in results)
+        errors = Counter(error for _, error in results if error)
+        posted = len(results) - sum(errors.values())
+
+        pooled = "pool" in settings.DATABASES["default"].get("OPTIONS", {})
+        self.stdout.write(f"backend:     {connection.vendor}{' (pooled)' if pooled else ''}")
+        self.stdout.write(f"threads:     {threads}")
+        self.stdout.write(f"posted:      {posted}/{len(results)} in {elapsed:.2f}s")
+        self.stdout.write(f"throughput:  {posted / elapsed if elapsed else 0:.1f} sales/s")
+        if latencies:
+            p50 = latencies[len(latencies) // 2]
+            p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+            self.stdout.write(f"latency ms:  p50 {p50:.1f}  p95 {p95:.1f}  max {latencies[-1]:.1f}")
+        for error, count in errors.most_common():
+            self.stdout.write(self.style.WARNING(f"{count:6d} x {error}"))
+
+    def check_stock(self, products, posted):
+        sold = defaultdict(int)
+        for payload in posted:
+            for line in payload["products"]:
+                sold[line["product_id"]] += line["sale_quantity"]
+
+        stocks = StockProduct.objects.filter(product__in=products).values_list(
+            "product_id", "purchase_quantity", "current_stock_quantity",
+        )
+        wrong = [pid for pid, bought, current in stocks if bought - current != sold[pid]]
+        if wrong:
+            self.stdout.write(self.style.ERROR(f"Stock drifted on {len(wrong)} products (lost updates)."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Stock quantities match the posted sales."))
+
+    def cleanup(self, customer, products):
+        with transaction.atomic():
+            # the customer's sales, lines and payments cascade
+            customer.delete()
+            Product.objects.filter(pk__in=[product.pk for product in products]).delete()
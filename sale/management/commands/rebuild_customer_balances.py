@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sale.balances import rebuild_customer_balances
+
+
+class Command(BaseCommand):
+    help = "Recompute CustomerBalance rows from sales, payments and returns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customer", type=int, action="append", help="Only these customer ids (repeatable).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            written = rebuild_customer_balances(options["customer"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} customer balances."))
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Max
 from person.models import Customer
-from product.models import Product,StockProduct
+from product.models import Product
+from product.services import record_sale
 from master.models import Company, PaymentMode, BankMaster
+from master.sequences import reserve
 from django.utils import timezone
 
 
@@ -16,14 +19,22 @@ class Sale(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def generate_invoice_no(self):
-        last_id = Sale.objects.all().order_by('-id').first()
-        next_number = (last_id.id + 1) if last_id else 1
+        # seeded from the last id, which the old id-based numbers used
+        next_number = reserve('SA', initial=lambda: Sale.objects.aggregate(last=Max('id'))['last'] or 0)
         return f'SA{next_number:08d}'
 
     def save(self, *args, **kwargs):
-        if not self.invoice_no:
-            self.invoice_no = self.generate_invoice_no()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.invoice_no:
+                self.invoice_no = self.generate_invoice_no()
+            super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sale_date']),
+            models.Index(fields=['invoice_no']),
+            models.Index(fields=['customer', 'sale_date']),
+        ]
 
     def __str__(self):
         return f"Invoice {self.invoice_no} - {self.customer.customer_name}"
@@ -47,11 +58,7 @@ class SaleProduct(models.Model):
         super().save(*args, **kwargs)
 
         if is_new:
-            stock = StockProduct.objects.filter(product=self.product, part_no=self.part_no).first()
-            if stock:
-                stock.sale_quantity += self.sale_quantity
-                stock.current_stock_quantity = max(stock.current_stock_quantity - self.sale_quantity, 0)
-                stock.save()
+            record_sale(self.product, self.part_no, self.sale_quantity, reference=self.sale.invoice_no)
 
 
     def __str__(self):
@@ -78,5 +85,34 @@ class SalePayment(models.Model):
     remarks = models.TextField(blank=True, null=True)
     payment_date = models.DateTimeField(auto_now_add=True,blank=True,null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['payment_date']),
+        ]
+
     def __str__(self):
         return f"Payment for {self.sale.invoice_no} - {self.payment_mode}"
+
+
+
+class CustomerBalance(models.Model):
+    """
+    Running receivable per customer, kept in step with sales, payments and
+    returns by sale.balances (see sale/signals.py).
+    balance = opening_due + sales_amount - paid_amount - returned_amount
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='balance')
+    opening_due = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sales_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    returned_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-balance', 'customer']),
+        ]
+
+    def __str__(self):
+        return f"{self.customer} - {self.balance}"
@@ -1,20 +1,23 @@
+from collections import defaultdict
 from rest_framework import serializers
-from .models import Sale, SaleProduct, SalePayment, SaleReturn
+from .models import Sale, SaleProduct, SalePayment, SaleReturn, CustomerBalance
+from .balances import adjust_customer_balance
 from person.models import Customer
 from person.serializers import CustomerSerializer
 from product.models import Product, StockProduct
 from product.serializers import ProductSerializer
 from master.models import PaymentMode, BankMaster
-from master.serializers import PaymentModeSerializer, BankMasterSerializer
+from master.serializers import PaymentModeSerializer, BankMasterSerializer, MasterDetailField
+from FirozAuto_Backend.fieldsets import SparseFieldsMixin
+from product.services import InsufficientStock, record_sales
+from report.rollups import schedule_refresh
 from django.db import transaction
+from django.db.models import Prefetch
 
-class SaleProductSerializer(serializers.ModelSerializer):
+class SaleProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
-    product_id = serializers.PrimaryKeyRelatedField(
-        queryset=Product.objects.all(),
-        source='product',
-        write_only=True
-    )
+    # resolved for all lines at once in SaleSerializer.validate_products
+    product_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = SaleProduct
@@ -30,29 +33,12 @@ class SaleProductSerializer(serializers.ModelSerializer):
             'total_price',
         ]
 
-    def validate(self, data):
-        sale_quantity = data.get('sale_quantity')
-        product = data.get('product')
-        part_no = data.get('part_no')
-
-        stock = StockProduct.objects.filter(product=product, part_no=part_no).first()
-
-        if not stock:
-          raise serializers.ValidationError(f"No stock record found for {product} ({part_no}).")
-
-        if stock.current_stock_quantity < sale_quantity:
-            raise serializers.ValidationError(
-                f"Insufficient stock! Only {stock.current_stock_quantity} available."
-            )
-        
-        return data
-
        
 
 
 
-class SalePaymentSerializer(serializers.ModelSerializer):
-    bank_name = BankMasterSerializer(read_only=True)
+class SalePaymentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    bank_name = MasterDetailField(BankMasterSerializer)
     bank_name_id = serializers.PrimaryKeyRelatedField(
         queryset=BankMaster.objects.all(),
         source='bank_name',
@@ -98,7 +84,7 @@ class SalePaymentSerializer(serializers.ModelSerializer):
 
 
 
-class SaleSerializer(serializers.ModelSerializer):
+class SaleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     products = SaleProductSerializer(many=True)
     payments = SalePaymentSerializer(many=True)
     customer = CustomerSerializer(read_only=True)
@@ -126,19 +112,91 @@ class SaleSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['invoice_no', 'created_at']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the whole nested graph in three queries, whatever the number of sales."""
+        return queryset.select_related('customer').prefetch_related(
+            Prefetch(
+                'products',
+                queryset=SaleProduct.objects.select_related(
+                    'product__category__company',
+                    'product__bike_model__company',
+                ),
+            ),
+            Prefetch(
+                'payments',
+                queryset=SalePayment.objects.select_related('bank_name__bank_category'),
+            ),
+        )
+
+    def validate_products(self, lines):
+        """
+        Validate all sale lines together: products and stock rows are fetched
+        in two queries and every short line is reported at once, one error
+        dict per line. Inside a transaction the stock rows are locked until
+        the sale is written.
+        """
+        product_ids = {line['product_id'] for line in lines}
+        part_nos = {line['part_no'] for line in lines}
+
+        products = Product.objects.in_bulk(product_ids)
+
+        stocks = StockProduct.objects.filter(product_id__in=product_ids, part_no__in=part_nos).order_by('id')
+        if transaction.get_connection().in_atomic_block:
+            stocks = stocks.select_for_update()
+        available = {}
+        for product_id, part_no, quantity in stocks.values_list('product_id', 'part_no', 'current_stock_quantity'):
+            available.setdefault((product_id, part_no), quantity)
+
+        wanted = defaultdict(int)
+        for line in lines:
+            wanted[(line['product_id'], line['part_no'])] += line['sale_quantity']
+
+        errors = []
+        for line in lines:
+            key = (line['product_id'], line['part_no'])
+            product = products.get(line['product_id'])
+            if product is None:
+                errors.append({'product_id': [f'Invalid pk "{line["product_id"]}" - object does not exist.']})
+            elif key not in available:
+                errors.append({'non_field_errors': [f"No stock record found for {product} ({line['part_no']})."]})
+            elif available[key] < wanted[key]:
+                errors.append({'non_field_errors': [f"Insufficient stock! Only {available[key]} available."]})
+            else:
+                errors.append({})
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return lines
+
     @transaction.atomic
     def create(self, validated_data):
         products_data = validated_data.pop('products', [])
         payments_data = validated_data.pop('payments', [])
         sale = Sale.objects.create(**validated_data)
 
-        # Create SaleProduct records
-        for product_data in products_data:
-            SaleProduct.objects.create(sale=sale, **product_data)
-
-        # Create SalePayment records
-        for payment_data in payments_data:
-            SalePayment.objects.create(sale=sale, **payment_data)
+        # Take stock for all lines in one locked read and one update
+        lines = [SaleProduct(sale=sale, **product_data) for product_data in products_data]
+        try:
+            record_sales(
+                [(line.product_id, line.part_no, line.sale_quantity) for line in lines],
+                reference=sale.invoice_no,
+            )
+        except InsufficientStock as e:
+            raise serializers.ValidationError({'products': [
+                {'non_field_errors': [f"Insufficient stock! Only {e.shortages[key]} available."]}
+                if key in e.shortages else {}
+                for key in ((line.product_id, line.part_no) for line in lines)
+            ]})
+
+        # Create SaleProduct and SalePayment records in batches
+        SaleProduct.objects.bulk_create(lines)
+        payments = SalePayment.objects.bulk_create([SalePayment(sale=sale, **payment_data) for payment_data in payments_data])
+
+        # bulk_create skips post_save; the sale's own save already scheduled sale_date
+        # and added its total to the customer's balance
+        schedule_refresh(*(payment.payment_date for payment in payments))
+        adjust_customer_balance(sale.customer_id, paid=sum(payment.paid_amount for payment in payments))
 
         return sale
 
@@ -164,4 +222,15 @@ class SaleReturnSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Return quantity must be positive.')
         if quantity > (sale_product.sale_quantity - sale_product.returned_quantity):
             raise serializers.ValidationError('Cannot return more than sold minus already returned.')
-        return data 
\ No newline at end of file
+        return data 
+
+
+
+
+class CustomerBalanceSerializer(serializers.ModelSerializer):
+    customer_name = serializers.CharField(source='customer.customer_name', read_only=True)
+
+    class Meta:
+        model = CustomerBalance
+        fields = ['customer', 'customer_name', 'opening_due', 'sales_amount', 'paid_amount',
+                  'returned_amount', 'balance', 'updated_at']
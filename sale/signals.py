@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from person.models import Customer
+from FirozAuto_Backend.ledgers import connect_balance_signals
+from .balances import BALANCE_SHARES, adjust_customer_balance, set_opening_due
+
+
+# ----------------------------
+# Customer balance upkeep
+# ----------------------------
+# Sales, payments and returns move their customer's balance (see
+# FirozAuto_Backend.ledgers). Payments created with a sale are bulk inserted;
+# SaleSerializer.create adjusts the balance for those itself.
+
+connect_balance_signals(Customer, BALANCE_SHARES, adjust_customer_balance)
+
+
+@receiver(post_save, sender=Customer)
+def update_opening_due(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    set_opening_due(instance.pk, instance.previous_due_amount)
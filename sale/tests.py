@@ -1,3 +1,276 @@
-from django.test import TestCase
+from base64 import b64encode
+from decimal import Decimal
+from urllib.parse import urlencode
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APITestCase, APIRequestFactory
+from FirozAuto_Backend.pagination import DefaultCursorPagination
+from FirozAuto_Backend.testing import QueryBudgetMixin
+from master.models import Company, BankCategoryMaster, BankMaster
+from person.models import Customer
+from product.models import ProductCategory, BikeModel, Product, StockProduct, StockMovement
+from .models import Sale, SaleProduct, SalePayment, SaleReturn, CustomerBalance
+from .serializers import SaleSerializer
 
-# Create your tests here.
+
+# Queries allowed per request. The sale graph (customer, lines -> product ->
+# category/bike model -> company, payments -> bank -> bank category) must load
+# in a fixed number of queries however many sales are listed.
+SALE_LIST_BUDGET = 3
+SALE_DETAIL_BUDGET = 3
+
+
+class SaleQueryBudgetTests(QueryBudgetMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(company_name="Hero")
+        category = ProductCategory.objects.create(company=company, category_name="Engine")
+        bike_model = BikeModel.objects.create(company=company, name="Glamour")
+        bank_category = BankCategoryMaster.objects.create(name="Private")
+        cls.bank = BankMaster.objects.create(name="City Bank", bank_category=bank_category)
+        cls.customer = Customer.objects.create(customer_name="Walk-in", phone1="01700000000", address="Dhaka")
+
+        cls.products = []
+        for i in range(3):
+            product = Product.objects.create(
+                company="Hero", category=category, bike_model=bike_model,
+                product_name=f"Part {i}", part_no=f"P-{i}",
+            )
+            StockProduct.objects.create(
+                company_name="Hero", part_no=product.part_no, product=product,
+                purchase_quantity=1000, current_stock_quantity=1000,
+                purchase_price=Decimal("10"), sale_price=Decimal("12"),
+                current_stock_value=Decimal("10000"),
+            )
+            cls.products.append(product)
+
+    def create_sales(self, count):
+        for _ in range(count):
+            sale = Sale.objects.create(
+                customer=self.customer,
+                total_amount=Decimal("36"),
+                total_payable_amount=Decimal("36"),
+            )
+            for product in self.products:
+                SaleProduct.objects.create(
+                    sale=sale, product=product, part_no=product.part_no, sale_quantity=1,
+                    sale_price=Decimal("12"), percentage=Decimal("0"),
+                    sale_price_with_percentage=Decimal("12"), total_price=Decimal("12"),
+                )
+            SalePayment.objects.create(
+                sale=sale, payment_mode="Bank Transfer", bank_name=self.bank,
+                account_no="123", paid_amount=Decimal("36"),
+            )
+        return sale
+
+    def test_sale_list_within_budget(self):
+        self.create_sales(2)
+        few = self.assertQueryBudget(SALE_LIST_BUDGET, reverse('sale-list'))
+
+        self.create_sales(20)
+        many = self.assertQueryBudget(SALE_LIST_BUDGET, reverse('sale-list'))
+
+        self.assertEqual(few, many)
+
+    def test_sale_detail_within_budget(self):
+        sale = self.create_sales(1)
+        self.assertQueryBudget(SALE_DETAIL_BUDGET, reverse('sale-detail', args=[sale.id]))
+
+    def test_sale_payments_within_budget(self):
+        sale = self.create_sales(1)
+        self.assertQueryBudget(SALE_DETAIL_BUDGET, reverse('sale-payments', args=[sale.id]))
+
+    def test_customer_ledger_and_balance(self):
+        sale = self.create_sales(1)
+        SaleReturn.objects.create(sale_product=sale.products.first(), quantity=1)
+        balance = CustomerBalance.objects.get(customer=self.customer)
+        self.assertEqual((balance.sales_amount, balance.paid_amount, balance.returned_amount, balance.balance),
+                         (Decimal("36"), Decimal("36"), Decimal("12"), Decimal("-12")))
+
+        response = self.client.get(reverse('customer-ledger', args=[self.customer.id]), {'paginate': 'false'})
+        self.assertEqual(response.data['customer_name'], "Walk-in")
+        self.assertEqual(Decimal(response.data['balance']['balance']), Decimal("-12"))
+        self.assertEqual(
+            sorted((entry['entry_type'], entry['debit'], entry['credit']) for entry in response.data['results']),
+            [("payment", 0, Decimal("36")), ("return", 0, Decimal("12")), ("sale", Decimal("36"), 0)],
+        )
+
+    def test_cursor_pages_sales_sharing_a_date(self):
+        # every sale is dated today, so only the id tells them apart
+        self.create_sales(7)
+        expected = list(Sale.objects.order_by('-id').values_list('id', flat=True))
+
+        seen, url = [], reverse('sale-list') + '?page_size=3&fields=id'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(url).data
+            self.assertFalse(any('OFFSET' in q['sql'] for q in queries.captured_queries))
+            seen.extend(sale['id'] for sale in page['results'])
+            last, url = page, page['next']
+        self.assertEqual(seen, expected)
+
+        back, url = [], last['previous']
+        while url:
+            page = self.client.get(url).data
+            back[:0] = [sale['id'] for sale in page['results']]
+            url = page['previous']
+        self.assertEqual(back, expected[:6])
+
+    def test_cursor_pages_through_null_ordering_values(self):
+        self.create_sales(5)
+        SalePayment.objects.filter(id__in=SalePayment.objects.order_by('id').values('id')[:2]).update(payment_date=None)
+        # NULLs sort first when descending
+        expected = (
+            list(SalePayment.objects.filter(payment_date=None).order_by('-id').values_list('id', flat=True))
+            + list(SalePayment.objects.exclude(payment_date=None).order_by('-payment_date', '-id').values_list('id', flat=True))
+        )
+
+        class View:
+            cursor_ordering = ('-payment_date', '-id')
+
+        def page(url):
+            request = Request(APIRequestFactory().get(url))
+            paginator = DefaultCursorPagination()
+            ids = [payment.id for payment in paginator.paginate_queryset(SalePayment.objects.all(), request, View())]
+            return ids, paginator.get_next_link(), paginator.get_previous_link()
+
+        seen, url = [], '/payments/?page_size=2'
+        while url:
+            ids, url, previous = page(url)
+            seen.extend(ids)
+        self.assertEqual(seen, expected)
+
+        back, url = [], previous
+        while url:
+            ids, _, url = page(url)
+            back[:0] = ids
+        self.assertEqual(back, expected[:4])
+
+    def test_undecodable_cursor_is_not_found(self):
+        self.create_sales(1)
+        for position in ['not json', '["x"]', '["not a date","1"]']:
+            cursor = b64encode(urlencode({'p': position}).encode()).decode()
+            response = self.client.get(reverse('sale-list'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, position)
+
+    def test_sparse_fieldset_narrows_payload_and_queries(self):
+        self.create_sales(3)
+        url = reverse('sale-list') + '?fields=id,invoice_no,customer,products.part_no,products.sale_quantity'
+        # sales and their lines; payments aren't shipped, so not prefetched
+        self.assertQueryBudget(2, url)
+
+        sale = self.client.get(url).data['results'][0]
+        self.assertEqual(set(sale), {'id', 'invoice_no', 'customer', 'products'})
+        self.assertEqual(sale['customer'], self.customer.id)
+        self.assertEqual(
+            sorted(sale['products'], key=lambda line: line['part_no']),
+            [{'part_no': f'P-{i}', 'sale_quantity': 1} for i in range(3)],
+        )
+
+    def test_expand_is_opt_in(self):
+        sale = self.create_sales(1)
+        response = self.client.get(reverse('sale-detail', args=[sale.id]), {'expand': 'products.product'})
+        product = response.data['products'][0]['product']
+        self.assertIn('product_name', product)
+        self.assertNotIn('category_detail', product)
+        self.assertEqual(response.data['customer'], self.customer.id)
+        self.assertEqual(response.data['payments'][0]['bank_name'], self.bank.id)
+
+class SaleCreateTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="counter", password="secret")
+        cls.customer = Customer.objects.create(customer_name="Walk-in", phone1="01700000000", address="Dhaka")
+        cls.products = []
+        for i, quantity in enumerate([5, 3]):
+            product = Product.objects.create(company="Hero", product_name=f"Part {i}", part_no=f"P-{i}")
+            StockProduct.objects.create(
+                company_name="Hero", part_no=product.part_no, product=product,
+                purchase_quantity=quantity, current_stock_quantity=quantity,
+                purchase_price=Decimal("10"), sale_price=Decimal("12"),
+                current_stock_value=Decimal("10") * quantity,
+            )
+            cls.products.append(product)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def line(self, product, quantity):
+        return {
+            'product_id': product.id, 'part_no': product.part_no, 'sale_quantity': quantity,
+            'sale_price': "12", 'percentage': "0", 'sale_price_with_percentage': "12",
+            'total_price': str(12 * quantity),
+        }
+
+    def sell(self, *lines, paid="20"):
+        total = str(sum(12 * line['sale_quantity'] for line in lines))
+        return self.client.post(reverse('sale-list'), {
+            'customer_id': self.customer.id, 'sale_date': "2025-01-15",
+            'total_amount': total, 'total_payable_amount': total,
+            'products': list(lines),
+            'payments': [{'payment_mode': "Cash", 'paid_amount': paid}],
+        }, format='json')
+
+    def stock_left(self):
+        return list(StockProduct.objects.order_by('part_no').values_list('current_stock_quantity', flat=True))
+
+    def assertNothingWritten(self):
+        self.assertEqual(self.stock_left(), [5, 3])
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(StockMovement.objects.exists())
+        self.assertFalse(CustomerBalance.objects.filter(sales_amount__gt=0).exists())
+
+    def test_sale_takes_stock_journals_lines_and_updates_balance(self):
+        response = self.sell(self.line(self.products[0], 2), self.line(self.products[1], 3))
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(self.stock_left(), [3, 0])
+        sale = Sale.objects.get()
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list('part_no', 'movement_type', 'quantity', 'reference')),
+            [("P-0", "sale", -2, sale.invoice_no), ("P-1", "sale", -3, sale.invoice_no)],
+        )
+        balance = CustomerBalance.objects.get(customer=self.customer)
+        self.assertEqual((balance.sales_amount, balance.paid_amount, balance.balance),
+                         (Decimal("60"), Decimal("20"), Decimal("40")))
+
+    def test_oversell_is_rejected_and_nothing_written(self):
+        response = self.sell(self.line(self.products[0], 2), self.line(self.products[1], 4))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('products', response.data)
+        self.assertNothingWritten()
+
+    def test_stock_errors_are_reported_per_line(self):
+        response = self.sell(self.line(self.products[0], 2), self.line(self.products[1], 4))
+        self.assertEqual(response.json(), {'products': [
+            {}, {'non_field_errors': ["Insufficient stock! Only 3 available."]},
+        ]})
+
+    def test_two_lines_of_one_product_are_checked_together(self):
+        response = self.sell(self.line(self.products[1], 2), self.line(self.products[1], 2))
+        self.assertEqual(response.status_code, 400)
+        self.assertNothingWritten()
+
+    def test_stock_taken_after_validation_is_rejected_on_save(self):
+        serializer = SaleSerializer(data={
+            'customer_id': self.customer.id, 'total_amount': "36", 'total_payable_amount': "36",
+            'products': [self.line(self.products[0], 1), self.line(self.products[1], 2)], 'payments': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        # a concurrent sale takes the stock between validation and save
+        StockProduct.objects.filter(part_no="P-1").update(current_stock_quantity=1)
+
+        with self.assertRaises(ValidationError) as raised:
+            serializer.save()
+        self.assertEqual(raised.exception.detail, {'products': [
+            {}, {'non_field_errors': ["Insufficient stock! Only 1 available."]},
+        ]})
+        self.assertEqual(self.stock_left(), [5, 1])
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(StockMovement.objects.exists())
@@ -1,12 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SaleViewSet, SaleReturnViewSet, SalePaymentViewSet
+from .views import SaleViewSet, SaleReturnViewSet, SalePaymentViewSet, CustomerBalanceViewSet, CustomerLedgerView
 
 router = DefaultRouter()
 router.register(r'sales', SaleViewSet, basename='sale')
 router.register(r'sale-returns', SaleReturnViewSet, basename='sale-return')
 router.register(r'sale-payments', SalePaymentViewSet, basename='sale-payment')
+router.register(r'customer-balances', CustomerBalanceViewSet, basename='customer-balance')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('customers/<int:customer_id>/ledger/', CustomerLedgerView.as_view(), name='customer-ledger'),
 ] 
\ No newline at end of file
@@ -2,22 +2,34 @@ from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from .models import Sale, SaleReturn, SaleProduct, SalePayment
-from .serializers import SaleSerializer, SaleReturnSerializer, SalePaymentSerializer
+from .models import Sale, SaleReturn, SaleProduct, SalePayment, CustomerBalance
+from .serializers import SaleSerializer, SaleReturnSerializer, SalePaymentSerializer, CustomerBalanceSerializer
+from .balances import customer_aging, rebuild_customer_balances, returned_value
+from FirozAuto_Backend.ledgers import PartyLedgerView, DEBIT, CREDIT
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
-from product.models import StockProduct
+from product.services import record_sale_return
 from django.utils.dateparse import parse_date
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Sum, F
+from rest_framework import serializers
+from person.models import Customer
+from FirozAuto_Backend.pagination import ReportPagination
+from FirozAuto_Backend.fieldsets import SparseFieldsViewMixin
 
 
 
-class SaleViewSet(viewsets.ModelViewSet):
-    queryset = Sale.objects.all().order_by('-sale_date')
+class SaleViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    queryset = SaleSerializer.setup_eager_loading(Sale.objects.all()).order_by('-sale_date')
     serializer_class = SaleSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-sale_date', '-id')
+
+    @transaction.atomic
+    def create(self, request, *args, **kwargs):
+        # validation runs in the same transaction, so the stock rows it
+        # locks stay locked until the sale is written
+        return super().create(request, *args, **kwargs)
 
-   
-    
     @action(detail=True, methods=['get'])
     def payments(self, request, pk=None):
         sale = self.get_object()
@@ -28,7 +40,7 @@ class SaleViewSet(viewsets.ModelViewSet):
 
 
 class SalePaymentViewSet(viewsets.ModelViewSet):
-    queryset = SalePayment.objects.all().order_by('-payment_date')
+    queryset = SalePayment.objects.select_related('bank_name__bank_category').order_by('-payment_date')
     serializer_class = SalePaymentSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
@@ -39,16 +51,26 @@ class SalePaymentViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(sale_id=sale_id)
         return queryset
 
+    @transaction.atomic
     def perform_create(self, serializer):
         """Create a new payment and associate it with the sale"""
         serializer.save()
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        # keeps the payment and its customer balance adjustment together
+        serializer.save()
+
 
 
 class SaleReturnViewSet(viewsets.ModelViewSet):
-    queryset = SaleReturn.objects.all().order_by('-return_date')
+    queryset = SaleReturn.objects.select_related(
+        'sale_product__product__category__company',
+        'sale_product__product__bike_model__company',
+    ).order_by('-return_date')
     serializer_class = SaleReturnSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-return_date', '-id')
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -57,17 +79,77 @@ class SaleReturnViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(sale_product__sale__invoice_no=invoice_no)
         return queryset
 
+    @transaction.atomic
     def perform_create(self, serializer):
         instance = serializer.save()
         sale_product = instance.sale_product
-        sale_product.returned_quantity += instance.quantity
-        sale_product.save()
-        
-        stock = StockProduct.objects.filter(
-            company_name=sale_product.sale.company_name,
-            part_no=sale_product.part_no,
-            product=sale_product.product
-        ).first()
-        if stock:
-            stock.current_stock_quantity += instance.quantity
-            stock.save()
+
+        # Guarded increment, so two returns can't exceed the sold quantity
+        updated = SaleProduct.objects.filter(
+            pk=sale_product.pk,
+            returned_quantity__lte=F('sale_quantity') - instance.quantity,
+        ).update(returned_quantity=F('returned_quantity') + instance.quantity)
+        if not updated:
+            raise serializers.ValidationError('Cannot return more than sold minus already returned.')
+
+        record_sale_return(
+            sale_product.product_id,
+            sale_product.part_no,
+            instance.quantity,
+            reference=sale_product.sale.invoice_no,
+        )
+
+
+
+class CustomerBalanceViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Maintained receivable per customer; the collections screen reads these
+    rows directly. ?has_due=true keeps only customers who owe money.
+    """
+    queryset = CustomerBalance.objects.select_related('customer').order_by('-balance', 'customer_id')
+    serializer_class = CustomerBalanceSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-balance', 'customer_id')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        customer = self.request.query_params.get('customer')
+        if customer:
+            queryset = queryset.filter(customer_id=customer)
+        if self.request.query_params.get('has_due', '').lower() in ('true', '1', 'yes'):
+            queryset = queryset.filter(balance__gt=0)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def aging(self, request):
+        """Outstanding sale dues per customer in 0-30 / 31-60 / 61-90 / 90+ day buckets."""
+        rows = customer_aging()
+        paginator = ReportPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(page)
+        return Response(list(rows))
+
+
+
+class CustomerLedgerView(PartyLedgerView):
+    """
+    GET /customers/<id>/ledger/?from_date=&to_date=
+
+    The customer's sales (debit), payments and returns (credit), newest
+    first, from one UNION query, with the maintained balance.
+    """
+    party_model = Customer
+    party_field = 'customer'
+    party_name_field = 'customer_name'
+    balance_model = CustomerBalance
+    balance_serializer_class = CustomerBalanceSerializer
+    rebuild_balances = staticmethod(rebuild_customer_balances)
+    entry_sources = [
+        ('sale', Sale, 'customer', 'sale_date', False, 'invoice_no',
+            F('total_payable_amount'), DEBIT),
+        ('payment', SalePayment, 'sale__customer', 'payment_date', True, 'sale__invoice_no',
+            F('paid_amount'), CREDIT),
+        ('return', SaleReturn, 'sale_product__sale__customer', 'return_date', True, 'sale_product__sale__invoice_no',
+            returned_value(), CREDIT),
+    ]
@@ -34,7 +34,7 @@ class Expense(models.Model):
         ('bkash', 'Bkash'),
     ]
 
-    date = models.DateField()
+    date = models.DateField(db_index=True)
     voucherNo = models.CharField(max_length=30, unique=True)
     accountTitle = models.CharField(max_length=100)
     costCategory = models.CharField(max_length=100)
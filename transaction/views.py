@@ -12,6 +12,7 @@ class LoanListCreateView(generics.ListCreateAPIView):
     queryset = Loan.objects.all().order_by('-date')
     serializer_class = LoanSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-date', '-id')
 
 
 class LoanDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -27,6 +28,7 @@ class ExpenseViewset(viewsets.ModelViewSet):
     queryset = Expense.objects.all().order_by('-date')
     serializer_class = ExpenseSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-date', '-id')
 
 
 
@@ -35,4 +37,5 @@ class IncomeViewset(viewsets.ModelViewSet):
     queryset = Income.objects.all()
     serializer_class = IncomeSrializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-date', '-id')
 